@@ -11,7 +11,48 @@ class SimulationOptions:
     battery_capacity: float = 3
     steps: int = 100
     prediction_window: int = 100
-
+    mpc_mode: str = "milp"              # 'milp' of 'lp' (LP met MILP-terugval; loont alleen zonder PV)
+    warm_start: bool = False            # start elk venster vanuit de opgeschoven vorige oplossing
+    calibrate_solvers: bool = False     # kies vooraf de snelste solver per (probleemtype, horizon)
+    backend: str = "cvxpy"              # 'cvxpy', 'sparse', 'dp', 'explicit', 'surrogate', 'arbitrage' of 'stochastic'
+    dp_soc_points: int = 101            # aantal SOC-roosterpunten voor de DP-backend
+    dp_ramp_cap: bool = True            # DP: vermogen op de ramp-limiet als die kan binden; False = ramp negeren
+    move_blocking: tuple = ()           # (aantal, lengte)-paren, bijv. ((6, 1), (4, 3), (5, 6)); leeg = elk uur
+    event_triggered: bool = False       # hergebruik het vorige plan tot een trigger afgaat
+    replan_min_horizon: int = 0         # opnieuw oplossen onder dit aantal resterende stappen (0: horizon // 2)
+    replan_input_tol: float = 1e-6      # toegestane afwijking van vraag/PV [kW] en prijs [€/kWh]
+    replan_soc_tol: float = 1e-4        # toegestane afwijking van de geplande SOC
+    solution_cache: bool = False        # LRU-cache van eerste acties met gekwantiseerde sleutel
+    cache_size: int = 4096              # maximaal aantal oplossingen in de cache
+    cache_power_step: float = 0.05      # kwantisatie van vraag en PV [kW]
+    cache_price_step: float = 0.01      # kwantisatie van de prijs [€/kWh]
+    cache_soc_step: float = 0.01        # kwantisatie van begin-SOC, capaciteit en soc_max
+    hierarchical: bool = False          # één dagplan per replan_every stappen plus uurlijkse SOC-correctie
+    replan_every: int = 24              # stappen tussen twee dagplannen (prediction_window ≥ replan_every)
+    compare_rolling: bool = False       # vergelijk hierarchical met de volledige rollende MPC (kosten en rekentijd)
+    scale_problem: bool = False         # schaal vermogens en prijzen naar orde 1 (cvxpy-backend)
+    explicit_samples: int = 2000        # voorbeeldvensters voor de tabel van de explicit-backend
+    decision_log: str = ""              # map om (venster, eerste actie)-paren in op te slaan; leeg = niet loggen
+    surrogate_model: str = ""           # .npz-bestand met een getraind SurrogateModel (surrogate-backend)
+    surrogate_max_spread: float = 0.05  # grootste ensemblespreiding [kW] voordat exact wordt opgelost
+    perfect_foresight: bool = False     # hele jaar als één sparse LP (referentie/ondergrens) i.p.v. rollende MPC
+    decomposition_block: int = 0        # perfect foresight in blokken van zoveel uur (0 = één LP), bijv. 168
+    decomposition_overlap: int = 24     # overlap van elk blok met het volgende [uur]
+    workers: int = 0                    # processen voor de blokken of de speculatie (0 = aantal cores)
+    speculative: bool = False           # los komende vensters vooraf op voor kandidaat-SOC's in werkprocessen
+    speculative_lookahead: int = 4      # aantal vensters dat vooruit wordt opgelost
+    speculative_buckets: int = 2        # kandidaten aan elke kant van de voorspelde SOC
+    speculative_bucket_width: float = 0.01  # afstand tussen twee kandidaat-SOC's (fractie)
+    adaptive_horizon: bool = False      # kies per venster de horizon (≤ prediction_window) uit goedkope indicatoren
+    horizon_min: int = 6                # kleinste horizon bij adaptive_horizon
+    horizon_step: int = 6               # stap tussen de toegestane horizonnen
+    horizon_price_tol: float = 1e-3     # prijsverschil [€/kWh] dat als vlak geldt
+    n_scenarios: int = 20               # vraag/PV-scenario's per venster (stochastic-backend)
+    scenario_load_sigma: float = 0.02   # standaardafwijking van de vraagruis [kW], zoals DataGenerator
+    scenario_cloud_range: tuple = (0.6, 1.0)  # bereik van de wolkenfactor voor PV, zoals DataGenerator
+    scenario_seed: int = 0              # seed voor het trekken van de scenario's
+    compare_deterministic: bool = False  # vergelijk met één scenario zonder ruis (zelfde netkosten-LP)
+    sensitivities: bool = False         # duale waarden per venster → marginale waarden per uur/jaar (sparse)
 
 
 def load_prices(csv_path: str, expected_length: int = 8760) -> pd.Series:
@@ -21,12 +21,28 @@ Functionaliteit:
 Gebruik:
     Start het script en volg de prompt om een scenario te kiezen.
 """
+import os
+import time
+from dataclasses import replace
+from functools import partial
 import numpy as np
 import pandas as pd
 from models.battery import Battery
 from models.pv import PVSystem
 from models.mpc_data import MPCInputData
-from mpc.controller import run_full_mpc
+from mpc.controller import MPCController
+from mpc.sparse_backend import SparseMPCController, DispatchLP, dispatch_result, STATUS_MAP
+from mpc.dp_controller import DPController
+from mpc.arbitrage import ArbitrageController
+from mpc.event_trigger import EventTriggeredController
+from mpc.hierarchical import HierarchicalController
+from mpc.solution_cache import CachedController
+from mpc.speculative import SpeculativeController
+from mpc.adaptive_horizon import AdaptiveHorizonController
+from mpc.stochastic import StochasticMPCController, ScenarioModel
+from mpc.decomposition import solve_decomposed
+from mpc.explicit import build_policy, ExplicitMPCController
+from mpc.surrogate import DecisionLogger, SurrogateModel, SurrogateController
 from data.data_loader import load_prices, load_temperature, SimulationOptions
 from data.date_generator import DataGenerator
 # from visualization.visualization import plot_results
@@ -117,6 +133,78 @@ scenario_lijst = [
 ]
 
 
+def build_controller(options, battery, sample_windows=None):
+    """
+    Bouwt de MPC-regelaar voor een scenario op basis van de simulatie-opties.
+
+    Parameters:
+    -----------
+    options : SimulationOptions
+        Gebruikt backend ('cvxpy', 'sparse', 'dp', 'explicit', 'surrogate', 'arbitrage' of 'stochastic'),
+        prediction_window, n_scenarios, scenario_load_sigma, scenario_cloud_range, scenario_seed, sensitivities,
+        mpc_mode, warm_start, dp_soc_points, dp_ramp_cap, move_blocking, scale_problem, surrogate_model,
+        surrogate_max_spread, adaptive_horizon, horizon_min, horizon_step en horizon_price_tol.
+    battery : Battery of None
+        Batterij van het scenario.
+    sample_windows : list[MPCInputData], optioneel
+        Voorbeeldvensters waaruit de expliciete tabel wordt opgebouwd (alleen 'explicit').
+
+    Returns:
+    --------
+    MPCController, SparseMPCController, DPController, ExplicitMPCController, SurrogateController,
+    ArbitrageController, StochasticMPCController of AdaptiveHorizonController
+        Regelaar met een solve(MPCInputData) -> MPCResult methode.
+    """
+    if options.adaptive_horizon:
+        if options.backend in ("explicit", "surrogate"):
+            raise ValueError(f"adaptive_horizon werkt niet met de {options.backend}-backend (vaste vensterlengte).")
+        # Eén regelaar per gekozen horizon, met verder dezelfde opties
+        fixed = replace(options, adaptive_horizon=False)
+        return AdaptiveHorizonController(
+            lambda horizon: build_controller(replace(fixed, prediction_window=horizon), battery),
+            battery, options.prediction_window, horizon_min=options.horizon_min,
+            horizon_step=options.horizon_step, price_tol=options.horizon_price_tol)
+    if options.move_blocking and options.backend != "cvxpy":
+        raise ValueError("Move blocking is alleen beschikbaar met de cvxpy-backend.")
+    if options.sensitivities and options.backend != "sparse":
+        raise ValueError("sensitivities (duale waarden) zijn alleen beschikbaar met de sparse-backend.")
+    if options.backend == "sparse":
+        return SparseMPCController(battery, options.prediction_window, mode=options.mpc_mode,
+                                   duals=options.sensitivities)
+    if options.backend == "explicit":
+        if not sample_windows:
+            raise ValueError("De explicit-backend heeft voorbeeldvensters nodig om de tabel op te bouwen.")
+        policy = build_policy(battery, options.prediction_window, sample_windows)
+        print(f"Expliciete MPC: {policy.n_regions} gebieden uit {len(sample_windows)} voorbeeldvensters")
+        fallback = SparseMPCController(battery, options.prediction_window, mode=options.mpc_mode)
+        return ExplicitMPCController(policy, fallback, battery, windows=sample_windows)
+    if options.backend == "surrogate":
+        if not options.surrogate_model:
+            raise ValueError("De surrogate-backend heeft een getraind model nodig (surrogate_model).")
+        model = SurrogateModel.load(options.surrogate_model)
+        fallback = SparseMPCController(battery, options.prediction_window, mode=options.mpc_mode)
+        return SurrogateController(model, fallback, battery, max_spread=options.surrogate_max_spread)
+    if options.backend == "arbitrage":
+        fallback = SparseMPCController(battery, options.prediction_window, mode=options.mpc_mode)
+        return ArbitrageController(battery, options.prediction_window, fallback=fallback)
+    if options.backend == "stochastic":
+        if battery is None:
+            # Zonder batterij is er geen beslissing om tegen onzekerheid af te dekken
+            return SparseMPCController(battery, options.prediction_window, mode=options.mpc_mode)
+        model = ScenarioModel(load_sigma=options.scenario_load_sigma, cloud_range=options.scenario_cloud_range)
+        return StochasticMPCController(battery, options.prediction_window, n_scenarios=options.n_scenarios,
+                                       model=model, seed=options.scenario_seed)
+    if options.backend == "dp":
+        return DPController(battery, options.prediction_window, n_soc=options.dp_soc_points,
+                            ramp_cap=options.dp_ramp_cap)
+    if options.backend == "cvxpy":
+        return MPCController(battery, options.prediction_window, mode=options.mpc_mode,
+                             warm_start=options.warm_start, blocking=options.move_blocking,
+                             scale=options.scale_problem)
+    raise ValueError(f"Onbekende backend '{options.backend}', kies 'cvxpy', 'sparse', 'dp', 'explicit', "
+                     f"'surrogate', 'arbitrage' of 'stochastic'.")
+
+
 def run_simulation(options):
     """
     Voert een dynamische simulatie uit van een energiebeheersysteem (EMS) met
@@ -133,6 +221,61 @@ def run_simulation(options):
         - prediction_window (int): horizonlengte voor MPC.
         - battery_capacity (float): capaciteit van de batterij in kWh.
         - n_pvpanels (int): aantal PV-panelen in het systeem.
+        - mpc_mode (str): 'milp' (standaard) of 'lp' (LP met MILP-terugval). Met PV laten de
+          stuurgewichten de LP-relaxatie overdag gelijktijdig laden en ontladen, zodat die
+          vensters alsnog als MILP worden opgelost; 'lp' loont vooral zonder PV.
+        - warm_start (bool): start elk MPC-venster vanuit de opgeschoven vorige oplossing (alleen Gurobi,
+          Xpress, OSQP en SCS gebruiken een startpunt; voor andere solvers volgt een waarschuwing).
+        - calibrate_solvers (bool): time de geïnstalleerde solvers vooraf en bewaar de snelste.
+        - backend (str): 'cvxpy', 'sparse' (scipy.sparse + HiGHS, zonder cvxpy), 'dp' (SOC-rooster-DP)
+          'explicit' (vooraf berekende tabel met online terugval), 'surrogate' (aangeleerd model) of
+          'arbitrage' (exacte stuksgewijs lineaire DP zonder solver) of 'stochastic' (één eerste actie
+          over n_scenarios getrokken vraag/PV-scenario's).
+        - dp_soc_points (int): Aantal SOC-roosterpunten voor de DP-backend.
+        - dp_ramp_cap (bool): begrens bij de DP-backend het vermogen op de ramp-limiet als die kan
+          binden (conservatief); False rekent met het maximale vermogen en negeert de ramp-limiet.
+        - move_blocking (tuple): (aantal, lengte)-paren voor grovere beslisstappen verder in de horizon.
+        - event_triggered (bool): hergebruik het vorige plan en los alleen opnieuw op bij een trigger.
+        - replan_min_horizon (int): minimaal resterende planstappen (0: de helft van de horizon).
+        - replan_input_tol (float): toegestane afwijking van de invoer t.o.v. het plan.
+        - replan_soc_tol (float): toegestane afwijking van de SOC t.o.v. het plan.
+        - solution_cache (bool): hergebruik eerste acties van vensters met gelijke gekwantiseerde invoer.
+        - cache_size (int): maximaal aantal oplossingen in de LRU-cache.
+        - cache_power_step, cache_price_step, cache_soc_step (float): kwantisatiestappen van de sleutel.
+        - hierarchical (bool): één plan per replan_every stappen met een uurlijkse SOC-correctie.
+        - replan_every (int): aantal stappen tussen twee dagplannen (vraagt prediction_window ≥ replan_every).
+        - compare_rolling (bool): draai na een hiërarchische simulatie dezelfde simulatie met de volledige
+          rollende MPC (elk uur een optimalisatie) en rapporteer het verschil in kosten en rekentijd.
+        - scale_problem (bool): schaal vermogens en prijzen naar orde 1 vóór het oplossen.
+        - explicit_samples (int): aantal voorbeeldvensters voor de tabel van de explicit-backend.
+        - decision_log (str): map waarin de (venster, eerste actie)-paren worden opgeslagen.
+        - surrogate_model (str): .npz-bestand met het getrainde model voor de surrogate-backend, te maken
+          met mpc.surrogate.train_surrogate() of python train_surrogate.py model.npz beslissingen_*.npz.
+        - surrogate_max_spread (float): grootste ensemblespreiding [kW] om het model te gebruiken.
+        - perfect_foresight (bool): los alle stappen op als één LP met perfecte voorspelling
+          (referentie en ondergrens voor de kosten) in plaats van rollende MPC.
+        - decomposition_block (int): kernlengte van de parallel opgeloste blokken (0 = één LP).
+        - decomposition_overlap (int): overlap van elk blok met het volgende [uur].
+        - workers (int): aantal processen voor de blokken of de speculatie (0 = aantal cores).
+        - speculative (bool): los komende vensters vooraf in werkprocessen op voor kandidaat-SOC's rond
+          de voorspelde SOC en neem bij de werkelijke SOC de passende of geïnterpoleerde oplossing.
+        - speculative_lookahead (int): aantal vensters dat vooruit wordt opgelost.
+        - speculative_buckets (int): aantal kandidaten aan elke kant van de voorspelde SOC.
+        - speculative_bucket_width (float): afstand tussen twee kandidaat-SOC's.
+        - adaptive_horizon (bool): kies per venster de horizon (tot prediction_window) uit prijsspreiding,
+          PV-overschot en SOC-ruimte.
+        - horizon_min, horizon_step (int): kleinste horizon en stapgrootte van de toegestane horizonnen.
+        - horizon_price_tol (float): prijsverschil [€/kWh] dat als vlak geldt bij de horizonkeuze.
+        - n_scenarios (int): aantal vraag/PV-scenario's van de stochastic-backend.
+        - scenario_load_sigma (float): standaardafwijking van de vraagruis in de scenario's [kW].
+        - scenario_cloud_range (tuple): bereik van de wolkenfactor voor PV in de scenario's.
+        - scenario_seed (int): seed voor het trekken van de scenario's.
+        - compare_deterministic (bool): draai na de stochastic-backend dezelfde simulatie met één
+          scenario zonder ruis (hetzelfde netkosten-LP op de voorspelling) en rapporteer het verschil
+          in kosten en rekentijd.
+        - sensitivities (bool): bereken per venster de duale waarden van een apart netkosten-LP (alleen
+          sparse-backend; niet van het MILP dat de dispatch bepaalt) en sla die van de eerste stap per
+          uur op. De som over de simulatie is een indicatie, geen jaarwaarde van extra capaciteit.
 
     Returns:
     --------
@@ -166,6 +309,7 @@ def run_simulation(options):
     """
 
     Np = options.prediction_window
+    started = time.perf_counter()
 
     print(f"Simuleer scenario: {options.name}- {options.description}")
     """Voert de volledige sliding-window MPC-simulatie uit."""
@@ -201,79 +345,247 @@ def run_simulation(options):
                                              market_prices=price_orig,
                                              loads=load
                                              )
-
-    # Resultatenopslag
-    grid_history = []
-    soc_history = []
-    degradation_history = []
-    pv_used_history = []
-    pv_available_history = []
-    pv_to_battery_history = []
-    pv_to_load_history = []
-    battery_to_load_history = []
-    adjusted_prices_total = np.zeros(options.steps - options.prediction_window)
-    # … na alle andere history‐lijsten …
-    p_charge_history = []
-    p_discharge_history = []
-    used_energy_total = 0.0
-
-    # Sliding-window loop
-    for t in tqdm(range(n_steps), desc="Simulatie voortgang"):
-        P_load = load[t:t + Np]
-        P_pv_avail = pv.power_output()[t:t + Np]
-        P_price = price_orig[t:t + Np]
-
-        P_price_adjusted = price_calculator.adjust_price(
-            market_prices=P_price,
-            loads=load[t:t+Np],
-            cumulative_init=np.sum(load[:t])
+    # Aangepaste prijs per uur voor de hele simulatie; elk venster is een slice
+    step_prices = price_calculator.year_prices()
+
+    if battery is None:
+        # Zonder batterij is het optimum gesloten: alle PV die de vraag dekt, de rest van het net.
+        # Eén gevectoriseerde berekening over het hele jaar in plaats van een LP per venster.
+        load_slice = load[:n_steps]
+        pv_avail = pv.power_output()[:n_steps]
+        pv_used = np.minimum(pv_avail, load_slice)
+        grid_power = load_slice - pv_used
+        adjusted_prices_total = step_prices[:n_steps]
+
+        # Geen batterijstromen; PV-naar-load volgt de uitvoer van MPCController zonder batterij
+        p_charge = np.zeros(n_steps)
+        p_discharge = np.zeros(n_steps)
+        pv_to_bat = np.zeros(n_steps)
+        pv_to_load = np.zeros(n_steps)
+        battery_to_load = np.zeros(n_steps)
+    elif options.perfect_foresight:
+        # Eén sparse LP over alle stappen met perfecte kennis van vraag, PV en prijs: een referentierun
+        # en ondergrens voor de netkosten van de rollende MPC (zonder stuurgewichten en degradatie)
+        year = MPCInputData(
+            P_load=load[:n_steps],
+            P_pv_available=pv.power_output()[:n_steps],
+            price=step_prices[:n_steps],
+            soc_init=battery.soc
         )
-        adjusted_prices_total[t] = P_price_adjusted[0]
-
-        input_data = MPCInputData(
-            P_load=P_load,
-            P_pv_available=P_pv_avail,
-            price=P_price_adjusted,
-            soc_init=battery.soc if battery else 0.0
-        )
-        result = run_full_mpc(input_data, battery)
-
+        start = time.perf_counter()
+        if options.decomposition_block:
+            # Overlappende blokken parallel oplossen, randvoorwaarden via master + Jacobi-iteratie
+            result, decomposition = solve_decomposed(battery, year,
+                                                     block=options.decomposition_block,
+                                                     overlap=options.decomposition_overlap,
+                                                     workers=options.workers or None)
+            print(f"Perfect foresight: {decomposition.blocks} blokken over {decomposition.workers} processen, "
+                  f"{decomposition.iterations} iteraties, "
+                  f"{decomposition.block_solves} blok-LP's ({time.perf_counter() - start:.1f} s), "
+                  f"status {result.status}")
+        else:
+            lp = DispatchLP(battery, n_steps, grid_cost_only=True)
+            lp.update(year)
+            res = lp.solve()
+            result = dispatch_result(lp, res.x, STATUS_MAP.get(res.status, "solver_error"), year)
+            print(f"Perfect foresight: {n_steps} stappen in één solve ({time.perf_counter() - start:.1f} s), "
+                  f"status {result.status}")
         if result.status != 'optimal':
-            print(f"[t={t}] ⚠️ Niet-optimaal!")
-            break
-
-        if battery:
-            step_used = float(result.U[2][0]) + float(result.U[4][0])
-            used_energy_total += step_used
-            battery.update_degradation(float(result.U[2][0]) + float(result.U[4][0]))
-            battery.soc = float(result.SOC[1])
-            soc_history.append(battery.soc)
+            raise RuntimeError(f"Perfect-foresight probleem niet optimaal opgelost: {result.status}")
+
+        adjusted_prices_total = np.asarray(year.price)
+        grid_power, p_charge, p_discharge, pv_used, pv_to_bat, pv_to_load = result.U
+        pv_avail = np.asarray(year.P_pv_available)
+        battery_to_load = p_discharge
+
+        # Degradatie achteraf langs het plan bijhouden, zoals in de rollende simulatie
+        soc_history = result.SOC[1:]
+        degradation_history = []
+        for t in range(n_steps):
+            battery.update_degradation(float(p_discharge[t]) + float(pv_to_bat[t]))
             degradation_history.append(battery.soc_max)
-
-        grid_history.append(result.U[0][0])
-        pv_used_history.append(result.U[3][0])
-        pv_available_history.append(P_pv_avail[0])
-
-        # Energie van PV naar batterij (per stap)
-        pv_to_battery_history.append(float(result.U[4][0]))
-        pv_to_load_history.append(float(result.U[5][0]))
-
-        # Energie van batterij naar load (per stap)
-        battery_to_load_history.append(float(result.U[2][0]))
-
-        # sla ook P_charge (U[1]) en P_discharge (U[2]) op
-        p_charge_history.append(float(result.U[1][0]))
-        p_discharge_history.append(float(result.U[2][0]))
-
-    # Converteer naar arrays voor terugkeer
-    p_charge      = np.array(p_charge_history)
-    p_discharge   = np.array(p_discharge_history)
-    grid_power = np.array(grid_history)
-    pv_used = np.array(pv_used_history)
-    pv_avail = np.array(pv_available_history)
-    pv_to_bat = np.array(pv_to_battery_history)
-    pv_to_load = np.array(pv_to_load_history)
-    battery_to_load = np.array(battery_to_load_history)
+        battery.soc = float(result.SOC[-1])
+    else:
+        sample_windows = None
+        if options.backend == "explicit":
+            # Voorbeeldvensters over het hele jaar met een willekeurige begin-SOC
+            rng = np.random.default_rng(0)
+            sample_steps = np.linspace(0, n_steps - 1, num=min(options.explicit_samples, n_steps), dtype=int)
+            sample_windows = [
+                MPCInputData(P_load=load[t:t + Np],
+                             P_pv_available=pv.window(t, Np),
+                             price=step_prices[t:t + Np],
+                             soc_init=rng.uniform(battery.soc_min, battery.soc_max))
+                for t in sample_steps
+            ]
+
+        def window(t, soc):
+            """MPC-venster vanaf tijdstap t met begin-SOC soc."""
+            return MPCInputData(
+                P_load=load[t:t + Np],
+                P_pv_available=pv.window(t, Np),
+                price=step_prices[t:t + Np],
+                soc_init=soc
+            )
+
+        # MPC-probleem één keer opbouwen voor dit scenario; per venster alleen parameters bijwerken
+        controller = build_controller(options, battery, sample_windows)
+
+        if options.calibrate_solvers and options.backend == "cvxpy":
+            # Kies per probleemtype de snelste solver op een aantal over het jaar gespreide vensters
+            sample_steps = np.linspace(0, n_steps - 1, num=min(8, n_steps), dtype=int)
+            sample_windows = [window(t, battery.soc) for t in sample_steps]
+            print("Solverkalibratie:")
+            controller.calibrate(sample_windows)
+
+        planner = controller
+        if options.speculative:
+            if options.solution_cache or options.event_triggered or options.hierarchical:
+                raise ValueError("speculative volgt de vensters één voor één en werkt niet samen met "
+                                 "solution_cache, event_triggered of hierarchical.")
+            if options.backend == "explicit":
+                raise ValueError("speculative werkt niet met de explicit-backend.")
+            # Werkprocessen lossen komende vensters vooraf op voor kandidaat-SOC's
+            controller = speculative = SpeculativeController(
+                planner, partial(build_controller, options), battery, window, n_steps,
+                lookahead=options.speculative_lookahead, buckets=options.speculative_buckets,
+                bucket_width=options.speculative_bucket_width, workers=options.workers or None)
+        if options.solution_cache:
+            if options.event_triggered or options.hierarchical:
+                raise ValueError("solution_cache geeft alleen eerste acties terug en werkt niet samen met "
+                                 "event_triggered of hierarchical.")
+            # Hergebruik oplossingen van vensters met dezelfde gekwantiseerde invoer
+            controller = cached = CachedController(planner, battery, maxsize=options.cache_size,
+                                                   power_step=options.cache_power_step,
+                                                   price_step=options.cache_price_step,
+                                                   soc_step=options.cache_soc_step)
+        if options.decision_log:
+            # Log (venster, eerste actie)-paren als trainingsdata voor het surrogaatmodel
+            controller = logger = DecisionLogger(controller, battery)
+        if options.event_triggered and options.hierarchical:
+            raise ValueError("Kies event_triggered of hierarchical, niet allebei.")
+        if options.hierarchical:
+            # Eén dagplan per replan_every stappen, tussendoor een SOC-correctie in gesloten vorm
+            controller = HierarchicalController(controller, battery, replan_every=options.replan_every)
+        if options.event_triggered:
+            # Event-triggered: alleen opnieuw oplossen als het vorige plan niet meer klopt
+            controller = EventTriggeredController(controller, battery,
+                                                  min_remaining=options.replan_min_horizon or max(1, Np // 2),
+                                                  input_tol=options.replan_input_tol,
+                                                  soc_tol=options.replan_soc_tol)
+
+        # Resultatenopslag
+        grid_history = []
+        soc_history = []
+        degradation_history = []
+        pv_used_history = []
+        pv_available_history = []
+        pv_to_battery_history = []
+        pv_to_load_history = []
+        battery_to_load_history = []
+        adjusted_prices_total = np.zeros(options.steps - options.prediction_window)
+        # … na alle andere history‐lijsten …
+        p_charge_history = []
+        p_discharge_history = []
+        used_energy_total = 0.0
+        dual_history = []
+
+        # Sliding-window loop; de werkprocessen van speculative ook bij een fout stoppen
+        try:
+            for t in tqdm(range(n_steps), desc="Simulatie voortgang"):
+                input_data = window(t, battery.soc)
+                P_pv_avail = input_data.P_pv_available
+                adjusted_prices_total[t] = input_data.price[0]
+                result = controller.solve(input_data)
+
+                if result.status != 'optimal':
+                    print(f"[t={t}] ⚠️ Niet-optimaal!")
+                    break
+
+                step_used = float(result.U[2][0]) + float(result.U[4][0])
+                used_energy_total += step_used
+                battery.update_degradation(float(result.U[2][0]) + float(result.U[4][0]))
+                battery.soc = float(result.SOC[1])
+                soc_history.append(battery.soc)
+                degradation_history.append(battery.soc_max)
+
+                grid_history.append(result.U[0][0])
+                pv_used_history.append(result.U[3][0])
+                pv_available_history.append(P_pv_avail[0])
+
+                # Energie van PV naar batterij (per stap)
+                pv_to_battery_history.append(float(result.U[4][0]))
+                pv_to_load_history.append(float(result.U[5][0]))
+
+                # Energie van batterij naar load (per stap)
+                battery_to_load_history.append(float(result.U[2][0]))
+
+                # sla ook P_charge (U[1]) en P_discharge (U[2]) op
+                p_charge_history.append(float(result.U[1][0]))
+                p_discharge_history.append(float(result.U[2][0]))
+
+                if options.sensitivities:
+                    # Marginale waarden van de toegepaste (eerste) stap; NaN als de regelaar ze niet gaf
+                    dual_history.append({key: float(values[0]) for key, values in result.duals.items()}
+                                        if result.duals is not None else {})
+        finally:
+            if options.speculative:
+                speculative.close()
+
+        if options.speculative:
+            speculation = speculative.speculation
+            print(f"Speculatief: {speculation.hits} treffers, {speculation.interpolated} geïnterpoleerd, "
+                  f"{speculation.misses} lokaal opgelost ({speculation.submitted} taken ingediend)")
+        if options.adaptive_horizon:
+            chosen = planner.horizon
+            print(f"Adaptieve horizon: gemiddeld {chosen.mean:.1f} van {Np} stappen, verdeling "
+                  f"{dict(sorted(chosen.counts.items()))}")
+        if options.solution_cache:
+            cache = cached.cache
+            print(f"Oplossingscache: {cache.hits} treffers, {cache.misses} missers "
+                  f"(hit rate {cache.hit_rate:.1%}), {cache.repairs} gerepareerd, {cache.evictions} verwijderd")
+        if options.hierarchical:
+            hierarchy = controller.hierarchy
+            print(f"Hiërarchisch: {hierarchy.plans} dagplannen, {hierarchy.corrections} uurcorrecties "
+                  f"(grootste SOC-afwijking {hierarchy.max_soc_deviation:.2e})")
+        if options.event_triggered:
+            triggers = controller.triggers
+            print(f"Event-triggered: {triggers.solves} vensters opgelost, {triggers.skipped} overgeslagen "
+                  f"(redenen: {triggers.reasons})")
+        if options.backend == "explicit":
+            lookups = planner.lookups
+            print(f"Expliciete MPC: {lookups.hits} uit de tabel, online: {lookups.outside} buiten de tabel, "
+                  f"{lookups.simultaneous} gelijktijdig laden/ontladen, {lookups.drift} door degradatie; "
+                  f"tabel {lookups.rebuilds}x opnieuw opgebouwd")
+        if options.backend == "arbitrage":
+            arbitrage = planner.arbitrage
+            print(f"Arbitrage-solver: {arbitrage.solved} vensters zonder solver, {arbitrage.fallbacks} doorgegeven "
+                  f"(max. {arbitrage.max_pieces} stukken per waardefunctie)")
+        if options.backend == "surrogate":
+            print(f"Surrogaatmodel: {planner.usage.predicted} voorspeld, {planner.usage.fallbacks} exact opgelost")
+        if options.decision_log:
+            safe_name = options.name.strip().replace(":", "").replace(" ", "_")
+            log_path = os.path.join(options.decision_log, f"beslissingen_{safe_name}.npz")
+            logger.save(log_path)
+            print(f"{len(logger.actions)} beslissingen gelogd in {log_path}")
+        if hasattr(planner, "stats"):
+            print(f"MPC-vensters: {planner.stats.lp} als LP, {planner.stats.milp} als MILP "
+                  f"({planner.stats.fallbacks} LP-oplossingen afgekeurd)")
+            for solver in planner.stats.solves:
+                print(f"  {solver}: gem. {planner.stats.iterations_per_solve(solver):.1f} iteraties per solve")
+        if hasattr(planner, "problem_sizes"):
+            for problem_type, size in planner.problem_sizes().items():
+                print(f"  {problem_type}: {size['variables']} variabelen, {size['constraints']} constraints per venster")
+
+        # Converteer naar arrays voor terugkeer
+        p_charge      = np.array(p_charge_history)
+        p_discharge   = np.array(p_discharge_history)
+        grid_power = np.array(grid_history)
+        pv_used = np.array(pv_used_history)
+        pv_avail = np.array(pv_available_history)
+        pv_to_bat = np.array(pv_to_battery_history)
+        pv_to_load = np.array(pv_to_load_history)
+        battery_to_load = np.array(battery_to_load_history)
 
     # Zorg dat soc_kwh en soc_max_vals altijd de juiste lengte krijgen:
     if battery:
@@ -308,12 +620,57 @@ def run_simulation(options):
     df['grid_to_bat [kW]'] = (df['p_charge [kW]'] - df['pv_to_bat [kW]']).clip(lower=0)
     df['grid_to_load [kW]'] = df['grid_power [kW]'] - df['grid_to_bat [kW]']
 
+    if options.sensitivities and battery and not options.perfect_foresight:
+        # Marginale waarden per uur en opgeteld over de simulatie. Het zijn de duale waarden van de
+        # eerste stap van elk venster uit het netkosten-LP (zie dispatch_duals): de som is geen
+        # jaarwaarde van extra capaciteit, want die verandert ook alle latere beslissingen.
+        duals = pd.DataFrame(dual_history, columns=["soc_max", "soc_min", "power_max_charge",
+                                                    "power_max_discharge", "pv_available"])
+        df['mv_capacity_top [€/kWh]'] = duals["soc_max"].to_numpy()
+        df['mv_capacity_bottom [€/kWh]'] = duals["soc_min"].to_numpy()
+        df['mv_charge_power [€/kW]'] = duals["power_max_charge"].to_numpy()
+        df['mv_discharge_power [€/kW]'] = duals["power_max_discharge"].to_numpy()
+        df['mv_pv [€/kW]'] = duals["pv_available"].to_numpy()
+        panel_output = replace(pv, n_pvpanels=1).power_output()[:len(df)]
+        print(f"Som van de marginale waarden van de eerste stap over {duals['soc_max'].count()} vensters "
+              f"(netkosten-LP zonder binaire variabelen, per venster; geen jaarwaarde van een uitbreiding): "
+              f"ruimte boven soc_max € {duals['soc_max'].sum():.2f}/kWh, "
+              f"onder soc_min € {duals['soc_min'].sum():.2f}/kWh, laadvermogen € {duals['power_max_charge'].sum():.2f}/kW, "
+              f"ontlaadvermogen € {duals['power_max_discharge'].sum():.2f}/kW, "
+              f"PV-paneel € {(duals['pv_available'] * panel_output).sum():.2f}")
+
     # (Optioneel) voeg een tijdstap-kolom toe als index
     start = pd.Timestamp('2022-01-01 00:00')  # kies jouw startmoment
     idx = pd.date_range(start, periods=n_steps, freq='h')
     df.index = idx
     df.index.name = 'timestamp'
 
+    if options.backend == "stochastic" and options.compare_deterministic:
+        # Referentie met dezelfde netkosten-LP op alleen de voorspelling (één scenario zonder ruis),
+        # zodat het verschil alleen het effect van het afdekken over scenario's is
+        elapsed = time.perf_counter() - started
+        reference_started = time.perf_counter()
+        reference = run_simulation(replace(options, n_scenarios=1, scenario_load_sigma=0.0,
+                                           scenario_cloud_range=(1.0, 1.0), compare_deterministic=False))
+        reference_elapsed = time.perf_counter() - reference_started
+        cost = (df['grid_power [kW]'] * df['price [€/kWh]']).sum()
+        reference_cost = (reference['grid_power [kW]'] * reference['price [€/kWh]']).sum()
+        print(f"Stochastisch ({options.n_scenarios} scenario's): € {cost:.2f} in {elapsed:.1f} s; "
+              f"deterministisch: € {reference_cost:.2f} in {reference_elapsed:.1f} s "
+              f"({(cost / reference_cost - 1):+.2%} kosten, {elapsed / reference_elapsed:.1f}x rekentijd)")
+
+    if options.hierarchical and options.compare_rolling:
+        # Referentie: dezelfde regelaar elk uur over de volledige horizon (rollende MPC)
+        elapsed = time.perf_counter() - started
+        reference_started = time.perf_counter()
+        reference = run_simulation(replace(options, hierarchical=False, compare_rolling=False))
+        reference_elapsed = time.perf_counter() - reference_started
+        cost = (df['grid_power [kW]'] * df['price [€/kWh]']).sum()
+        reference_cost = (reference['grid_power [kW]'] * reference['price [€/kWh]']).sum()
+        print(f"Hiërarchisch (plan per {options.replan_every} stappen): € {cost:.2f} in {elapsed:.1f} s; "
+              f"rollende MPC: € {reference_cost:.2f} in {reference_elapsed:.1f} s "
+              f"({(cost / reference_cost - 1):+.2%} kosten, {elapsed / reference_elapsed:.2f}x rekentijd)")
+
     return df
 
 
@@ -1,18 +1,44 @@
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+# Bovengrenzen [kWh cumulatief verbruik] van de accijnsschijven en de bijbehorende CSV-kolommen (particulier)
+EXCISE_THRESHOLDS = (2900, 10000, 50000, 10_000_000, float('inf'))
+EXCISE_COLUMNS = ('0-2900', '2901-10000', '10001-50000', '50001-10mln', '>10mln_particulier')
+
+
+@lru_cache(maxsize=None)
+def _excise_rates(excise_csv: str, year: int) -> tuple:
+    """
+    Accijnstarieven van één jaar uit de CSV; per (bestand, jaar) maar één keer ingelezen.
+
+    Als het jaar niet in de CSV staat, wordt de laatste rij gebruikt.
+    """
+    df = pd.read_csv(excise_csv)
+    if year in df['Jaar'].values:
+        row = df[df['Jaar'] == year].iloc[0]
+    else:
+        row = df.iloc[-1]
+    return tuple(float(row[column]) for column in EXCISE_COLUMNS)
+
 
 class EnergyPriceCalculator:
     """
     Bereken de total cost inclusief energieprijzen, belastingen en accijnzen.
     Accijnzen worden ingelezen uit een CSV met historische tarieven.
+
+    year_prices() berekent de aangepaste prijs voor de hele reeks in één keer (cumulatief
+    verbruik via np.cumsum, schijf via np.searchsorted) en bewaart die; een venster is dan
+    een slice van dat array.
     """
     def __init__(
         self,
         taxes_tarif: float,
         market_prices,
         loads,
-        excise_csv: str = './data/energy_taxes_NL.csv'
+        excise_csv: str = './data/energy_taxes_NL.csv',
+        year: int = None
     ):
         # Netbeheerkosten (BTW e.d.)
         self.taxes_tarif = taxes_tarif
@@ -20,43 +46,56 @@ class EnergyPriceCalculator:
         self.market_prices = market_prices
         self.loads = loads
 
-        # Lees accijnzen in vanuit CSV
-        df = pd.read_csv(excise_csv)
-        # Bepaal huidig jaar; als niet beschikbaar, pak laatste rij
-        current_year = datetime.now().year
-        if current_year in df['Jaar'].values:
-            row = df[df['Jaar'] == current_year].iloc[0]
-        else:
-            row = df.iloc[-1]
-
-        # Zet drempels en bijbehorende tarieven (particulier) op
-        self.excise_thresholds = [2900, 10000, 50000, 10_000_000, float('inf')]
-        self.excise_rates = [
-            row['0-2900'],
-            row['2901-10000'],
-            row['10001-50000'],
-            row['50001-10mln'],
-            row['>10mln_particulier']
-        ]
+        # Accijnzen van het gevraagde (standaard huidige) jaar; als niet beschikbaar, de laatste rij
+        self.excise_thresholds = list(EXCISE_THRESHOLDS)
+        self.excise_rates = list(_excise_rates(excise_csv, year or datetime.now().year))
+        self._year_prices = None
 
     def adjust_price(self, market_prices, loads, cumulative_init: float):
         """
         Past marktprijs aan met accijnzen en belastingen per tijdstap.
+
+        Alle stappen van het venster krijgen het accijnstarief bij het cumulatieve verbruik
+        tot en met de eerste stap (cumulative_init + loads[0]).
+        """
+        load_t = loads[0] + cumulative_init if hasattr(loads, '__getitem__') else loads
+        excise = self.determine_energy_excise(load_t)
+        return (np.asarray(market_prices, dtype=float) + excise) * (1 + self.taxes_tarif)
+
+    def step_prices(self, market_prices, loads):
+        """
+        Aangepaste prijs per tijdstap over een volledige reeks, met het accijnstarief
+        op basis van het cumulatieve verbruik tot en met die tijdstap.
+
+        Komt per tijdstap t overeen met het eerste element van
+        adjust_price(market_prices[t:], loads[t:], cumulative_init=sum(loads[:t])).
+        """
+        excise = self.excise_for(np.cumsum(loads))
+        return (np.asarray(market_prices, dtype=float) + excise) * (1 + self.taxes_tarif)
+
+    def year_prices(self) -> np.ndarray:
+        """
+        Aangepaste prijs per tijdstap voor market_prices en loads van de calculator, één keer berekend.
+
+        Returns:
+            np.ndarray: Prijs [€/kWh] per tijdstap (alleen-lezen); een venster is prices[t:t + Np].
+        """
+        if self._year_prices is None:
+            prices = self.step_prices(self.market_prices, self.loads)
+            prices.flags.writeable = False
+            self._year_prices = prices
+        return self._year_prices
+
+    def excise_for(self, cumulative_loads) -> np.ndarray:
+        """
+        Accijnstarief (€/kWh) per element van een array met cumulatief verbruik.
         """
-        adj = []
-        for t, base_price in enumerate(market_prices):
-            load_t = loads[0] + cumulative_init if hasattr(loads, '__getitem__') else loads
-            excise = self.determine_energy_excise(load_t)
-            total_price = (base_price + excise) * (1 + self.taxes_tarif)
-            adj.append(total_price)
-        return pd.Series(adj, index=None)
+        tier = np.searchsorted(self.excise_thresholds, cumulative_loads, side='left')
+        rates = np.append(self.excise_rates, self.excise_rates[-1])   # fallback na de laatste schijf
+        return rates[tier]
 
     def determine_energy_excise(self, load: float) -> float:
         """
         Bepaalt het accijnstarief (€/kWh) op basis van (cumulatief) verbruik.
         """
-        for threshold, rate in zip(self.excise_thresholds, self.excise_rates):
-            if load <= threshold:
-                return rate
-        # Fallback
-        return self.excise_rates[-1]
+        return float(self.excise_for(load))
@@ -27,7 +27,10 @@ class MPCResult:
         U (np.ndarray): Beslissingsvariabelenmatrix: rijen zijn [P_grid, P_charge, P_discharge].
         SOC (np.ndarray): SOC-verloop over tijd (N+1 waarden).
         status (str): Optimalisatiestatus (bijv. 'optimal').
+        duals (dict): Marginale waarden per tijdstap (zie mpc.sparse_backend.dispatch_duals),
+            None als de regelaar ze niet berekent.
     """
     U: np.ndarray
     SOC: np.ndarray
     status: str
+    duals: dict = None
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import numpy as np
 
 
@@ -14,6 +14,10 @@ class PVSystem:
         panel_wp (float): Wattpiek van één zonnepaneel in Wp (standaard 450).
         n_pvpanels (int): Aantal zonnepanelen (standaard 6).
         max_irradiance (float): Maximale zoninstraling in W/m² (standaard 1000).
+
+    De opbrengst wordt één keer berekend en bewaard; het toekennen van een nieuw veld (ook
+    irradiance of temperature) maakt die ongeldig. Wijzigingen ín de arrays zelf worden niet
+    gezien: ken na zo'n wijziging het array opnieuw toe.
     """
     irradiance: np.ndarray
     temperature: np.ndarray
@@ -21,13 +25,37 @@ class PVSystem:
     panel_wp: float = 400.0   # Wattpiek per paneel
     n_pvpanels: int = 4       # Aantal panelen
     max_irradiance: float = 1000.0  # Maximale zoninstraling in W/m²
+    _output: np.ndarray = field(init=False, default=None, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        # Elke wijziging van een invoerveld maakt de bewaarde opbrengst ongeldig
+        object.__setattr__(self, name, value)
+        if name != "_output":
+            object.__setattr__(self, "_output", None)
 
     def power_output(self) -> np.ndarray:
         """
-        Berekent het PV-vermogen met temperatuurcorrectie.
+        Berekent het PV-vermogen met temperatuurcorrectie (één keer, daarna uit het geheugen).
+
+        Returns:
+            np.ndarray: Vermogen in kW per tijdstap (alleen-lezen).
+        """
+        if self._output is None:
+            output = self.n_pvpanels * self.panel_area * (self.panel_wp / 1000) * np.asarray(self.irradiance) \
+                * (1 - 0.005 * (np.asarray(self.temperature) - 25))   # resultaat in kW
+            output.flags.writeable = False
+            self._output = output
+        return self._output
+
+    def window(self, start: int, length: int) -> np.ndarray:
+        """
+        PV-vermogen van een venster als view op de bewaarde opbrengst, zonder kopie.
+
+        Args:
+            start (int): Eerste tijdstap.
+            length (int): Aantal tijdstappen.
 
         Returns:
-            np.ndarray: Vermogen in kW per tijdstap.
+            np.ndarray: Vermogen in kW voor tijdstappen start … start + length - 1 (alleen-lezen).
         """
-        return self.n_pvpanels * self.panel_area * (self.panel_wp / 1000) * self.irradiance * (1 - 0.005 * (self.temperature - 25))
-        # resultaat in kW
+        return self.power_output()[start:start + length]
@@ -0,0 +1,91 @@
+"""
+mpc/actions.py
+
+Gedeelde hulpfuncties om batterijacties om te zetten naar een MPCResult met dezelfde rijen als
+MPCController (P_grid, P_charge, P_discharge, P_pv_used, PV naar batterij, PV naar load).
+
+- flows_result() bouwt een volledig plan uit laad- en ontlaadvermogens (DP, arbitrage);
+- project_action() zet een voorspelde, gecachte of geïnterpoleerde eerste actie op de grenzen
+  van de eerste stap, en first_step_result() bouwt daar het resultaat van één stap uit
+  (surrogaat, oplossingscache, speculatief, hiërarchisch en stochastisch).
+"""
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+
+
+def flows_result(P_load, P_pv, P_charge, P_discharge, SOC, status) -> MPCResult:
+    """
+    Bouwt een MPCResult met dezelfde rijen als MPCController uit laad- en ontlaadvermogens,
+    met PV-gebruik zo groot mogelijk.
+    """
+    net = P_load + P_charge - P_discharge
+    P_pv_used = np.clip(np.minimum(P_pv, net), 0, None)
+    return MPCResult(
+        U=np.vstack([
+            net - P_pv_used,                 # P_grid
+            P_charge,
+            P_discharge,
+            P_pv_used,
+            np.minimum(P_charge, P_pv),      # PV naar batterij
+            np.minimum(P_pv_used, P_load)    # PV naar load
+        ]),
+        SOC=SOC,
+        status=status
+    )
+
+
+def project_action(action: np.ndarray, data: MPCInputData, battery: Battery) -> tuple:
+    """
+    Projecteert een voorspelde actie op de grenzen van de eerste MPC-stap.
+
+    Args:
+        action (np.ndarray): Voorspelde (P_charge, P_discharge, P_pv_used).
+        data (MPCInputData): Venster waarvoor de actie geldt.
+        battery (Battery): Batterij met actuele capaciteit en soc_max.
+
+    Returns:
+        tuple: (P_charge, P_discharge, P_pv_used) binnen vermogens- en SOC-grenzen, zonder
+        gelijktijdig laden en ontladen, met P_grid ≥ 0 en zoveel mogelijk PV-gebruik.
+    """
+    load = float(data.P_load[0])
+    pv = float(data.P_pv_available[0])
+    soc = float(data.soc_init)
+    alpha = battery.eta_ch / battery.capacity_kWh
+    beta = 1 / (battery.eta_dis * battery.capacity_kWh)
+
+    # Alleen de netto batterijstroom telt: laden en ontladen sluiten elkaar uit
+    net = float(action[0]) - float(action[1])
+    P_charge = min(max(net, 0.0), battery.power_max_charge, max(battery.soc_max - soc, 0.0) / alpha)
+    P_discharge = min(max(-net, 0.0), battery.power_max_discharge, max(soc - battery.soc_min, 0.0) / beta,
+                      load)   # niet terugleveren aan het net
+    # Prijzen zijn positief, dus elke kWh PV die de vraag of het laden dekt is goedkoper dan
+    # netstroom: de voorspelde P_pv_used wordt aangevuld tot de grootste toelaatbare waarde
+    P_pv_used = min(pv, load + P_charge - P_discharge)
+    return P_charge, P_discharge, P_pv_used
+
+
+def first_step_result(data: MPCInputData, battery: Battery, P_charge: float, P_discharge: float,
+                      P_pv_used: float) -> MPCResult:
+    """
+    Bouwt een MPCResult voor alleen de eerste stap (U 6×1, SOC 2 waarden) met dezelfde rijen
+    als MPCController.
+    """
+    load = float(data.P_load[0])
+    pv = float(data.P_pv_available[0])
+    soc = float(data.soc_init)
+    soc_next = soc + battery.eta_ch / battery.capacity_kWh * P_charge \
+        - P_discharge / (battery.eta_dis * battery.capacity_kWh)
+    return MPCResult(
+        U=np.array([
+            [load - P_pv_used + P_charge - P_discharge],   # P_grid
+            [P_charge],
+            [P_discharge],
+            [P_pv_used],
+            [min(P_charge, pv)],                          # PV naar batterij
+            [min(P_pv_used, load)]                        # PV naar load
+        ]),
+        SOC=np.array([soc, soc_next]),
+        status="optimal"
+    )
@@ -0,0 +1,177 @@
+"""
+mpc/adaptive_horizon.py
+
+Voorspellingshorizon per venster kiezen op basis van goedkope indicatoren.
+
+Een vlakke winternacht heeft geen 24 uur vooruitblik nodig, een avond met een prijspiek wel.
+required_horizon() bepaalt over het maximale venster tot waar vooruitkijken nog iets oplevert:
+- prijsspreiding: de laatste stap j waarop ontladen meer oplevert dan eerder laden kost,
+  price[j]·eta_ch·eta_dis > min(price[:j]) + price_tol;
+- opgeslagen energie (SOC boven soc_min): de eerste stap met (bijna) de hoogste prijs, waar die
+  energie het meest waard is;
+- PV-overschot met ruimte in de batterij (SOC onder soc_max): de laatste stap met pv > vraag.
+AdaptiveHorizonController rondt die lengte naar boven af op een rooster van horizonnen
+(horizon_min, horizon_min + horizon_step, …, max_horizon) en lost het ingekorte venster op met
+een regelaar voor die horizon. Regelaars worden per horizon één keer (lui) opgebouwd.
+"""
+from dataclasses import dataclass, field, fields, is_dataclass
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+
+
+def required_horizon(data: MPCInputData, battery: Battery, price_tol: float = 1e-3) -> int:
+    """
+    Aantal stappen vooruit dat voor dit venster nog invloed heeft op de beslissing.
+
+    Args:
+        data (MPCInputData): Venster over de maximale horizon
+        battery (Battery): Batterij (None zonder batterij)
+        price_tol (float): Prijsverschil [€/kWh] dat als vlak wordt beschouwd
+
+    Returns:
+        int: Benodigde horizon (minstens 1, hooguit de lengte van het venster).
+    """
+    if battery is None:
+        return 1
+    price = np.asarray(data.price, dtype=float)
+    load = np.asarray(data.P_load, dtype=float)
+    pv = np.asarray(data.P_pv_available, dtype=float)
+    soc = float(data.soc_init)
+    needed = 1
+
+    # Prijsspreiding: laatste stap waarop laden-en-later-ontladen nog loont
+    cheapest_before = np.minimum.accumulate(price)[:-1]
+    profitable = np.flatnonzero(price[1:] * battery.eta_ch * battery.eta_dis > cheapest_before + price_tol)
+    if profitable.size:
+        needed = max(needed, int(profitable[-1]) + 2)
+
+    # Opgeslagen energie: vooruitkijken tot de (eerste) prijspiek
+    if soc > battery.soc_min + 1e-6:
+        needed = max(needed, int(np.argmax(price >= price.max() - price_tol)) + 1)
+
+    # PV-overschot dat de batterij nog kan opnemen
+    if soc < battery.soc_max - 1e-6:
+        surplus = np.flatnonzero(pv > load)
+        if surplus.size:
+            needed = max(needed, int(surplus[-1]) + 1)
+
+    return needed
+
+
+def _combine(values: list):
+    """Telt stats-dataclasses van meerdere regelaars op (max_*-velden: maximum, dicts: per sleutel)."""
+    combined = type(values[0])()
+    for f in fields(combined):
+        parts = [getattr(value, f.name) for value in values]
+        if isinstance(parts[0], dict):
+            merged = {}
+            for part in parts:
+                for key, count in part.items():
+                    merged[key] = merged.get(key, 0) + count
+            setattr(combined, f.name, merged)
+        elif f.name.startswith("max_"):
+            setattr(combined, f.name, max(parts))
+        else:
+            setattr(combined, f.name, sum(parts))
+    return combined
+
+
+@dataclass
+class HorizonStats:
+    """
+    Gekozen horizonnen van de adaptieve regelaar.
+
+    Attributen:
+        history (list): Gekozen horizon per venster.
+        counts (dict): Aantal vensters per horizon.
+    """
+    history: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+
+    def record(self, horizon: int):
+        """Legt de gekozen horizon van één venster vast."""
+        self.history.append(horizon)
+        self.counts[horizon] = self.counts.get(horizon, 0) + 1
+
+    @property
+    def mean(self) -> float:
+        return float(np.mean(self.history)) if self.history else 0.0
+
+
+class AdaptiveHorizonController:
+    """
+    Kiest per venster de horizon en lost het ingekorte venster op met een regelaar voor die lengte.
+
+    Tellers van de onderliggende regelaars (zoals stats) zijn als opgetelde attributen beschikbaar.
+
+    Attributen:
+        factory: Functie factory(horizon) die een regelaar met solve(MPCInputData) bouwt.
+        battery (Battery): Batterij (None zonder batterij).
+        max_horizon (int): Lengte van de aangeleverde vensters.
+        horizons (list[int]): Toegestane horizonnen, oplopend.
+        price_tol (float): Prijsverschil [€/kWh] dat als vlak wordt beschouwd.
+        horizon (HorizonStats): Gekozen horizon per venster.
+    """
+
+    def __init__(self, factory, battery: Battery, max_horizon: int, horizon_min: int = 6,
+                 horizon_step: int = 6, price_tol: float = 1e-3):
+        if not 1 <= horizon_min <= max_horizon or horizon_step < 1:
+            raise ValueError("Vereist 1 ≤ horizon_min ≤ prediction_window en horizon_step ≥ 1.")
+        self.factory = factory
+        self.battery = battery
+        self.max_horizon = max_horizon
+        self.horizons = sorted(set(range(horizon_min, max_horizon, horizon_step)) | {max_horizon})
+        self.price_tol = price_tol
+        self.horizon = HorizonStats()
+        self._controllers = {}
+
+    def controller(self, horizon: int):
+        """Regelaar voor een horizon, bij het eerste gebruik opgebouwd."""
+        if horizon not in self._controllers:
+            self._controllers[horizon] = self.factory(horizon)
+        return self._controllers[horizon]
+
+    def choose(self, data: MPCInputData) -> int:
+        """Kleinste toegestane horizon die de benodigde vooruitblik dekt."""
+        needed = required_horizon(data, self.battery, self.price_tol)
+        return next(h for h in self.horizons if h >= min(needed, self.max_horizon))
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Lost het venster op over de gekozen horizon.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC over max_horizon stappen
+
+        Returns:
+            MPCResult: Plan over de gekozen horizon.
+        """
+        horizon = self.choose(data)
+        self.horizon.record(horizon)
+        return self.controller(horizon).solve(_truncate(data, horizon))
+
+    def calibrate(self, windows: list):
+        """Kalibreert de solverkeuze voor elke toegestane horizon op de ingekorte vensters."""
+        for horizon in self.horizons:
+            self.controller(horizon).calibrate([_truncate(window, horizon) for window in windows])
+
+    def __getattr__(self, name):
+        # Alleen voor attributen die niet op de regelaar zelf staan: tel stats-dataclasses op
+        if name.startswith("_"):
+            raise AttributeError(name)
+        values = [getattr(c, name) for c in self._controllers.values() if hasattr(c, name)]
+        if not values or not all(is_dataclass(value) for value in values):
+            raise AttributeError(name)
+        return _combine(values)
+
+
+def _truncate(data: MPCInputData, horizon: int) -> MPCInputData:
+    """Eerste horizon stappen van een venster."""
+    return MPCInputData(
+        P_load=data.P_load[:horizon],
+        P_pv_available=data.P_pv_available[:horizon],
+        price=data.price[:horizon],
+        soc_init=data.soc_init
+    )
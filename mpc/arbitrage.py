@@ -0,0 +1,277 @@
+"""
+mpc/arbitrage.py
+
+Exacte dispatch van één batterij zonder generieke LP/MILP-solver.
+
+Met lineaire prijzen, vaste rendementen en SOC- en vermogensgrenzen hangen de kosten van een
+stap alleen af van de SOC-verandering Δ. Met PV-gebruik zo groot mogelijk (prijzen > 0) zijn ze
+stuksgewijs lineair:
+- laden (Δ ≥ 0, P_charge = Δ/alpha): hellingen -WEIGHT_PV_CHARGE (PV-overschot),
+  prijs - WEIGHT_PV_CHARGE (PV naar de batterij, vraag uit het net) en prijs (netstroom);
+- ontladen (Δ ≤ 0, P_discharge = -Δ/beta, hooguit de vraag): hellingen
+  prijs·(1 + WEIGHT_DISCHARGE_PRICE) zolang het de netafname verlaagt en daarna alleen de
+  ontlaadbonus WEIGHT_DISCHARGE_PRICE·prijs (PV wordt afgeschakeld).
+Beide takken zijn convex; rond Δ = 0 alleen als de laatste ontlaadhelling niet groter is dan
+de eerste laadhelling. Bij een PV-overschot is dat niet zo: daar sluiten laden en ontladen
+elkaar uit, net als in het MILP van run_full_mpc.
+
+De waardefunctie V_t(SOC) wordt achterwaarts opgebouwd als minimum van convexe, stuksgewijs
+lineaire stukken. Voor convexe stapkosten is V_{t} = f_t □ V_{t+1} (inf-convolutie): de
+hellingen van beide functies worden samengevoegd in oplopende volgorde (de "slope trick",
+O(k log k) per stap). Een niet-convexe stap splitst elk stuk in een laad- en een ontlaadtak;
+stukken die overal door een ander stuk worden gedomineerd vallen weg. Vooruit wordt per stap
+het minimum over de breekpunten gekozen. Het resultaat is exact gelijk aan het MILP.
+
+Ramp rate beperkingen koppelen opeenvolgende vermogens en passen niet in deze structuur. Ze
+worden alleen ondersteund als ze niet kunnen binden (ramp ≥ grootst haalbaar vermogen per stap);
+anders, bij meer dan max_pieces stukken of niet-positieve prijzen valt ArbitrageController terug
+op een generieke regelaar.
+"""
+from bisect import bisect_right
+from dataclasses import dataclass
+from math import inf
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.actions import flows_result
+from mpc.controller import WEIGHT_PV_CHARGE, WEIGHT_DISCHARGE_PRICE
+from mpc.dp_controller import ramp_is_slack
+
+
+class _Piece:
+    """
+    Convexe, stuksgewijs lineaire functie met knooppunten x (oplopend) en waarden y.
+
+    De functies hebben maar een handvol knooppunten; gewone lijsten zijn daarvoor sneller dan NumPy.
+    """
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: list, y: list):
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def from_slopes(cls, start: float, value: float, segments) -> "_Piece":
+        """Bouwt een functie vanuit (lengte, helling)-segmenten met oplopende hellingen."""
+        x, y = [start], [value]
+        for length, slope in segments:
+            end = x[-1] + length
+            if end > x[-1]:
+                y.append(y[-1] + (end - x[-1]) * slope)
+                x.append(end)
+        return cls(x, y)
+
+    def segments(self) -> list:
+        """(lengte, helling) per segment."""
+        x, y = self.x, self.y
+        return [(x[i + 1] - x[i], (y[i + 1] - y[i]) / (x[i + 1] - x[i])) for i in range(len(x) - 1)]
+
+    def __call__(self, s: float) -> float:
+        """Waarde in s (binnen het domein), lineair tussen de knooppunten."""
+        x, y = self.x, self.y
+        i = bisect_right(x, s) - 1
+        if i >= len(x) - 1:
+            return y[-1]
+        if i < 0:
+            return y[0]
+        return y[i] + (y[i + 1] - y[i]) * (s - x[i]) / (x[i + 1] - x[i])
+
+    def restrict(self, lo: float, hi: float):
+        """Beperkt het domein tot [lo, hi]; None als de doorsnede leeg is."""
+        lo, hi = max(lo, self.x[0]), min(hi, self.x[-1])
+        if lo > hi:
+            return None
+        if lo == hi:
+            return _Piece([lo], [self(lo)])
+        inner = [i for i, xi in enumerate(self.x) if lo < xi < hi]
+        return _Piece([lo] + [self.x[i] for i in inner] + [hi],
+                      [self(lo)] + [self.y[i] for i in inner] + [self(hi)])
+
+
+def _infimal_convolution(f: _Piece, g: _Piece) -> _Piece:
+    """
+    h(s) = min_Δ f(Δ) + g(s + Δ) voor convexe f en g: spiegel f en voeg de hellingen samen.
+    """
+    mirrored = [(length, -slope) for length, slope in reversed(f.segments())]
+    # Volledig sorteren i.p.v. samenvoegen: afrondingsruis op zeer korte segmenten kan de
+    # volgorde binnen een invoer verstoren
+    merged = sorted(mirrored + g.segments(), key=lambda segment: segment[1])
+    return _Piece.from_slopes(g.x[0] - f.x[-1], f.y[-1] + g.y[0], merged)
+
+
+def _prune(pieces: list) -> list:
+    """Verwijdert stukken die op hun hele domein door één ander stuk worden gedomineerd."""
+    if len(pieces) <= 1:
+        return pieces
+    knots = sorted({xi for p in pieces for xi in p.x})
+    values = [[p(s) if p.x[0] <= s <= p.x[-1] else inf for s in knots] for p in pieces]
+    kept = []
+    for i, vi in enumerate(values):
+        dominated = False
+        for j, vj in enumerate(values):
+            if j != i and all(a <= b for a, b in zip(vj, vi)) and (j < i or any(a < b for a, b in zip(vj, vi))):
+                dominated = True
+                break
+        if not dominated:
+            kept.append(pieces[i])
+    return kept
+
+
+def stage_branches(load: float, pv: float, price: float, alpha: float, beta: float,
+                   power_max_charge: float, power_max_discharge: float) -> list:
+    """
+    Stapkosten als functie van Δ (SOC-verandering) als lijst van convexe takken.
+
+    Returns:
+        list[_Piece]: Eén convexe functie op [-beta·P_dis, alpha·P_ch], of een ontlaad- en een
+        laadtak als de kosten rond Δ = 0 niet convex zijn.
+    """
+    base = -price * min(pv, load)    # kosten bij Δ = 0 (prijs·(P_ch - P_dis - P_pv_used) + gewichten)
+
+    # Laden, in P_charge: PV-overschot, PV naar de batterij, netstroom (tot P_max)
+    surplus = min(max(pv - load, 0.0), power_max_charge)
+    pv_charge = min(pv, power_max_charge)
+    charge = _Piece.from_slopes(0.0, base, [
+        (alpha * surplus, -WEIGHT_PV_CHARGE / alpha),
+        (alpha * (pv_charge - surplus), (price - WEIGHT_PV_CHARGE) / alpha),
+        (alpha * (power_max_charge - pv_charge), price / alpha),
+    ])
+
+    # Ontladen, in P_discharge (hooguit de vraag): eerst netafname vervangen, daarna alleen de
+    # bonus. In Δ = -beta·P_discharge van links (maximaal ontladen) naar rechts (Δ = 0).
+    discharge_max = min(power_max_discharge, load)
+    replace = min(max(load - pv, 0.0), discharge_max)
+    bonus_only = discharge_max - replace
+    discharge = _Piece.from_slopes(
+        -beta * discharge_max,
+        base - price * (1 + WEIGHT_DISCHARGE_PRICE) * replace - price * WEIGHT_DISCHARGE_PRICE * bonus_only,
+        [(beta * bonus_only, price * WEIGHT_DISCHARGE_PRICE / beta),
+         (beta * replace, price * (1 + WEIGHT_DISCHARGE_PRICE) / beta)])
+
+    discharge_slopes = discharge.segments()
+    charge_slopes = charge.segments()
+    if not discharge_slopes or not charge_slopes or discharge_slopes[-1][1] <= charge_slopes[0][1]:
+        return [_Piece(discharge.x + charge.x[1:], discharge.y + charge.y[1:])]
+    return [discharge, charge]
+
+
+@dataclass
+class ArbitrageStats:
+    """
+    Tellers van de arbitrage-regelaar.
+
+    Attributen:
+        solved (int): Vensters exact opgelost zonder solver.
+        fallbacks (int): Vensters doorgegeven aan de generieke regelaar.
+        max_pieces (int): Grootste aantal stukken van een waardefunctie.
+    """
+    solved: int = 0
+    fallbacks: int = 0
+    max_pieces: int = 0
+
+
+class ArbitrageController:
+    """
+    Exacte batterijdispatch via stuksgewijs lineaire DP, met dezelfde interface als MPCController.
+
+    Attributen:
+        battery (Battery): Batterij.
+        N (int): Horizonlengte.
+        fallback: Generieke regelaar voor vensters buiten de structuur (None: geen terugval).
+        max_pieces (int): Grootste toegestane aantal stukken per waardefunctie.
+        arbitrage (ArbitrageStats): Tellers van opgeloste en doorgegeven vensters.
+    """
+
+    def __init__(self, battery: Battery, horizon: int, fallback=None, max_pieces: int = 64):
+        if battery is None or battery.capacity_kWh <= 0:
+            raise ValueError("ArbitrageController vraagt een batterij.")
+        self.battery = battery
+        self.N = horizon
+        self.fallback = fallback
+        self.max_pieces = max_pieces
+        self.arbitrage = ArbitrageStats()
+
+        if hasattr(fallback, "stats"):
+            self.stats = fallback.stats
+
+    def ramp_is_slack(self) -> bool:
+        """Geeft aan of de ramp-limieten niet kunnen binden bij de actuele batterij."""
+        return ramp_is_slack(self.battery)
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Lost één venster exact op, of geeft het door aan de terugvalregelaar.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Optimalisatie-uitvoer: U (6×N), SOC, status
+        """
+        P_load = np.asarray(data.P_load, dtype=float)
+        P_pv = np.asarray(data.P_pv_available, dtype=float)
+        price = np.asarray(data.price, dtype=float)
+
+        result = None
+        if self.ramp_is_slack() and np.all(price > 0):
+            result = self._solve(P_load, P_pv, price, float(data.soc_init))
+        if result is None:
+            if self.fallback is None:
+                raise ValueError("Venster valt buiten de structuur van de arbitrage-solver en er is geen terugval.")
+            self.arbitrage.fallbacks += 1
+            return self.fallback.solve(data)
+        self.arbitrage.solved += 1
+        return result
+
+    def _solve(self, P_load, P_pv, price, soc_init):
+        """Achterwaartse DP over stuksgewijs lineaire waardefuncties; None bij te veel stukken."""
+        battery = self.battery
+        N = len(P_load)
+        alpha = battery.eta_ch / battery.capacity_kWh
+        beta = 1 / (battery.eta_dis * battery.capacity_kWh)
+        soc_min, soc_max = battery.soc_min, battery.soc_max
+
+        branches = [stage_branches(float(P_load[t]), float(P_pv[t]), float(price[t]), alpha, beta,
+                                   battery.power_max_charge, battery.power_max_discharge) for t in range(N)]
+
+        # values[t] = stukken van V_t op [soc_min, soc_max]; geen eindwaarde (vrije eind-SOC)
+        values = [None] * (N + 1)
+        values[N] = [_Piece([soc_min, soc_max], [0.0, 0.0])]
+        for t in range(N - 1, 0, -1):
+            pieces = []
+            for f in branches[t]:
+                for g in values[t + 1]:
+                    h = _infimal_convolution(f, g).restrict(soc_min, soc_max)
+                    if h is not None:
+                        pieces.append(h)
+            values[t] = _prune(pieces)
+            if not values[t] or len(values[t]) > self.max_pieces:
+                return None
+            self.arbitrage.max_pieces = max(self.arbitrage.max_pieces, len(values[t]))
+
+        # Vooruit: per stap de beste tak, het beste stuk en Δ op een breekpunt
+        SOC = np.empty(N + 1)
+        SOC[0] = soc_init
+        for t in range(N):
+            s = float(SOC[t])
+            best_cost, best_delta = inf, None
+            for f in branches[t]:
+                for g in values[t + 1]:
+                    lo, hi = max(f.x[0], g.x[0] - s), min(f.x[-1], g.x[-1] - s)
+                    if lo > hi:
+                        continue
+                    for delta in [lo, hi] + [xi for xi in f.x if lo < xi < hi] + \
+                            [xi - s for xi in g.x if lo < xi - s < hi]:
+                        cost = f(delta) + g(s + delta)
+                        if cost < best_cost:
+                            best_cost, best_delta = cost, delta
+            if best_delta is None:
+                nan = np.full(N, np.nan)
+                return flows_result(P_load, P_pv, nan, nan, np.full(N + 1, np.nan), "infeasible")
+            SOC[t + 1] = min(max(s + best_delta, soc_min), soc_max)
+
+        step = np.diff(SOC)
+        P_charge = np.maximum(step, 0) / alpha
+        P_discharge = np.maximum(-step, 0) / beta
+        return flows_result(P_load, P_pv, P_charge, P_discharge, SOC, "optimal")
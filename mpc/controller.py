@@ -1,149 +1,537 @@
+from dataclasses import dataclass, field
+import warnings
 import cvxpy as cp
 import numpy as np
 from models.mpc_data import MPCInputData, MPCResult
 from models.battery import Battery
+from mpc.solvers import (SOLVERS, SELECTION_PATH, PROBLEM_NO_BATTERY, PROBLEM_LP, PROBLEM_MILP,
+                         SolverProfile, select_solver, calibrate)
 
+# Solvers die cvxpy met warm_start=True een startpunt geeft: Gurobi en Xpress vanuit Variable.value,
+# OSQP en SCS vanuit hun eigen vorige oplossing. De overige solvers negeren warm_start.
+WARM_START_SOLVERS = (cp.GUROBI, cp.XPRESS, cp.OSQP, cp.SCS)
 
-def run_full_mpc(data: MPCInputData, battery: Battery) -> MPCResult:
+# Kostengewichten: stimuleer laden met PV en beloon ontladen naar prijs
+WEIGHT_PV_CHARGE = 0.05         # stel een positieve waarde in om laden met PV te stimuleren
+WEIGHT_DISCHARGE_PRICE = 0.025  # stem af op gewenste agressiviteit
+
+# Grens [kW] waarboven laden en ontladen in dezelfde tijdstap als gelijktijdig gelden
+SIMULTANEOUS_TOL = 1e-6
+
+
+@dataclass
+class _BatteryProblem:
+    """Gecompileerd batterijprobleem met de variabelen die nodig zijn voor de uitvoer."""
+    problem: cp.Problem
+    P_grid: cp.Expression       # vermogensbalans, geen aparte variabele
+    P_charge: cp.Expression     # uurlijks; bij move blocking B @ (blokvariabele)
+    P_discharge: cp.Expression
+    P_pv_used: cp.Variable
+    SOC: cp.Expression          # [soc_init, SOC_next]
+    decisions: tuple = ()       # (u_charge, u_discharge, P_pv_used, SOC_next) voor de warm start
+
+    def trajectories(self) -> dict:
+        """
+        Geeft de beslissingsvariabelen waarvan het verloop wordt onthouden voor een warm start.
+
+        Alleen de continue beslissingen: een opgeschoven binaire z kan cvxpy niet als waarde
+        aannemen en de hulpvariabelen van cvxpy staan niet in de tijdsindeling.
+        """
+        return {var: var.value for var in self.decisions if not var.attributes["boolean"]}
+
+    def size(self) -> dict:
+        """Aantal scalaire variabelen en constraints van het probleem (vóór canonicalisatie)."""
+        metrics = self.problem.size_metrics
+        return dict(variables=metrics.num_scalar_variables,
+                    constraints=metrics.num_scalar_eq_constr + metrics.num_scalar_leq_constr)
+
+
+def blocking_matrix(horizon: int, blocking) -> np.ndarray:
     """
-    Optimaliseert energieverdeling over volledige tijdshorizon (N tijdstappen).
-    Houdt rekening met:
-    - PV-afschakeling (P_pv_used ≤ P_pv_available)
-    - SOC-beperkingen op basis van actuele capaciteit
-    - Laad/ontlaadvermogenslimieten
-    - Ramp rate beperkingen voor P_charge en P_discharge
+    Bouwt de blokmatrix B voor move blocking: P = B @ u met één beslissing u per blok.
 
     Args:
-        data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
-        battery (Battery): Batterijparameters
+        horizon (int): Aantal uurlijkse tijdstappen N.
+        blocking (tuple): (aantal, lengte)-paren, bijv. ((6, 1), (4, 3), (5, 6)) voor 6 blokken
+            van 1 uur, dan 4 van 3 uur en 5 van 6 uur. Als het schema korter is dan de horizon
+            wordt de laatste bloklengte herhaald; het laatste blok wordt afgekapt op N.
 
     Returns:
-        MPCResult: Optimalisatie-uitvoer: U (4×N), SOC, status
+        np.ndarray: N×M-matrix met B[t, k] = 1 als uur t in blok k valt.
+    """
+    lengths = [length for count, length in blocking for _ in range(count)]
+    if not lengths or any(length < 1 for length in lengths):
+        raise ValueError(f"Ongeldig blokschema {blocking}: geef (aantal, lengte)-paren met lengte ≥ 1.")
+    while sum(lengths) < horizon:
+        lengths.append(lengths[-1])
+
+    block_of_step = np.repeat(np.arange(len(lengths)), lengths)[:horizon]
+    B = np.zeros((horizon, block_of_step[-1] + 1))
+    B[np.arange(horizon), block_of_step] = 1.0
+    return B
+
+
+def _shift(values: np.ndarray) -> np.ndarray:
+    """Schuift een traject één tijdstap op en vult de staart aan met de laatste waarde."""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 0 or values.size < 2:
+        return values
+    return np.concatenate([values[1:], values[-1:]])
+
+
+@dataclass
+class SolveStats:
+    """
+    Telt hoe vensters zijn opgelost.
+
+    Attributen:
+        lp (int): Aantal vensters opgelost als zuiver LP.
+        milp (int): Aantal vensters opgelost als MILP (direct of als terugval).
+        fallbacks (int): Aantal LP-oplossingen afgekeurd wegens gelijktijdig laden en ontladen.
+        solves (dict): Aantal solveraanroepen met bekend aantal iteraties, per solver.
+        iterations (dict): Totaal aantal solveriteraties, per solver.
     """
-    if battery is None or battery.capacity_kWh == 0:
-        # Simulatie zonder batterij
-        N = len(data.P_load)
-        P_grid = cp.Variable(N)
+    lp: int = 0
+    milp: int = 0
+    fallbacks: int = 0
+    solves: dict = field(default_factory=dict)
+    iterations: dict = field(default_factory=dict)
+
+    def iterations_per_solve(self, solver: str) -> float:
+        """Gemiddeld aantal iteraties per aanroep van een solver."""
+        n = self.solves.get(solver, 0)
+        return self.iterations.get(solver, 0) / n if n else 0.0
+
+    def record(self, problem: cp.Problem):
+        """Telt de iteraties van de laatste oplossing van een probleem mee."""
+        solver_stats = problem.solver_stats
+        if solver_stats is None or solver_stats.num_iters is None:
+            return
+        self.record_iterations(solver_stats.solver_name, solver_stats.num_iters)
+
+    def record_iterations(self, solver: str, num_iters: int):
+        """Telt één solveraanroep met het gegeven aantal iteraties mee."""
+        self.solves[solver] = self.solves.get(solver, 0) + 1
+        self.iterations[solver] = self.iterations.get(solver, 0) + int(num_iters)
+
+
+class MPCController:
+    """
+    Herbruikbare MPC-regelaar die het optimalisatieprobleem één keer opbouwt per
+    (batterij, horizon)-combinatie en het daarna per venster opnieuw oplost.
+
+    Alle venster-afhankelijke invoer (P_load, P_pv_available, prijs en begin-SOC) is
+    als DPP-conforme cp.Parameter in het probleem opgenomen, net als de door degradatie
+    veranderende batterijgrootheden (alpha, beta en soc_max). Per venster worden alleen
+    de parameterwaarden bijgewerkt, zodat cvxpy de canonicalisatie maar één keer uitvoert.
+
+    Modi (alleen relevant met batterij):
+        'milp': elk venster als MILP met binaire z oplossen (standaard ECOS_BB).
+        'lp':   eerst de LP-relaxatie zonder z oplossen met een continue solver; alleen
+                als die oplossing gelijktijdig laadt en ontlaadt wordt het venster
+                opnieuw als MILP opgelost. Een LP-oplossing zonder gelijktijdig laden en
+                ontladen is toelaatbaar voor het MILP en dus ook daarvoor optimaal.
+                Met PV belonen WEIGHT_PV_CHARGE en WEIGHT_DISCHARGE_PRICE gelijktijdig laden
+                en ontladen, zodat vensters met PV vrijwel altijd op het MILP terugvallen.
+
+    Warm start (optioneel):
+        Opeenvolgende vensters overlappen in N-1 stappen. Met warm_start=True worden de
+        trajecten van de continue beslissingsvariabelen uit het vorige venster één
+        stap opgeschoven (staart aangevuld met de laatste waarde), als Variable.value gezet
+        en wordt met warm_start=True opgelost (de ondersteunde weg van cvxpy). Gurobi en
+        Xpress starten vanuit die waarden; OSQP en SCS vanuit hun eigen, niet opgeschoven
+        vorige oplossing. Voor andere solvers (ECOS_BB, Clarabel, HiGHS, ...) volgt een
+        waarschuwing, want die negeren de warm start. Gemeten (N=12, 200 vensters, LP-modus)
+        leverde de warm start met OSQP en SCS geen minder iteraties op.
+
+    Move blocking (optioneel):
+        Met een blokschema (zie blocking_matrix) zijn P_charge en P_discharge constant
+        binnen elk blok: P = B @ u met één beslissing per blok, en bij het MILP één binaire
+        z per blok. P_grid, P_pv_used en de SOC blijven uurlijks, zodat de PV-grenzen en
+        SOC-dynamiek per uur exact gelden. Ramp-limieten gelden tussen opeenvolgende blokken
+        (binnen een blok is de verandering nul). Zo kan een lange horizon (48–168 uur) met
+        ongeveer evenveel batterijbeslissingen worden doorgerekend als een korte uurlijkse.
+        Niet te combineren met warm_start: een opschuiving van één uur past niet op de blokken.
+
+    Schaling (optioneel):
+        Met scale=True worden alle vermogens (variabelen, P_load, P_pv_available en de
+        vermogens- en ramp-limieten) uitgedrukt in eenheden van power_scale, het grootste
+        laad-/ontlaadvermogen van de batterij, zodat ze van orde 1 zijn. alpha en beta
+        worden daarvoor met power_scale vermenigvuldigd; de SOC is al een fractie. De prijs
+        wordt per venster gedeeld door de grootste absolute prijs in dat venster, en het gewicht
+        van de PV-laadbeloning (een parameter) door dezelfde factor. Zo wordt de hele doelfunctie
+        met één positieve factor geschaald en blijft de optimale oplossing gelijk. De uitvoer
+        wordt weer naar kW teruggerekend. Het aantal solveriteraties staat in stats.
+
+    Solverkeuze:
+        Zonder expliciete solver wordt per (probleemtype, horizon) gekozen via mpc.solvers:
+        een opgeslagen kalibratie of anders de standaardvoorkeur. Zie calibrate().
+
+    Attributen:
+        battery (Battery): Batterij waarvoor het probleem is opgebouwd (None zonder batterij).
+        N (int): Lengte van de voorspellingshorizon.
+        mode (str): 'lp' of 'milp'.
+        solver (SolverProfile): Solver voor het probleem zonder batterij.
+        lp_solver (SolverProfile): Continue solver voor de LP-modus.
+        milp_solver (SolverProfile): Solver voor het MILP (direct of als terugval).
+        warm_start (bool): Start elk venster vanuit de opgeschoven vorige oplossing.
+        B (np.ndarray): Blokmatrix voor move blocking (None: elk uur een eigen beslissing).
+        power_scale (float): Referentievermogen [kW] van de schaling (1.0 zonder schaling).
+        stats (SolveStats): Tellers van LP-, MILP- en terugvaloplossingen en solveriteraties.
+    """
+
+    def __init__(self, battery: Battery, horizon: int, mode: str = "milp",
+                 lp_solver: str = None, milp_solver: str = None, warm_start: bool = False,
+                 selection_path: str = SELECTION_PATH, blocking=None, scale: bool = False):
+        if mode not in ("lp", "milp"):
+            raise ValueError(f"Onbekende modus '{mode}', kies 'lp' of 'milp'.")
+        if blocking and warm_start:
+            raise ValueError("Warm start werkt alleen met uurlijkse beslissingen, niet met move blocking.")
+
+        self.battery = battery
+        self.N = horizon
+        self.mode = mode
+        self.warm_start = warm_start
+        self.selection_path = selection_path
+        self.B = blocking_matrix(horizon, blocking) if blocking else None
+        self.scale = scale
+        self.power_scale = 1.0
+        self.stats = SolveStats()
+        self._previous = {}
+
+        # Venster-afhankelijke invoer
+        self.P_load = cp.Parameter(horizon, name="P_load")
+        self.P_pv_available = cp.Parameter(horizon, name="P_pv_available")
+        self.price = cp.Parameter(horizon, name="price")
+        self.soc_init = cp.Parameter(name="soc_init")
+
+        self._lp = None
+        self._milp = None
+
+        if battery is None or battery.capacity_kWh == 0:
+            self.has_battery = False
+            self.solver = select_solver(PROBLEM_NO_BATTERY, horizon, selection_path)
+            self._build_without_battery()
+        else:
+            self.has_battery = True
+            if scale:
+                self.power_scale = max(battery.power_max_charge, battery.power_max_discharge)
+            # Degradatie-afhankelijke batterijgrootheden
+            self.alpha = cp.Parameter(nonneg=True, name="alpha")
+            self.beta = cp.Parameter(nonneg=True, name="beta")
+            self.soc_max = cp.Parameter(name="soc_max")
+            # Gewicht van de PV-laadbeloning, met de prijs mee geschaald (alleen met scale=True)
+            self.pv_weight = cp.Parameter(nonneg=True, name="pv_weight") if scale else None
+            self.lp_solver = SOLVERS[lp_solver] if lp_solver else \
+                select_solver(PROBLEM_LP, horizon, selection_path)
+            self.milp_solver = SOLVERS[milp_solver] if milp_solver else \
+                select_solver(PROBLEM_MILP, horizon, selection_path)
+            if mode == "lp":
+                self._lp = self._build_with_battery(use_binary=False)
+            else:
+                self._milp = self._build_with_battery(use_binary=True)
+            self._check_warm_start()
+
+    def _build_without_battery(self):
+        """Bouwt het LP-probleem voor een simulatie zonder batterij."""
+        N = self.N
+        self.P_pv_used = cp.Variable(N)
+        self.P_grid = self.P_load - self.P_pv_used
+
+        # Vectorconstraints over de volledige horizon
+        constraints = [
+            self.P_pv_used >= 0,
+            self.P_pv_used <= self.P_pv_available,
+            self.P_grid >= 0,
+        ]
+
+        # Zonder de constante term prijs·P_load (product van parameters, niet DPP)
+        cost = -cp.sum(cp.multiply(self.price, self.P_pv_used))
+        self.problem = cp.Problem(cp.Minimize(cost), constraints)
+
+    def _build_with_battery(self, use_binary: bool) -> _BatteryProblem:
+        """
+        Bouwt het batterijprobleem met PV-afschakeling en ramp rate beperkingen.
+
+        Args:
+            use_binary (bool): True voor het MILP met binaire z (geen gelijktijdig laden en
+                ontladen), False voor de LP-relaxatie met alleen vermogensgrenzen.
+        """
+        N = self.N
+        battery = self.battery
+        n_moves = N if self.B is None else self.B.shape[1]
+        # Vermogensconstanten in dezelfde eenheid als de (eventueel geschaalde) variabelen
+        ramp_charge = battery.ramp_charge / self.power_scale
+        ramp_discharge = battery.ramp_discharge / self.power_scale
+        power_max_charge = battery.power_max_charge / self.power_scale
+        power_max_discharge = battery.power_max_discharge / self.power_scale
+
+        # Variabelen; laden en ontladen met één beslissing per (blok)stap
+        u_charge = cp.Variable(n_moves)
+        u_discharge = cp.Variable(n_moves)
         P_pv_used = cp.Variable(N)
-        constraints = []
+        SOC_next = cp.Variable(N)
+
+        if self.B is None:
+            P_charge, P_discharge = u_charge, u_discharge
+        else:
+            P_charge, P_discharge = self.B @ u_charge, self.B @ u_discharge
+
+        # Compacte formulering: P_grid (vermogensbalans) en SOC[0] (begin-SOC) zijn uitdrukkingen
+        # in plaats van variabelen met een gelijkheidsconstraint
+        P_grid = self.P_load - P_pv_used + P_charge - P_discharge
+        SOC = cp.hstack([cp.reshape(self.soc_init, (1,), order="C"), SOC_next])
 
-        for t in range(N):
+        # Constraints als vectoren over de volledige horizon (geen lus per tijdstap)
+        constraints = [
+            # Ramp rate beperkingen (|ΔP| ≤ limiet) als lineair paar, zonder hulpvariabelen van cp.abs
+            cp.diff(u_charge) <= ramp_charge,
+            cp.diff(u_charge) >= -ramp_charge,
+            cp.diff(u_discharge) <= ramp_discharge,
+            cp.diff(u_discharge) >= -ramp_discharge,
 
+            # Fysieke grenzen
+            P_grid >= 0,
+            u_charge >= 0,
+            u_discharge >= 0,
+
+            # PV-gebruik beperkingen
+            P_pv_used >= 0,
+            P_pv_used <= self.P_pv_available,
+
+            # SOC-dynamiek (gelijkheden blijven: uitschrijven als cumsum maakt de matrix vol)
+            SOC[1:] == SOC[:-1] + self.alpha * P_charge - self.beta * P_discharge,
+            SOC_next >= battery.soc_min,
+            SOC_next <= self.soc_max,
+        ]
+
+        if use_binary:
+            z = cp.Variable(n_moves, boolean=True)
             constraints += [
-                P_pv_used[t] >= 0,
-                P_pv_used[t] <= data.P_pv_available[t],
-                P_grid[t] >= 0,
-                P_grid[t] == data.P_load[t] - P_pv_used[t]
+                # Big-M constraints voor gelijktijdig laden en ontladen voorkomen
+                u_charge <= power_max_charge * z,
+                u_discharge <= power_max_discharge * (1 - z),
             ]
+        else:
+            constraints += [
+                u_charge <= power_max_charge,
+                u_discharge <= power_max_discharge,
+            ]
+
+        # Kosten: minimaliseer totale energiekosten en stimuleer laden met overtollige PV
+        # Stimuleer laden met overtollige PV
+        if self.scale:
+            # Het gewicht is een parameter (WEIGHT_PV_CHARGE / prijsschaal); via een hulpvariabele
+            # voor min(P_charge, P_pv_available), want parameter × cp.minimum met parameter is niet DPP
+            pv_charge = cp.Variable(N)
+            constraints += [pv_charge <= P_charge, pv_charge <= self.P_pv_available]
+            pv_charge_penalty = -cp.sum(pv_charge) * self.pv_weight
+        else:
+            pv_charge_penalty = -cp.sum(cp.minimum(P_charge, self.P_pv_available)) * WEIGHT_PV_CHARGE
+
+        discharge_reward = cp.sum(cp.multiply(P_discharge, self.price)) * WEIGHT_DISCHARGE_PRICE
 
-        cost = cp.sum(cp.multiply(data.price, P_grid))
+        # De constante term prijs·P_load valt weg (en is als product van parameters niet DPP)
+        grid_cost = cp.sum(cp.multiply(self.price, P_charge - P_discharge - P_pv_used))
+
+        cost = grid_cost \
+             + pv_charge_penalty \
+             - discharge_reward
+
+        # ======================= OPTIMALISATIEPROBLEEM DEFINITIE =======================
         problem = cp.Problem(cp.Minimize(cost), constraints)
-        problem.solve(solver=cp.ECOS_BB,
-                      verbose=False,
-                      max_iters=10000,
-                      abstol=1e-5,
-                      reltol=1e-5,
-                      feastol=1e-5
-                      )
+        return _BatteryProblem(problem, P_grid, P_charge, P_discharge, P_pv_used, SOC,
+                               decisions=(u_charge, u_discharge, P_pv_used, SOC_next))
 
-        return MPCResult(
-            U=np.vstack([
-                P_grid.value,
-                np.zeros(N),  # P_charge
-                np.zeros(N),  # P_discharge
-                P_pv_used.value,
-                np.zeros(N),
-                np.zeros(N)
-            ]),
-            SOC=np.zeros(N+1),
-            status=problem.status
-        )
+    def update_parameters(self, data: MPCInputData):
+        """
+        Zet de parameterwaarden voor het volgende venster.
 
-    N = len(data.P_load)
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+        """
+        if len(data.P_load) != self.N:
+            raise ValueError(f"Invoer heeft lengte {len(data.P_load)}, controller verwacht horizon {self.N}.")
 
-    # Efficiëntie-coëfficiënten op basis van actuele capaciteit
-    alpha = battery.eta_ch / battery.capacity_kWh
-    beta = 1 / (battery.eta_dis * battery.capacity_kWh)
+        price = np.asarray(data.price, dtype=float)
+        price_scale = (np.max(np.abs(price)) or 1.0) if self.scale else 1.0
 
-    # Variabelen
-    P_grid = cp.Variable(N)
-    P_charge = cp.Variable(N)
-    P_discharge = cp.Variable(N)
-    P_pv_used = cp.Variable(N)
-    SOC = cp.Variable(N + 1)
-    z = cp.Variable(N, boolean=True)
+        self.P_load.value = np.asarray(data.P_load, dtype=float) / self.power_scale
+        self.P_pv_available.value = np.asarray(data.P_pv_available, dtype=float) / self.power_scale
+        self.price.value = price / price_scale
+        self.soc_init.value = float(data.soc_init)
 
-    # Begin-SOC
-    constraints = [SOC[0] == data.soc_init]
+        if self.has_battery:
+            # Efficiëntie-coëfficiënten op basis van actuele capaciteit
+            self.alpha.value = self.battery.eta_ch / self.battery.capacity_kWh * self.power_scale
+            self.beta.value = self.power_scale / (self.battery.eta_dis * self.battery.capacity_kWh)
+            self.soc_max.value = self.battery.soc_max
+            if self.scale:
+                self.pv_weight.value = WEIGHT_PV_CHARGE / price_scale
 
-    # Constraints per tijdstap
-    for t in range(N):
-        if t > 0:
-            # Ramp rate beperkingen (ΔP ≤ limiet)
-            constraints += [
-                cp.abs(P_charge[t] - P_charge[t-1]) <= battery.ramp_charge,
-                cp.abs(P_discharge[t] - P_discharge[t-1]) <= battery.ramp_discharge,
-            ]
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Lost het gecompileerde probleem op voor één venster.
 
-        net_load = data.P_load[t] - P_pv_used[t] + P_charge[t] - P_discharge[t]
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
 
-        constraints += [
-            # Vermogensbalans
-            P_grid[t] == net_load,
+        Returns:
+            MPCResult: Optimalisatie-uitvoer: U (6×N), SOC, status
+        """
+        self.update_parameters(data)
+        N = self.N
 
-            # Fysieke grenzen
-            P_grid[t] >= 0,
-            P_charge[t] >= 0,
-            P_discharge[t] >= 0,
+        if not self.has_battery:
+            self.problem.solve(solver=self.solver.name, verbose=False, **self.solver.options)
+            self.stats.record(self.problem)
+            return MPCResult(
+                U=np.vstack([
+                    self.P_grid.value,
+                    np.zeros(N),  # P_charge
+                    np.zeros(N),  # P_discharge
+                    self.P_pv_used.value,
+                    np.zeros(N),
+                    np.zeros(N)
+                ]),
+                SOC=np.zeros(N+1),
+                status=self.problem.status
+            )
 
-            # PV-gebruik beperkingen
-            P_pv_used[t] >= 0,
-            P_pv_used[t] <= data.P_pv_available[t],
-
-            # SOC-dynamiek
-            SOC[t+1] == SOC[t] + alpha * P_charge[t] - beta * P_discharge[t],
-            SOC[t+1] >= battery.soc_min,
-            SOC[t+1] <= battery.soc_max,
-
-            # Big-M constraints voor gelijktijdig laden en ontladen voorkomen
-            P_charge[t] <= z[t] * battery.power_max_charge,
-            P_discharge[t] <= (1 - z[t]) * battery.power_max_discharge,
-            z[t] >= 0,
-            z[t] <= 1,
-        ]
+        if self.mode == "lp":
+            self._solve_formulation(self._lp, self.lp_solver)
+            if self._lp.problem.status == cp.OPTIMAL and not self._is_simultaneous(self._lp):
+                self.stats.lp += 1
+                return self._result(self._lp, data)
+            self.stats.fallbacks += 1
+
+        # MILP: direct (modus 'milp') of als terugval na een afgekeurde LP-oplossing
+        if self._milp is None:
+            self._milp = self._build_with_battery(use_binary=True)
+        self._solve_formulation(self._milp, self.milp_solver)
+        self.stats.milp += 1
+        return self._result(self._milp, data)
+
+    def problem_sizes(self) -> dict:
+        """
+        Aantal scalaire variabelen en constraints per opgebouwd probleem.
+
+        Returns:
+            dict: {probleemtype: {'variables': int, 'constraints': int}}
+        """
+        if not self.has_battery:
+            metrics = self.problem.size_metrics
+            return {PROBLEM_NO_BATTERY: dict(variables=metrics.num_scalar_variables,
+                                             constraints=metrics.num_scalar_eq_constr
+                                             + metrics.num_scalar_leq_constr)}
+        return {problem_type: formulation.size()
+                for problem_type, formulation in ((PROBLEM_LP, self._lp), (PROBLEM_MILP, self._milp))
+                if formulation is not None}
+
+    def calibrate(self, windows: list):
+        """
+        Kalibreert de solverkeuze voor de problemen van deze controller.
+
+        Elke geïnstalleerde, geschikte solver wordt getimed op de voorbeeldvensters; de snelste
+        die overal 'optimal' haalt wordt gebruikt en per (probleemtype, horizon) opgeslagen
+        in selection_path, zodat latere runs hem zonder kalibratie oppakken.
+
+        Args:
+            windows (list[MPCInputData]): Representatieve voorbeeldvensters.
+        """
+        if not self.has_battery:
+            self.solver = calibrate(self.problem, PROBLEM_NO_BATTERY, self.N,
+                                    self.update_parameters, windows, self.selection_path)
+            return
+
+        if self._lp is not None:
+            self.lp_solver = calibrate(self._lp.problem, PROBLEM_LP, self.N,
+                                       self.update_parameters, windows, self.selection_path)
+        # Ook in LP-modus: het MILP is de terugval
+        if self._milp is None:
+            self._milp = self._build_with_battery(use_binary=True)
+        self.milp_solver = calibrate(self._milp.problem, PROBLEM_MILP, self.N,
+                                     self.update_parameters, windows, self.selection_path)
+        self._check_warm_start()
+
+    def _check_warm_start(self):
+        """Waarschuwt als warm_start aan staat voor een solver die het startpunt negeert."""
+        if not self.warm_start:
+            return
+        solver = self.milp_solver if self.mode == "milp" else self.lp_solver
+        if solver.name not in WARM_START_SOLVERS:
+            warnings.warn(f"warm_start heeft geen effect voor {solver.name}; "
+                          f"alleen {', '.join(WARM_START_SOLVERS)} gebruiken een startpunt.",
+                          UserWarning, stacklevel=3)
+
+    def _solve_formulation(self, formulation: _BatteryProblem, solver: SolverProfile):
+        """Lost een batterijprobleem op, eventueel vanuit de opgeschoven vorige oplossing."""
+        warm = self.warm_start and self._apply_warm_start(formulation, solver.name)
+        formulation.problem.solve(solver=solver.name, warm_start=warm, verbose=False, **solver.options)
+        self.stats.record(formulation.problem)
 
-    # Kosten: minimaliseer totale energiekosten en stimuleer laden met overtollige PV
-    # Stimuleer laden met overtollige PV
-    weight_pv_charge = 0.05  # stel een positieve waarde in om laden met PV te stimuleren
-    pv_charge_penalty = -cp.sum(cp.minimum(P_charge, data.P_pv_available)) * weight_pv_charge
-
-    weight_discharge_price = 0.025  # stem af op gewenste agressiviteit
-    discharge_reward = cp.sum(cp.multiply(P_discharge, data.price)) * weight_discharge_price
-
-    cost = cp.sum(cp.multiply(data.price, P_grid)) \
-         + pv_charge_penalty \
-         - discharge_reward
-
-    # Optimalisatieprobleem
-    # ======================= OPTIMALISATIEPROBLEEM DEFINITIE =======================
-    problem = cp.Problem(cp.Minimize(cost), constraints)
-    problem.solve(solver=cp.ECOS_BB,
-                  verbose=False,
-                  max_iters=10000,
-                  abstol=1e-5,
-                  reltol=1e-5,
-                  feastol=1e-5)
-
-    # Output
-    return MPCResult(
-        U=np.vstack([
-            P_grid.value,
-            P_charge.value,
-            P_discharge.value,
-            P_pv_used.value,
-            np.minimum(P_charge.value, data.P_pv_available),  # PV naar batterij
-            np.minimum(P_pv_used.value, data.P_load)          # PV naar load
-        ]),
-        SOC=SOC.value,
-        status=problem.status
-    )
+        if self.warm_start and formulation.problem.status in (cp.OPTIMAL, cp.OPTIMAL_INACCURATE):
+            self._previous[id(formulation)] = {var: np.copy(values)
+                                               for var, values in formulation.trajectories().items()}
+
+    def _apply_warm_start(self, formulation: _BatteryProblem, solver: str) -> bool:
+        """
+        Zet de opgeschoven trajecten van het vorige venster als startpunt.
+
+        Returns:
+            bool: True als de solver een warm start kan gebruiken.
+        """
+        previous = self._previous.get(id(formulation))
+        if previous is None:
+            return False
+
+        for var, values in previous.items():
+            var.value = _shift(values)
+        return solver in WARM_START_SOLVERS
+
+    def _is_simultaneous(self, formulation: _BatteryProblem) -> bool:
+        """Controleert of de oplossing in enige tijdstap tegelijk laadt en ontlaadt."""
+        overlap = np.minimum(formulation.P_charge.value, formulation.P_discharge.value) * self.power_scale
+        return bool(np.any(overlap > SIMULTANEOUS_TOL))
+
+    def _result(self, formulation: _BatteryProblem, data: MPCInputData) -> MPCResult:
+        """Zet de oplossing van een batterijprobleem om naar een MPCResult (in kW)."""
+        P_charge = formulation.P_charge.value * self.power_scale
+        P_pv_used = formulation.P_pv_used.value * self.power_scale
+
+        # Output
+        return MPCResult(
+            U=np.vstack([
+                formulation.P_grid.value * self.power_scale,
+                P_charge,
+                formulation.P_discharge.value * self.power_scale,
+                P_pv_used,
+                np.minimum(P_charge, data.P_pv_available),  # PV naar batterij
+                np.minimum(P_pv_used, data.P_load)          # PV naar load
+            ]),
+            SOC=formulation.SOC.value,
+            status=formulation.problem.status
+        )
+
+
+def run_full_mpc(data: MPCInputData, battery: Battery, mode: str = "milp") -> MPCResult:
+    """
+    Optimaliseert energieverdeling over volledige tijdshorizon (N tijdstappen).
+    Houdt rekening met:
+    - PV-afschakeling (P_pv_used ≤ P_pv_available)
+    - SOC-beperkingen op basis van actuele capaciteit
+    - Laad/ontlaadvermogenslimieten
+    - Ramp rate beperkingen voor P_charge en P_discharge
+
+    Bouwt voor elke aanroep een nieuwe MPCController; gebruik bij een sliding window
+    liever één MPCController per scenario.
+
+    Args:
+        data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+        battery (Battery): Batterijparameters
+        mode (str): 'milp' (standaard) of 'lp' met MILP-terugval, zie MPCController.
+
+    Returns:
+        MPCResult: Optimalisatie-uitvoer: U (6×N), SOC, status
+    """
+    return MPCController(battery, len(data.P_load), mode=mode).solve(data)
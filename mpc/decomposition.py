@@ -0,0 +1,196 @@
+"""
+mpc/decomposition.py
+
+Tijdsdecompositie van het perfect-foresight probleem: het jaar in overlappende blokken,
+parallel opgelost in een procespool.
+
+Werkwijze:
+1. Een grof masterprobleem (DispatchLP op blokken van coarse_step uur, met opgeschaalde
+   vermogens- en ramp-limieten) geeft een eerste schatting van de SOC op elke bloklens.
+2. Elk blok (bijv. een week) wordt met een overlap (bijv. 24 uur) als los LP opgelost, met de
+   begin-SOC en het vermogen vlak vóór het blok (ramp-limieten) als randvoorwaarden. De overlap
+   zorgt dat de vrije eind-SOC het einde van de kern van het blok nauwelijks beïnvloedt.
+3. De randvoorwaarden worden overgenomen van het einde van de kern van het vorige blok en de
+   blokken waarvan de randvoorwaarde veranderde worden opnieuw opgelost (Jacobi-iteratie), tot
+   de randvoorwaarden minder dan tol veranderen. Het aan elkaar geplakte plan is dan continu.
+   Een blok dat nog zonder ramp-randvoorwaarde is opgelost hoeft niet opnieuw als zijn begin-SOC
+   gelijk bleef aan de masterschatting en zijn eerste vermogen al binnen de ramp-limieten van
+   het nieuwe vorige vermogen valt: de strengere grenzen laten dan dezelfde oplossing optimaal.
+   Blok b heeft na hoogstens b+1 rondes zijn definitieve randvoorwaarde, dus de iteratie eindigt
+   binnen het aantal blokken.
+"""
+from contextlib import nullcontext
+import copy
+from concurrent.futures import ProcessPoolExecutor
+import os
+from dataclasses import dataclass
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.sparse_backend import DispatchLP, dispatch_result, STATUS_MAP
+
+
+@dataclass
+class DecompositionStats:
+    """
+    Tellers van een gedecomponeerde oplossing.
+
+    Attributen:
+        blocks (int): Aantal blokken.
+        workers (int): Aantal processen waarover de blokken zijn verdeeld.
+        iterations (int): Aantal Jacobi-iteraties (rondes van bloksolves).
+        block_solves (int): Totaal aantal opgeloste blok-LP's.
+        boundary_change (float): Grootste verandering van de randvoorwaarden in de laatste ronde.
+    """
+    blocks: int = 0
+    workers: int = 1
+    iterations: int = 0
+    block_solves: int = 0
+    boundary_change: float = np.inf
+
+
+def coarse_boundaries(battery: Battery, data: MPCInputData, coarse_step: int) -> np.ndarray:
+    """
+    Lost een grof masterprobleem op met blokken van coarse_step uur.
+
+    Vraag en PV worden per blok opgeteld (kWh), de prijs gemiddeld. De vermogens- en ramp-
+    limieten van de batterij worden met coarse_step vermenigvuldigd, de SOC-dynamiek blijft gelijk.
+
+    Args:
+        battery (Battery): Batterij.
+        data (MPCInputData): Invoer voor de volledige periode.
+        coarse_step (int): Aantal uren per grove stap.
+
+    Returns:
+        np.ndarray: SOC-schatting voor elk uur 0..n (lineair geïnterpoleerd tussen de grove stappen).
+    """
+    n = len(data.P_load)
+    n_coarse = -(-n // coarse_step)
+    pad = n_coarse * coarse_step - n
+
+    def aggregate(values, reduce):
+        values = np.pad(np.asarray(values, dtype=float), (0, pad), mode="edge")
+        return reduce(values.reshape(n_coarse, coarse_step), axis=1)
+
+    coarse_battery = copy.copy(battery)
+    coarse_battery.power_max_charge *= coarse_step
+    coarse_battery.power_max_discharge *= coarse_step
+    coarse_battery.ramp_charge *= coarse_step
+    coarse_battery.ramp_discharge *= coarse_step
+
+    lp = DispatchLP(coarse_battery, n_coarse, grid_cost_only=True)
+    lp.update(MPCInputData(P_load=aggregate(data.P_load, np.sum),
+                           P_pv_available=aggregate(data.P_pv_available, np.sum),
+                           price=aggregate(data.price, np.mean),
+                           soc_init=data.soc_init))
+    res = lp.solve()
+    if res.x is None:
+        return np.full(n + 1, float(data.soc_init))
+    soc = res.x[lp.isoc]
+    return np.interp(np.arange(n + 1), np.arange(n_coarse + 1) * coarse_step, soc)
+
+
+def _solve_block(battery: Battery, data: MPCInputData, previous_power: tuple) -> MPCResult:
+    """
+    Lost één blok op; previous_power = (P_charge, P_discharge) vlak vóór het blok of None.
+    Op het hoogste niveau gedefinieerd zodat de procespool de functie kan picklen.
+    """
+    lp = DispatchLP(battery, len(data.P_load), grid_cost_only=True)
+    lp.update(data)
+    if previous_power is not None:
+        # Ramp rate beperkingen over de bloklens via de grenzen van het eerste vermogen
+        for index, power, ramp in ((lp.ic.start, previous_power[0], battery.ramp_charge),
+                                   (lp.id.start, previous_power[1], battery.ramp_discharge)):
+            lp.lb[index] = max(lp.lb[index], power - ramp)
+            lp.ub[index] = min(lp.ub[index], power + ramp)
+    res = lp.solve()
+    return dispatch_result(lp, res.x, STATUS_MAP.get(res.status, "solver_error"), data)
+
+
+def solve_decomposed(battery: Battery, data: MPCInputData, block: int = 168, overlap: int = 24,
+                     coarse_step: int = 4, workers: int = None, tol: float = 1e-6,
+                     max_iterations: int = None) -> tuple:
+    """
+    Lost de volledige periode op in overlappende blokken, parallel over een procespool.
+
+    Args:
+        battery (Battery): Batterij (capaciteit en soc_max gelden voor de hele periode).
+        data (MPCInputData): Invoer voor de volledige periode.
+        block (int): Kernlengte van een blok [uur].
+        overlap (int): Extra uren na de kern die wel worden opgelost maar niet gebruikt.
+        coarse_step (int): Uren per stap van het grove masterprobleem.
+        workers (int): Aantal processen (None: aantal cores; 1: zonder procespool).
+        tol (float): Convergentiegrens voor de verandering van SOC en vermogen op de bloklenzen.
+        max_iterations (int): Maximaal aantal Jacobi-iteraties (None: het aantal blokken, waarbinnen
+            de iteratie altijd convergeert).
+
+    Returns:
+        tuple: (MPCResult, DecompositionStats) met hetzelfde MPCResult als één monolithische solve.
+    """
+    if block < 1 or overlap < 0:
+        raise ValueError("block moet minstens 1 zijn en overlap mag niet negatief zijn.")
+
+    n = len(data.P_load)
+    starts = list(range(0, n, block))
+    workers = min(workers or os.cpu_count() or 1, len(starts))
+    stats = DecompositionStats(blocks=len(starts), workers=workers)
+    if max_iterations is None:
+        max_iterations = len(starts)
+
+    def block_data(b, soc_init):
+        s, e = starts[b], min(starts[b] + block + overlap, n)
+        return MPCInputData(P_load=np.asarray(data.P_load[s:e]),
+                            P_pv_available=np.asarray(data.P_pv_available[s:e]),
+                            price=np.asarray(data.price[s:e]),
+                            soc_init=soc_init)
+
+    # Randvoorwaarden per blok: (begin-SOC, (P_charge, P_discharge) vóór het blok)
+    guess = coarse_boundaries(battery, data, coarse_step)
+    boundaries = [(float(data.soc_init), None)] + [(float(guess[s]), None) for s in starts[1:]]
+    results = [None] * len(starts)
+    pending = list(range(len(starts)))
+
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+        while pending and stats.iterations < max_iterations:
+            args = [(battery, block_data(b, boundaries[b][0]), boundaries[b][1]) for b in pending]
+            solved = executor.map(_solve_block, *zip(*args)) if executor else [_solve_block(*a) for a in args]
+            for b, result in zip(pending, solved):
+                results[b] = result
+            stats.iterations += 1
+            stats.block_solves += len(pending)
+
+            # Nieuwe randvoorwaarden uit het einde van de kern van het vorige blok
+            pending, stats.boundary_change = [], 0.0
+            for b in range(1, len(starts)):
+                previous = results[b - 1]
+                if previous.status != "optimal":
+                    raise RuntimeError(f"Blok {b - 1} niet optimaal opgelost: {previous.status}")
+                core = starts[b] - starts[b - 1]
+                new = (float(previous.SOC[core]), (float(previous.U[1][core - 1]), float(previous.U[2][core - 1])))
+                old = boundaries[b]
+                if old[1] is None:
+                    # Opgelost zonder ramp-randvoorwaarde: alleen opnieuw als die nu bindt
+                    change = abs(new[0] - old[0])
+                    first = (float(results[b].U[1][0]), float(results[b].U[2][0]))
+                    binds = abs(first[0] - new[1][0]) > battery.ramp_charge + tol or \
+                        abs(first[1] - new[1][1]) > battery.ramp_discharge + tol
+                    boundaries[b] = new
+                    if change > tol or binds:
+                        pending.append(b)
+                else:
+                    change = max(abs(new[0] - old[0]), abs(new[1][0] - old[1][0]), abs(new[1][1] - old[1][1]))
+                    if change > tol:
+                        pending.append(b)
+                        boundaries[b] = new
+                stats.boundary_change = max(stats.boundary_change, change)
+
+    if results[-1].status != "optimal":
+        raise RuntimeError(f"Laatste blok niet optimaal opgelost: {results[-1].status}")
+
+    # Kernen aan elkaar plakken (het laatste blok heeft geen overlap meer)
+    cores = [min(block, n - s) for s in starts]
+    U = np.hstack([result.U[:, :core] for result, core in zip(results, cores)])
+    SOC = np.concatenate([[float(data.soc_init)]] + [result.SOC[1:core + 1] for result, core in zip(results, cores)])
+    status = "optimal" if not pending else "user_limit"
+    return MPCResult(U=U, SOC=SOC, status=status), stats
@@ -0,0 +1,150 @@
+"""
+mpc/dp_controller.py
+
+Batterijdispatch via achterwaartse dynamische programmering (DP) over een gediscretiseerd SOC-grid.
+
+Per venster wordt de SOC tussen Battery.soc_min en de actuele Battery.soc_max verdeeld in
+n_soc roosterpunten. Een actie is de overgang van roosterpunt i naar roosterpunt j; het
+SOC-verschil bepaalt P_charge (Δ > 0, via eta_ch) of P_discharge (Δ < 0, via eta_dis).
+Laden en ontladen tegelijk komt in deze formulering niet voor, net als in het MILP.
+
+Elke stap wordt in NumPy gevectoriseerd over alle (SOC, actie)-paren; de rekentijd is daardoor
+voorspelbaar (O(N · n_soc²)) en er is geen solver nodig. n_soc is de resolutieknop die
+nauwkeurigheid tegen snelheid uitruilt.
+
+De stapkosten volgen de doelfunctie van run_full_mpc met PV-gebruik zo groot mogelijk:
+    P_pv_used = min(P_pv_available, P_load + P_charge - P_discharge)
+    P_grid    = P_load - P_pv_used + P_charge - P_discharge   (≥ 0)
+    kosten    = prijs·P_grid - WEIGHT_PV_CHARGE·min(P_charge, P_pv_available)
+                - WEIGHT_DISCHARGE_PRICE·prijs·P_discharge
+
+Ramp rate beperkingen vragen het vorige vermogen als extra toestand. Meestal kunnen ze niet
+binden: het grootste laad- of ontlaadvermogen dat in één stap haalbaar is (begrensd door P_max
+en het SOC-bereik) ligt onder de ramp-limiet (zie ramp_is_slack). Dan rekent de DP met P_max.
+Kan de ramp wel binden, dan bepaalt ramp_cap wat de DP doet:
+- True (standaard): het vermogen wordt begrensd op min(P_max, ramp). Elke verandering tussen twee
+  stappen is dan vanzelf kleiner dan de ramp-limiet (voldoende, conservatieve voorwaarde; het
+  plan kan duurder zijn dan dat van het MILP);
+- False: de DP rekent met P_max en negeert de ramp-limiet.
+"""
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.actions import flows_result
+from mpc.controller import WEIGHT_PV_CHARGE, WEIGHT_DISCHARGE_PRICE
+
+
+def ramp_is_slack(battery: Battery) -> bool:
+    """Geeft aan of de ramp-limieten niet kunnen binden bij de actuele batterij."""
+    soc_range = battery.soc_max - battery.soc_min
+    reach_charge = min(battery.power_max_charge, soc_range * battery.capacity_kWh / battery.eta_ch)
+    reach_discharge = min(battery.power_max_discharge, soc_range * battery.eta_dis * battery.capacity_kWh)
+    return battery.ramp_charge >= reach_charge and battery.ramp_discharge >= reach_discharge
+
+
+class DPController:
+    """
+    Dispatchregelaar op basis van achterwaartse DP, met dezelfde interface als MPCController.
+
+    Attributen:
+        battery (Battery): Batterij (None zonder batterij).
+        N (int): Horizonlengte.
+        n_soc (int): Aantal SOC-roosterpunten (resolutie).
+        ramp_cap (bool): Begrens het vermogen op de ramp-limiet als die kan binden.
+    """
+
+    def __init__(self, battery: Battery, horizon: int, n_soc: int = 101, ramp_cap: bool = True):
+        if n_soc < 2:
+            raise ValueError("n_soc moet minstens 2 zijn.")
+        self.battery = battery
+        self.N = horizon
+        self.n_soc = n_soc
+        self.ramp_cap = ramp_cap
+        self.has_battery = battery is not None and battery.capacity_kWh > 0
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Lost één venster op met achterwaartse DP en simuleert het optimale pad vooruit.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Optimalisatie-uitvoer: U (6×N), SOC, status
+        """
+        P_load = np.asarray(data.P_load, dtype=float)
+        P_pv = np.asarray(data.P_pv_available, dtype=float)
+        price = np.asarray(data.price, dtype=float)
+        N = len(P_load)
+
+        if not self.has_battery:
+            # Zelfde uitvoer als MPCController zonder batterij (rijen 4 en 5 leeg)
+            P_pv_used = np.minimum(P_pv, P_load)
+            zeros = np.zeros(N)
+            return MPCResult(U=np.vstack([P_load - P_pv_used, zeros, zeros, P_pv_used, zeros, zeros]),
+                             SOC=np.zeros(N + 1), status="optimal")
+
+        battery = self.battery
+        alpha = battery.eta_ch / battery.capacity_kWh
+        beta = 1 / (battery.eta_dis * battery.capacity_kWh)
+        cap_charge, cap_discharge = battery.power_max_charge, battery.power_max_discharge
+        if self.ramp_cap and not ramp_is_slack(battery):
+            # Conservatief: een vermogen onder de ramp-limiet verandert ook nooit meer dan die limiet
+            cap_charge = min(cap_charge, battery.ramp_charge)
+            cap_discharge = min(cap_discharge, battery.ramp_discharge)
+
+        grid = np.linspace(battery.soc_min, battery.soc_max, self.n_soc)
+
+        # Stapkosten voor alle (t, i, j): van roosterpunt i naar roosterpunt j
+        delta = grid[None, :] - grid[:, None]
+        cost = self._stage_cost(delta, alpha, beta, cap_charge, cap_discharge,
+                                P_load[:, None, None], P_pv[:, None, None], price[:, None, None])
+
+        # Achterwaartse recursie (geen eindwaarde, net als de vrije eind-SOC in run_full_mpc)
+        value = np.zeros(self.n_soc)
+        policy = np.empty((N, self.n_soc), dtype=int)
+        for t in range(N - 1, 0, -1):
+            total = cost[t] + value[None, :]
+            policy[t] = np.argmin(total, axis=1)
+            value = total[np.arange(self.n_soc), policy[t]]
+
+        # Eerste stap vanuit de exacte begin-SOC (ligt meestal niet op het rooster)
+        first_delta = grid - float(data.soc_init)
+        first_cost = self._stage_cost(first_delta, alpha, beta, cap_charge, cap_discharge,
+                                      P_load[0], P_pv[0], price[0]) + value
+        j = int(np.argmin(first_cost))
+        if not np.isfinite(first_cost[j]):
+            nan = np.full(N, np.nan)
+            return flows_result(P_load, P_pv, nan, nan, np.full(N + 1, np.nan), "infeasible")
+
+        # Vooruit simuleren langs het optimale beleid
+        SOC = np.empty(N + 1)
+        SOC[0] = float(data.soc_init)
+        SOC[1] = grid[j]
+        for t in range(1, N):
+            j = policy[t, j]
+            SOC[t + 1] = grid[j]
+
+        step = np.diff(SOC)
+        P_charge = np.maximum(step, 0) / alpha
+        P_discharge = np.maximum(-step, 0) / beta
+        return flows_result(P_load, P_pv, P_charge, P_discharge, SOC, "optimal")
+
+    @staticmethod
+    def _stage_cost(delta, alpha, beta, cap_charge, cap_discharge, P_load, P_pv, price):
+        """
+        Kosten van een SOC-verandering delta (broadcastbaar); ontoelaatbare acties krijgen inf.
+        """
+        P_charge = np.maximum(delta, 0) / alpha
+        P_discharge = np.maximum(-delta, 0) / beta
+
+        net = P_load + P_charge - P_discharge
+        P_grid = np.maximum(net - P_pv, 0)
+        cost = price * P_grid \
+            - WEIGHT_PV_CHARGE * np.minimum(P_charge, P_pv) \
+            - WEIGHT_DISCHARGE_PRICE * price * P_discharge
+
+        # Vermogensgrenzen en P_grid ≥ 0 met P_pv_used ≥ 0 (ontladen hooguit tot de vraag)
+        infeasible = (P_charge > cap_charge) | (P_discharge > cap_discharge) | (net < 0)
+        return np.where(infeasible, np.inf, cost)
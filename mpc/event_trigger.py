@@ -0,0 +1,124 @@
+"""
+mpc/event_trigger.py
+
+Event-triggered MPC: voer het vorige plan verder uit zolang er niets is veranderd.
+
+Bij deterministische invoer is het plan dat op tijdstip t is berekend op t+1 meestal nog
+steeds (bijna) optimaal. EventTriggeredController omhult een willekeurige regelaar met een
+solve(MPCInputData) -> MPCResult methode en lost alleen opnieuw op als:
+- de resterende planhorizon korter wordt dan min_remaining stappen,
+- de invoer (vraag, PV-aanbod of prijs) meer dan input_tol afwijkt van waarmee gepland is,
+- de begin-SOC meer dan soc_tol afwijkt van de geplande SOC, of
+- het plan door batterijdegradatie boven de actuele soc_max uitkomt.
+Anders wordt het plan één stap opgeschoven teruggegeven.
+"""
+from dataclasses import dataclass, field
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+
+# Redenen voor opnieuw oplossen
+REASON_NO_PLAN = "geen plan"
+REASON_HORIZON = "horizon"
+REASON_INPUT = "invoer"
+REASON_SOC = "soc"
+REASON_DEGRADATION = "degradatie"
+
+
+@dataclass
+class TriggerStats:
+    """
+    Telt opgeloste en overgeslagen vensters.
+
+    Attributen:
+        solves (int): Aantal vensters waarin opnieuw is opgelost.
+        skipped (int): Aantal vensters waarin het vorige plan is hergebruikt.
+        reasons (dict): Aantal herberekeningen per reden.
+    """
+    solves: int = 0
+    skipped: int = 0
+    reasons: dict = field(default_factory=dict)
+
+    def record_solve(self, reason: str):
+        """Telt één herberekening met de bijbehorende reden mee."""
+        self.solves += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+
+class EventTriggeredController:
+    """
+    Omhult een MPC-regelaar en hergebruikt het vorige plan zolang geen trigger afgaat.
+
+    Attributen:
+        controller: Onderliggende regelaar (MPCController, SparseMPCController, DPController).
+        battery (Battery): Batterij voor de degradatiecontrole (None zonder batterij).
+        min_remaining (int): Minimaal aantal resterende planstappen; daaronder opnieuw oplossen.
+        input_tol (float): Maximale absolute afwijking van vraag, PV [kW] en prijs [€/kWh].
+        soc_tol (float): Maximale afwijking tussen werkelijke en geplande SOC (fractie).
+        triggers (TriggerStats): Tellers van opgeloste en overgeslagen vensters.
+    """
+
+    def __init__(self, controller, battery: Battery, min_remaining: int,
+                 input_tol: float = 1e-6, soc_tol: float = 1e-4):
+        if min_remaining < 1:
+            raise ValueError("min_remaining moet minstens 1 zijn.")
+        self.controller = controller
+        self.battery = battery
+        self.min_remaining = min_remaining
+        self.input_tol = input_tol
+        self.soc_tol = soc_tol
+        self.triggers = TriggerStats()
+
+        self._plan = None       # MPCResult van de laatste herberekening
+        self._planned = None    # invoer waarmee dat plan is berekend
+        self._offset = 0        # aantal stappen sinds de laatste herberekening
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Geeft het opgeschoven vorige plan terug, of lost opnieuw op als een trigger afgaat.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Plan vanaf de huidige tijdstap: U (6×n), SOC (n+1), status
+        """
+        reason = self._trigger(data)
+        if reason is None:
+            self._offset += 1
+            self.triggers.skipped += 1
+            k = self._offset
+            return MPCResult(U=self._plan.U[:, k:], SOC=self._plan.SOC[k:], status=self._plan.status)
+
+        result = self.controller.solve(data)
+        self.triggers.record_solve(reason)
+        self._plan = result if result.status == 'optimal' else None
+        self._planned = data
+        self._offset = 0
+        return result
+
+    def _trigger(self, data: MPCInputData):
+        """Geeft de reden om opnieuw op te lossen, of None als het plan bruikbaar blijft."""
+        if self._plan is None:
+            return REASON_NO_PLAN
+
+        k = self._offset + 1
+        remaining = self._plan.U.shape[1] - k
+        if remaining < self.min_remaining:
+            return REASON_HORIZON
+
+        # De nieuwe invoer overlapt met het nog niet uitgevoerde deel van het plan
+        for new, planned in ((data.P_load, self._planned.P_load),
+                             (data.P_pv_available, self._planned.P_pv_available),
+                             (data.price, self._planned.price)):
+            deviation = np.abs(np.asarray(new, dtype=float)[:remaining] - np.asarray(planned, dtype=float)[k:])
+            if np.any(deviation > self.input_tol):
+                return REASON_INPUT
+
+        if self.battery is not None:
+            if abs(float(data.soc_init) - self._plan.SOC[k]) > self.soc_tol:
+                return REASON_SOC
+            if np.any(self._plan.SOC[k + 1:] > self.battery.soc_max + self.soc_tol):
+                return REASON_DEGRADATION
+        return None
@@ -0,0 +1,355 @@
+"""
+mpc/explicit.py
+
+Expliciete MPC: een vooraf berekende, stuksgewijs affiene dispatchregel met snelle online lookup.
+
+Het LP van DispatchLP (zonder binaire variabelen) heeft voor een vaste batterij de vorm
+
+    min c(π)·x  z.d.d.  L(θ) ≤ [x; A x] ≤ U(θ)
+
+met θ = (P_load, P_pv_available, soc_init, soc_max) in de grenzen en π = prijs in de kosten.
+Voor een optimale basis zijn de niet-basis grenzen actief: K x = R θ̃ (θ̃ = [θ, 1]), dus
+x(θ) = K⁻¹ R θ̃ is affien in θ. De basis blijft optimaal zolang
+- x(θ) binnen alle grenzen blijft (primale toelaatbaarheid, lineair in θ), en
+- de duale waarden K⁻ᵀ c(π) het juiste teken hebben (duale toelaatbaarheid, lineair in π).
+Zo'n basis beschrijft dus een kritisch gebied (polyeder in θ × polyeder in π).
+
+build_policy() lost een reeks voorbeeldvensters offline op met HiGHS, verzamelt de optimale
+bases en slaat per gebied de affiene afbeeldingen op. ExplicitPolicy.evaluate() controleert de
+gebieden in volgorde van hoe vaak ze voorkwamen en geeft de oplossing van het eerste gebied dat
+zowel primaal als duaal toelaatbaar is: die is exact optimaal voor het LP met de alpha en beta
+van de tabel. Buiten de tabel, of bij gelijktijdig laden en ontladen valt ExplicitMPCController
+terug op een online solver.
+
+De tabel blijft in gebruik zolang alpha en beta binnen rtol van de tabelwaarden liggen. De SOC
+van een tabeloplossing wordt daarom opnieuw berekend uit P_charge en P_discharge met de actuele
+alpha en beta, en buiten [soc_min, soc_max] wordt online opgelost. De acties zijn dan optimaal
+voor de tabelcoëfficiënten, niet exact voor de actuele batterij. Is de batterij verder
+gedegradeerd, dan wordt de tabel opnieuw opgebouwd uit dezelfde voorbeeldvensters (of, zonder
+voorbeeldvensters, online opgelost).
+
+Vensters met PV raken de tabel vrijwel nooit: met PV laadt en ontlaadt de LP-relaxatie vrijwel
+altijd tegelijk of valt buiten de gevonden gebieden, zodat die vensters naar de online solver
+gaan. De treffers komen uit vensters zonder PV (nacht, of een scenario zonder panelen).
+"""
+import copy
+from dataclasses import dataclass
+import numpy as np
+import highspy
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.controller import SIMULTANEOUS_TOL
+from mpc.sparse_backend import DispatchLP, dispatch_result
+
+# Tolerantie voor primale en duale toelaatbaarheid bij de online controle
+FEASIBILITY_TOL = 1e-7
+
+
+def _alpha_beta(battery: Battery) -> tuple:
+    """SOC-coëfficiënten van de batterij bij de actuele capaciteit."""
+    return (battery.eta_ch / battery.capacity_kWh,
+            1 / (battery.eta_dis * battery.capacity_kWh))
+
+
+class _AffineBounds:
+    """
+    Affiene afbeeldingen van θ̃ naar de grenzen L(θ) en U(θ) van [x; A x], en van π̃ naar c(π),
+    afgeleid door DispatchLP.update op eenheidsvectoren te evalueren.
+    """
+
+    def __init__(self, lp: DispatchLP, battery: Battery):
+        N = lp.N
+        self.n_theta = 2 * N + 2
+        self._lp = lp
+        self._battery = battery
+
+        lower0, upper0, cost0 = self._evaluate(np.zeros(self.n_theta), np.zeros(N))
+        self.lower_finite = np.isfinite(lower0)
+        self.upper_finite = np.isfinite(upper0)
+
+        self.L = np.zeros((len(lower0), self.n_theta + 1))
+        self.U = np.zeros((len(upper0), self.n_theta + 1))
+        self.C = np.zeros((len(cost0), N + 1))
+        self.L[self.lower_finite, -1] = lower0[self.lower_finite]
+        self.U[self.upper_finite, -1] = upper0[self.upper_finite]
+        self.C[:, -1] = cost0
+
+        for k in range(self.n_theta):
+            unit = np.zeros(self.n_theta)
+            unit[k] = 1.0
+            lower, upper, _ = self._evaluate(unit, np.zeros(N))
+            self.L[self.lower_finite, k] = lower[self.lower_finite] - lower0[self.lower_finite]
+            self.U[self.upper_finite, k] = upper[self.upper_finite] - upper0[self.upper_finite]
+        for k in range(N):
+            unit = np.zeros(N)
+            unit[k] = 1.0
+            self.C[:, k] = self._evaluate(np.zeros(self.n_theta), unit)[2] - cost0
+
+        # Gelijkheden (L = U voor elke θ): het teken van de duale waarde is vrij
+        self.equality = self.lower_finite & self.upper_finite & np.all(self.L == self.U, axis=1)
+
+    def _evaluate(self, theta: np.ndarray, price: np.ndarray) -> tuple:
+        """Grenzen en kosten van het LP voor één (θ, π)."""
+        lp, N = self._lp, self._lp.N
+        self._battery.soc_max = theta[2 * N + 1]
+        lp.update(MPCInputData(P_load=theta[:N], P_pv_available=theta[N:2 * N],
+                               price=price, soc_init=theta[2 * N]))
+        return (np.concatenate([lp.lb, lp.row_lb]),
+                np.concatenate([lp.ub, lp.row_ub]),
+                lp.c.copy())
+
+
+@dataclass
+class ExplicitPolicy:
+    """
+    Tabel van kritische gebieden met hun affiene oplossing, gesorteerd op frequentie.
+
+    Attributen:
+        N (int): Horizonlengte.
+        alpha (float): SOC-laadcoëfficiënt waarvoor de tabel is berekend.
+        beta (float): SOC-ontlaadcoëfficiënt waarvoor de tabel is berekend.
+        X (np.ndarray): R × n × (d+1): x = X[r] @ θ̃ in gebied r.
+        S (np.ndarray): R × m' × (d+1): primaal toelaatbaar als S[r] @ θ̃ ≥ 0.
+        D (np.ndarray): R × n × (N+1): duale waarden D[r] @ π̃ van de actieve grenzen.
+        sign (np.ndarray): R × n: vereist teken van die duale waarden (+1, -1 of 0 = vrij).
+        counts (np.ndarray): Aantal voorbeeldvensters per gebied.
+    """
+    N: int
+    alpha: float
+    beta: float
+    X: np.ndarray
+    S: np.ndarray
+    D: np.ndarray
+    sign: np.ndarray
+    counts: np.ndarray
+
+    def __post_init__(self):
+        # Duale controle van alle gebieden in één vector-matrixproduct (alleen N+1 rijen)
+        self._signed_D = np.ascontiguousarray(
+            (self.sign[:, :, None] * self.D).reshape(-1, self.D.shape[2]).T)
+
+    @property
+    def n_regions(self) -> int:
+        return len(self.counts)
+
+    def matches(self, battery: Battery, rtol: float = 1e-3) -> bool:
+        """Geeft aan of de tabel nog geldt voor de (gedegradeerde) batterij."""
+        alpha, beta = _alpha_beta(battery)
+        return abs(alpha - self.alpha) <= rtol * self.alpha and abs(beta - self.beta) <= rtol * self.beta
+
+    def evaluate(self, data: MPCInputData, soc_max: float):
+        """
+        Zoekt het kritische gebied van een venster en geeft de bijbehorende oplossing.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+            soc_max (float): Actuele maximale SOC van de batterij.
+
+        Returns:
+            np.ndarray: Oplossingsvector van DispatchLP, of None buiten de tabel.
+        """
+        theta = np.concatenate([np.asarray(data.P_load, dtype=float),
+                                np.asarray(data.P_pv_available, dtype=float),
+                                [float(data.soc_init), soc_max, 1.0]])
+        pi = np.append(np.asarray(data.price, dtype=float), 1.0)
+
+        # Eerst de goedkope duale controle; de primale alleen voor de overgebleven kandidaten
+        violated = (pi @ self._signed_D < -FEASIBILITY_TOL).reshape(self.n_regions, -1)
+        candidates = np.flatnonzero(~violated.any(axis=1))
+        if candidates.size == 0:
+            return None
+
+        primal = (self.S[candidates] @ theta).min(axis=1) >= -FEASIBILITY_TOL
+        hits = candidates[primal]
+        if hits.size == 0:
+            return None
+        return self.X[hits[0]] @ theta
+
+    def save(self, path: str):
+        """Slaat de tabel op als .npz-bestand."""
+        np.savez_compressed(path, N=self.N, alpha=self.alpha, beta=self.beta, X=self.X, S=self.S,
+                            D=self.D, sign=self.sign, counts=self.counts)
+
+    @classmethod
+    def load(cls, path: str) -> "ExplicitPolicy":
+        """Leest een met save() opgeslagen tabel in."""
+        with np.load(path) as f:
+            return cls(N=int(f["N"]), alpha=float(f["alpha"]), beta=float(f["beta"]), X=f["X"],
+                       S=f["S"], D=f["D"], sign=f["sign"], counts=f["counts"])
+
+
+def build_policy(battery: Battery, horizon: int, windows: list) -> ExplicitPolicy:
+    """
+    Bouwt offline een tabel van kritische gebieden uit de optimale bases van voorbeeldvensters.
+
+    Args:
+        battery (Battery): Batterij in de toestand waarvoor de tabel moet gelden.
+        horizon (int): Horizonlengte N.
+        windows (list[MPCInputData]): Voorbeeldvensters (met begin-SOC) die de te verwachten
+            invoer afdekken.
+
+    Returns:
+        ExplicitPolicy: Tabel met de gevonden gebieden, meest voorkomende eerst.
+    """
+    battery = copy.copy(battery)      # soc_max wordt tijdens het afleiden van de afbeeldingen gevarieerd
+    soc_max = battery.soc_max
+    lp = DispatchLP(battery, horizon, use_binary=False)
+    bounds = _AffineBounds(lp, battery)
+
+    V = np.vstack([np.eye(lp.n_var), lp.A.toarray()])   # [x; A x] = V x
+    lower_rows = np.flatnonzero(bounds.lower_finite)
+    upper_rows = np.flatnonzero(bounds.upper_finite)
+
+    regions = {}
+    for data in windows:
+        battery.soc_max = soc_max
+        lp.update(data)
+        status = _optimal_basis(lp)
+        if status is None:
+            continue
+        key = status.tobytes()
+        if key in regions:
+            regions[key][-1] += 1
+            continue
+
+        # Niet-basis grenzen: actief op de onder- (1) of bovengrens (2)
+        active = np.flatnonzero(status != highspy.HighsBasisStatus.kBasic.value)
+        at_upper = status[active] == highspy.HighsBasisStatus.kUpper.value
+        K = V[active]
+        R = np.where(at_upper[:, None], bounds.U[active], bounds.L[active])
+        try:
+            X = np.linalg.solve(K, R)
+            D = np.linalg.solve(K.T, bounds.C)
+        except np.linalg.LinAlgError:
+            continue
+
+        values = V @ X
+        S = np.vstack([values[lower_rows] - bounds.L[lower_rows],
+                       bounds.U[upper_rows] - values[upper_rows]])
+        sign = np.where(bounds.equality[active], 0.0, np.where(at_upper, -1.0, 1.0))
+        regions[key] = [X, S, D, sign, 1]
+
+    ordered = sorted(regions.values(), key=lambda region: -region[-1])
+    alpha, beta = _alpha_beta(battery)
+    return ExplicitPolicy(N=horizon, alpha=alpha, beta=beta,
+                          X=np.array([r[0] for r in ordered]),
+                          S=np.array([r[1] for r in ordered]),
+                          D=np.array([r[2] for r in ordered]),
+                          sign=np.array([r[3] for r in ordered]),
+                          counts=np.array([r[4] for r in ordered]))
+
+
+def _optimal_basis(lp: DispatchLP):
+    """
+    Lost het LP op met HiGHS en geeft de basisstatus van [kolommen; rijen], of None als
+    het venster niet optimaal oplosbaar is.
+    """
+    model = highspy.HighsLp()
+    model.num_col_ = lp.n_var
+    model.num_row_ = lp.A.shape[0]
+    model.col_cost_ = lp.c
+    model.col_lower_ = lp.lb
+    model.col_upper_ = lp.ub
+    model.row_lower_ = lp.row_lb
+    model.row_upper_ = lp.row_ub
+    model.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    model.a_matrix_.start_ = lp.A.indptr
+    model.a_matrix_.index_ = lp.A.indices
+    model.a_matrix_.value_ = lp.A.data
+
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    h.passModel(model)
+    h.run()
+    if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+        return None
+    basis = h.getBasis()
+    return np.array([s.value for s in list(basis.col_status) + list(basis.row_status)], dtype=np.int8)
+
+
+@dataclass
+class LookupStats:
+    """
+    Telt hoe vensters door de expliciete regelaar zijn afgehandeld.
+
+    Attributen:
+        hits (int): Opgelost met de tabel.
+        outside (int): Geen passend gebied, of de herberekende SOC valt buiten de grenzen: online opgelost.
+        simultaneous (int): Tabeloplossing laadt en ontlaadt tegelijk: online opgelost.
+        drift (int): Batterij te ver gedegradeerd en geen voorbeeldvensters: online opgelost.
+        rebuilds (int): Aantal keer dat de tabel na degradatie opnieuw is opgebouwd.
+    """
+    hits: int = 0
+    outside: int = 0
+    simultaneous: int = 0
+    drift: int = 0
+    rebuilds: int = 0
+
+
+class ExplicitMPCController:
+    """
+    Regelaar die de expliciete tabel gebruikt en anders terugvalt op een online solver.
+
+    Attributen:
+        policy (ExplicitPolicy): Tabel van kritische gebieden.
+        fallback: Online regelaar met solve(MPCInputData) -> MPCResult (bijv. SparseMPCController).
+        battery (Battery): Batterij (voor soc_max en de degradatiecontrole).
+        windows (list[MPCInputData]): Voorbeeldvensters om de tabel na degradatie opnieuw op te
+            bouwen (None: dan online oplossen).
+        rtol (float): Toegestane relatieve afwijking van alpha en beta t.o.v. de tabel.
+        lookups (LookupStats): Tellers van tabeltreffers en terugvallen.
+    """
+
+    def __init__(self, policy: ExplicitPolicy, fallback, battery: Battery, windows: list = None,
+                 rtol: float = 1e-2):
+        self.policy = policy
+        self.fallback = fallback
+        self.battery = battery
+        self.windows = windows
+        self.rtol = rtol
+        self.lookups = LookupStats()
+        self._lp = DispatchLP(battery, policy.N, use_binary=False)   # alleen voor de kolomindeling
+
+        if hasattr(fallback, "stats"):
+            self.stats = fallback.stats
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Geeft de tabeloplossing als die geldt, anders de oplossing van de online regelaar.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Optimalisatie-uitvoer: U (6×N), SOC, status
+        """
+        if not self.policy.matches(self.battery, self.rtol):
+            if not self.windows:
+                self.lookups.drift += 1
+                return self.fallback.solve(data)
+            self.policy = build_policy(self.battery, self.policy.N, self.windows)
+            self.lookups.rebuilds += 1
+
+        x = self.policy.evaluate(data, self.battery.soc_max)
+        if x is None:
+            self.lookups.outside += 1
+            return self.fallback.solve(data)
+
+        lp = self._lp
+        if np.any(np.minimum(x[lp.ic], x[lp.id]) > SIMULTANEOUS_TOL):
+            self.lookups.simultaneous += 1
+            return self.fallback.solve(data)
+
+        # SOC met de actuele alpha/beta: de tabel kan tot rtol verouderde coëfficiënten hebben
+        alpha, beta = _alpha_beta(self.battery)
+        soc = float(data.soc_init) + np.concatenate([[0.0], np.cumsum(alpha * x[lp.ic] - beta * x[lp.id])])
+        if soc[1:].min() < self.battery.soc_min - FEASIBILITY_TOL \
+                or soc[1:].max() > self.battery.soc_max + FEASIBILITY_TOL:
+            self.lookups.outside += 1
+            return self.fallback.solve(data)
+        x = x.copy()
+        x[lp.isoc] = soc
+
+        self.lookups.hits += 1
+        return dispatch_result(lp, x, "optimal", data)
@@ -0,0 +1,96 @@
+"""
+mpc/hierarchical.py
+
+Hiërarchische regeling: één plan per dag plus een goedkope correctie per uur.
+
+Het bovenste niveau lost eens per replan_every stappen (standaard 24, om middernacht) een plan
+op over de volledige voorspellingshorizon (24–48 uur) met de day-ahead prijzen. Het onderste
+niveau volgt elk uur het geplande SOC-verloop in gesloten vorm: het laad- of ontlaadvermogen
+wordt zo gekozen dat de SOC na deze stap weer op het plan ligt, zodat afwijkingen in SOC,
+vraag, PV en capaciteit (degradatie) direct worden weggewerkt. Die actie wordt met
+project_action() op de grenzen van de eerste stap geprojecteerd. Zo daalt het aantal
+optimalisaties met een factor replan_every.
+"""
+from dataclasses import dataclass
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.actions import project_action, first_step_result
+
+
+@dataclass
+class HierarchyStats:
+    """
+    Tellers van de hiërarchische regelaar.
+
+    Attributen:
+        plans (int): Aantal plannen van het bovenste niveau (optimalisaties).
+        corrections (int): Aantal uren afgehandeld door het onderste niveau.
+        max_soc_deviation (float): Grootste afwijking tussen werkelijke en geplande SOC bij de correctie.
+    """
+    plans: int = 0
+    corrections: int = 0
+    max_soc_deviation: float = 0.0
+
+
+class HierarchicalController:
+    """
+    Omhult een MPC-regelaar als dagplanner en volgt het plan tussendoor met een SOC-correctie.
+
+    Attributen:
+        planner: Regelaar voor het bovenste niveau met solve(MPCInputData) -> MPCResult.
+        battery (Battery): Batterij (voor de correctie en de projectie).
+        replan_every (int): Aantal stappen tussen twee plannen.
+        hierarchy (HierarchyStats): Tellers van plannen en correcties.
+    """
+
+    def __init__(self, planner, battery: Battery, replan_every: int = 24):
+        if replan_every < 1:
+            raise ValueError("replan_every moet minstens 1 zijn.")
+        self.planner = planner
+        self.battery = battery
+        self.replan_every = replan_every
+        self.hierarchy = HierarchyStats()
+
+        self._plan = None     # MPCResult van het laatste dagplan
+        self._offset = 0      # aantal stappen sinds dat plan
+
+        if hasattr(planner, "stats"):
+            self.stats = planner.stats
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Maakt een nieuw plan bij het begin van een periode en volgt het anders met een correctie.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Plan over de horizon (bij een nieuw plan) of alleen de gecorrigeerde
+            eerste stap (U 6×1, SOC 2 waarden).
+        """
+        if self._plan is not None:
+            self._offset += 1
+        if self._plan is None or self._offset >= min(self.replan_every, self._plan.U.shape[1]):
+            if len(data.P_load) < self.replan_every:
+                raise ValueError(f"Voorspellingshorizon {len(data.P_load)} is korter dan replan_every "
+                                 f"({self.replan_every}).")
+            result = self.planner.solve(data)
+            self.hierarchy.plans += 1
+            self._plan = result if result.status == "optimal" else None
+            self._offset = 0
+            return result
+
+        # Onderste niveau: stuur de SOC na deze stap terug naar het plan
+        battery = self.battery
+        k = self._offset
+        soc = float(data.soc_init)
+        self.hierarchy.corrections += 1
+        self.hierarchy.max_soc_deviation = max(self.hierarchy.max_soc_deviation, abs(soc - self._plan.SOC[k]))
+
+        step = self._plan.SOC[k + 1] - soc
+        P_charge = max(step, 0.0) * battery.capacity_kWh / battery.eta_ch
+        P_discharge = max(-step, 0.0) * battery.eta_dis * battery.capacity_kWh
+        action = project_action(np.array([P_charge, P_discharge, 0.0]), data, battery)
+        return first_step_result(data, battery, *action)
@@ -0,0 +1,122 @@
+"""
+mpc/solution_cache.py
+
+LRU-cache van MPC-oplossingen met een sleutel op gekwantiseerde invoer.
+
+De synthetische vraag herhaalt elke dag hetzelfde profiel met wat ruis en PV is de helft van
+de uren nul, dus veel vensters lijken sterk op elkaar. CachedController rondt vraag en PV af
+op power_step [kW], de prijs op price_step [€/kWh] en de begin-SOC en de batterijtoestand
+(actuele capaciteit en soc_max, als fractie van de nominale capaciteit) op soc_step. Vensters
+met dezelfde sleutel krijgen de eerder berekende eerste actie.
+
+Omdat de werkelijke invoer binnen een kwantisatiestap kan afwijken, wordt de actie uit de cache
+vóór toepassing met project_action() op de grenzen van het huidige venster geprojecteerd
+(vermogen, SOC-grenzen, P_grid ≥ 0, maximaal PV-gebruik).
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.actions import project_action, first_step_result
+
+# Verschil [kW] tussen de gecachte en de geprojecteerde batterijvermogens dat als reparatie telt
+REPAIR_TOL = 1e-9
+
+
+@dataclass
+class CacheStats:
+    """
+    Tellers van de oplossingscache.
+
+    Attributen:
+        hits (int): Vensters beantwoord uit de cache.
+        misses (int): Vensters opgelost met de onderliggende regelaar.
+        repairs (int): Treffers waarvan de batterijactie moest worden bijgesteld.
+        evictions (int): Uit de cache verwijderde oplossingen (LRU).
+    """
+    hits: int = 0
+    misses: int = 0
+    repairs: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedController:
+    """
+    Omhult een MPC-regelaar met een LRU-cache van eerste acties.
+
+    Attributen:
+        controller: Onderliggende regelaar met solve(MPCInputData) -> MPCResult.
+        battery (Battery): Batterij (voor de sleutel en de reparatie).
+        maxsize (int): Maximaal aantal oplossingen in de cache.
+        power_step (float): Kwantisatiestap voor vraag en PV [kW].
+        price_step (float): Kwantisatiestap voor de prijs [€/kWh].
+        soc_step (float): Kwantisatiestap voor begin-SOC, capaciteit en soc_max (fractie).
+        cache (CacheStats): Tellers van treffers, missers en reparaties.
+    """
+
+    def __init__(self, controller, battery: Battery, maxsize: int = 4096, power_step: float = 0.05,
+                 price_step: float = 0.01, soc_step: float = 0.01):
+        if maxsize < 1:
+            raise ValueError("maxsize moet minstens 1 zijn.")
+        if min(power_step, price_step, soc_step) <= 0:
+            raise ValueError("Kwantisatiestappen moeten positief zijn.")
+        self.controller = controller
+        self.battery = battery
+        self.maxsize = maxsize
+        self.power_step = power_step
+        self.price_step = price_step
+        self.soc_step = soc_step
+        self.cache = CacheStats()
+        self._entries = OrderedDict()    # sleutel -> (P_charge, P_discharge, P_pv_used)
+
+        if hasattr(controller, "stats"):
+            self.stats = controller.stats
+
+    def key(self, data: MPCInputData) -> bytes:
+        """Gekwantiseerde sleutel van een venster en de actuele batterijtoestand."""
+        battery = self.battery
+        quantized = np.concatenate([
+            np.round(np.asarray(data.P_load, dtype=float) / self.power_step),
+            np.round(np.asarray(data.P_pv_available, dtype=float) / self.power_step),
+            np.round(np.asarray(data.price, dtype=float) / self.price_step),
+            np.round(np.array([float(data.soc_init),
+                               battery.capacity_kWh / battery.capacity_kWh_nominal,
+                               battery.soc_max]) / self.soc_step)
+        ])
+        return quantized.astype(np.int64).tobytes()
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Geeft de (gerepareerde) eerste actie uit de cache, of lost het venster op en bewaart die.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Volledig resultaat bij een misser, alleen de eerste stap (U 6×1) bij een treffer.
+        """
+        key = self.key(data)
+        action = self._entries.get(key)
+        if action is not None:
+            self._entries.move_to_end(key)
+            self.cache.hits += 1
+            repaired = project_action(np.array(action), data, self.battery)
+            if max(abs(repaired[0] - action[0]), abs(repaired[1] - action[1])) > REPAIR_TOL:
+                self.cache.repairs += 1
+            return first_step_result(data, self.battery, *repaired)
+
+        result = self.controller.solve(data)
+        self.cache.misses += 1
+        if result.status == "optimal":
+            self._entries[key] = (float(result.U[1][0]), float(result.U[2][0]), float(result.U[3][0]))
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.cache.evictions += 1
+        return result
@@ -0,0 +1,195 @@
+"""
+mpc/solvers.py
+
+Register van solver-backends voor de MPC-problemen, elk met een eigen tolerantieprofiel.
+
+Per (probleemtype, horizon) wordt een solver gekozen:
+- uit een eerder opgeslagen kalibratie (JSON-bestand), anders
+- de eerste geïnstalleerde solver uit de standaardvoorkeur voor dat probleemtype.
+
+Met calibrate() worden alle geïnstalleerde, geschikte solvers getimed op een aantal
+voorbeeldvensters; de snelste die op elk venster 'optimal' haalt wordt opgeslagen.
+"""
+import json
+import os
+import time
+import warnings
+from dataclasses import dataclass, field
+import cvxpy as cp
+
+# Probleemtypes
+PROBLEM_NO_BATTERY = "no_battery"   # LP zonder batterij
+PROBLEM_LP = "lp"                   # batterij-LP zonder binaire variabelen
+PROBLEM_MILP = "milp"               # batterij-MILP met binaire z
+
+# Standaardbestand voor opgeslagen solverkeuzes
+SELECTION_PATH = "./export/solver_selectie.json"
+
+
+@dataclass(frozen=True)
+class SolverProfile:
+    """
+    Beschrijving van een solver-backend.
+
+    Attributen:
+        name (str): Naam van de solver in cvxpy.
+        supports_integer (bool): Kan binaire/integer variabelen aan (MILP).
+        options (dict): Tolerantie- en iteratie-instellingen die aan solve() worden meegegeven.
+    """
+    name: str
+    supports_integer: bool
+    options: dict = field(default_factory=dict)
+
+    def is_installed(self) -> bool:
+        """Geeft aan of de solver in deze omgeving beschikbaar is."""
+        return self.name in cp.installed_solvers()
+
+
+SOLVERS = {
+    cp.ECOS_BB: SolverProfile(cp.ECOS_BB, True, dict(max_iters=10000,
+                                                     abstol=1e-5,
+                                                     reltol=1e-5,
+                                                     feastol=1e-5)),
+    cp.HIGHS: SolverProfile(cp.HIGHS, True, dict(primal_feasibility_tolerance=1e-7,
+                                                 dual_feasibility_tolerance=1e-7,
+                                                 mip_rel_gap=1e-5)),
+    cp.OSQP: SolverProfile(cp.OSQP, False, dict(eps_abs=1e-5,
+                                                eps_rel=1e-5,
+                                                max_iter=20000)),
+    cp.CLARABEL: SolverProfile(cp.CLARABEL, False, dict(tol_gap_abs=1e-7,
+                                                        tol_gap_rel=1e-7,
+                                                        tol_feas=1e-7,
+                                                        max_iter=200)),
+    cp.SCS: SolverProfile(cp.SCS, False, dict(eps_abs=1e-5,
+                                              eps_rel=1e-5,
+                                              max_iters=20000)),
+    cp.GLPK_MI: SolverProfile(cp.GLPK_MI, True, dict()),
+}
+
+# Standaardvoorkeur per probleemtype als er (nog) geen kalibratie is
+DEFAULT_PREFERENCE = {
+    PROBLEM_NO_BATTERY: [cp.ECOS_BB, cp.HIGHS, cp.CLARABEL, cp.SCS],
+    PROBLEM_LP: [cp.HIGHS, cp.CLARABEL, cp.ECOS_BB, cp.SCS, cp.OSQP],
+    PROBLEM_MILP: [cp.ECOS_BB, cp.HIGHS, cp.GLPK_MI],
+}
+
+
+def candidates(problem_type: str) -> list:
+    """
+    Geeft alle geïnstalleerde solvers die het probleemtype aankunnen.
+
+    Args:
+        problem_type (str): PROBLEM_NO_BATTERY, PROBLEM_LP of PROBLEM_MILP.
+
+    Returns:
+        list[SolverProfile]: Geschikte solverprofielen.
+    """
+    needs_integer = problem_type == PROBLEM_MILP
+    return [profile for profile in SOLVERS.values()
+            if profile.is_installed() and (profile.supports_integer or not needs_integer)]
+
+
+def _key(problem_type: str, horizon: int) -> str:
+    return f"{problem_type}/{horizon}"
+
+
+def load_selection(path: str = SELECTION_PATH) -> dict:
+    """Leest opgeslagen solverkeuzes in; geeft een lege dict als het bestand ontbreekt."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def store_selection(problem_type: str, horizon: int, solver: str, path: str = SELECTION_PATH):
+    """Slaat de gekozen solver voor een (probleemtype, horizon) op voor latere runs."""
+    selection = load_selection(path)
+    selection[_key(problem_type, horizon)] = solver
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(selection, f, indent=2, sort_keys=True)
+
+
+def select_solver(problem_type: str, horizon: int, path: str = SELECTION_PATH) -> SolverProfile:
+    """
+    Kiest de solver voor een (probleemtype, horizon).
+
+    Een opgeslagen kalibratie heeft voorrang, mits die solver nog geïnstalleerd is;
+    anders de eerste geïnstalleerde solver uit DEFAULT_PREFERENCE.
+
+    Returns:
+        SolverProfile: Het gekozen solverprofiel.
+    """
+    stored = load_selection(path).get(_key(problem_type, horizon))
+    if stored in SOLVERS and SOLVERS[stored].is_installed():
+        return SOLVERS[stored]
+
+    for name in DEFAULT_PREFERENCE[problem_type]:
+        if SOLVERS[name].is_installed():
+            return SOLVERS[name]
+    raise RuntimeError(f"Geen geïnstalleerde solver gevonden voor probleemtype '{problem_type}'.")
+
+
+def calibrate(problem: cp.Problem, problem_type: str, horizon: int, set_window, windows,
+              path: str = SELECTION_PATH, verbose: bool = True) -> SolverProfile:
+    """
+    Timet elke geschikte solver op een aantal voorbeeldvensters en slaat de snelste op
+    die op elk venster de status 'optimal' haalt.
+
+    Args:
+        problem (cp.Problem): Gecompileerd (geparametriseerd) probleem.
+        problem_type (str): PROBLEM_NO_BATTERY, PROBLEM_LP of PROBLEM_MILP.
+        horizon (int): Horizonlengte van het probleem.
+        set_window (callable): Zet de parameterwaarden van het probleem voor één venster.
+        windows (list): Voorbeeldvensters die aan set_window worden doorgegeven.
+        path (str): JSON-bestand waarin de keuze wordt bewaard.
+        verbose (bool): Print de gemeten tijden per solver.
+
+    Returns:
+        SolverProfile: De gekozen solver; als geen enkele solver slaagt de standaardkeuze
+        van select_solver (er wordt dan niets opgeslagen).
+    """
+    with warnings.catch_warnings():
+        # Onnauwkeurige oplossingen vallen bij het timen toch af; de waarschuwing is dan ruis
+        warnings.simplefilter("ignore", UserWarning)
+        timings = _time_candidates(problem, problem_type, set_window, windows, verbose)
+
+    if not timings:
+        print(f"⚠️ Geen solver haalde 'optimal' voor {_key(problem_type, horizon)}, standaardkeuze blijft.")
+        return select_solver(problem_type, horizon, path)
+
+    best = min(timings, key=timings.get)
+    store_selection(problem_type, horizon, best, path)
+    if verbose:
+        print(f"Solverkeuze {_key(problem_type, horizon)}: {best}")
+    return SOLVERS[best]
+
+
+def _time_candidates(problem: cp.Problem, problem_type: str, set_window, windows, verbose: bool) -> dict:
+    """Geeft de gemiddelde oplostijd per venster van elke solver die overal 'optimal' haalt."""
+    timings = {}
+    for profile in candidates(problem_type):
+        elapsed = 0.0
+        try:
+            # Eerste aanroep apart: die bevat de eenmalige compilatie naar dit solverformaat
+            set_window(windows[0])
+            problem.solve(solver=profile.name, verbose=False, **profile.options)
+
+            for window in windows:
+                set_window(window)
+                start = time.perf_counter()
+                problem.solve(solver=profile.name, verbose=False, **profile.options)
+                elapsed += time.perf_counter() - start
+                if problem.status != cp.OPTIMAL:
+                    raise cp.SolverError(f"status {problem.status}")
+        except (cp.SolverError, ValueError) as e:
+            if verbose:
+                print(f"  {profile.name}: afgevallen ({e})")
+            continue
+
+        timings[profile.name] = elapsed / len(windows)
+        if verbose:
+            print(f"  {profile.name}: {timings[profile.name] * 1000:.2f} ms per venster")
+    return timings
@@ -0,0 +1,463 @@
+"""
+mpc/sparse_backend.py
+
+Native sparse LP/MILP-backend voor het dispatchprobleem van run_full_mpc, zonder cvxpy.
+
+Voor een gegeven horizon N en batterij ligt het sparsity-patroon van de constraintmatrix
+vast. Per venster veranderen alleen:
+- de rechterleden en variabelegrenzen (P_load, P_pv_available, soc_init, soc_max),
+- de kostenvector (prijs),
+- de SOC-coëfficiënten alpha en beta (batterijdegradatie), op vaste posities in A.data.
+
+DispatchLP bouwt A, de grenzen en c één keer op met scipy.sparse en past per venster alleen
+die vectoren in-place aan. SparseMPCController lost het resultaat op met HiGHS via
+scipy.optimize.milp en geeft hetzelfde MPCResult terug als MPCController.
+
+scipy.optimize.milp geeft geen duale waarden (en bij een MILP bestaan die niet). Met duals=True
+lost SparseMPCController daarom per venster ook het netkosten-LP (grid_cost_only, zonder
+binaire variabelen) op met scipy.optimize.linprog; dispatch_duals() zet de marginale waarden
+van de SOC-grenzen, vermogensgrenzen en PV-beschikbaarheid in MPCResult.duals.
+"""
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import milp, linprog, Bounds, LinearConstraint
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.controller import SolveStats, SIMULTANEOUS_TOL, WEIGHT_PV_CHARGE, WEIGHT_DISCHARGE_PRICE
+
+# Vertaling van scipy.optimize.milp-statuscodes naar de cvxpy-statusnamen van MPCResult
+STATUS_MAP = {
+    0: "optimal",
+    1: "user_limit",
+    2: "infeasible",
+    3: "unbounded",
+    4: "solver_error",
+}
+
+# HiGHS-opties: presolve kost op deze kleine problemen meer dan het oplevert
+HIGHS_OPTIONS = {"presolve": False}
+
+# Kleine kosten per kWh doorzet bij grid_cost_only: kiest bij gelijke netkosten de oplossing
+# zonder gelijktijdig laden en ontladen, zodat geen binaire variabelen nodig zijn [€/kWh]
+THROUGHPUT_PENALTY = 1e-6
+
+
+class DispatchLP:
+    """
+    Sparse matrixvorm van het dispatchprobleem:
+
+        min c·x  z.d.d.  row_lb ≤ A x ≤ row_ub,  lb ≤ x ≤ ub
+
+    Variabelen (met batterij), elk als aaneengesloten blok in x:
+        P_charge (N), P_discharge (N), P_pv_used (N), SOC (N+1),
+        w (N) = min(P_charge, P_pv_available) voor de PV-laadbeloning,
+        z (N, alleen met use_binary) binair: laden (1) of ontladen (0).
+
+    P_grid is weggesubstitueerd: P_grid = P_load - P_pv_used + P_charge - P_discharge ≥ 0.
+    Zonder batterij bestaat x alleen uit P_pv_used.
+
+    Met grid_cost_only vervallen de stuurgewichten van run_full_mpc (PV-laadbeloning en
+    ontlaadbonus) en zijn de kosten alleen prijs·P_grid plus THROUGHPUT_PENALTY per kWh doorzet.
+
+    Attributen:
+        battery (Battery): Batterij (None zonder batterij).
+        N (int): Horizonlengte.
+        use_binary (bool): MILP met binaire z in plaats van LP.
+        grid_cost_only (bool): Alleen netkosten minimaliseren (zonder stuurgewichten).
+        A (sp.csc_matrix): Constraintmatrix met vast sparsity-patroon.
+        c, lb, ub, row_lb, row_ub (np.ndarray): Per venster bijgewerkte vectoren.
+        integrality (np.ndarray): 1 voor binaire variabelen, anders 0.
+    """
+
+    def __init__(self, battery: Battery, horizon: int, use_binary: bool = False, grid_cost_only: bool = False):
+        self.battery = battery
+        self.N = horizon
+        self.has_battery = battery is not None and battery.capacity_kWh > 0
+        self.use_binary = use_binary and self.has_battery
+        self.grid_cost_only = grid_cost_only
+
+        if self.has_battery:
+            self._build_with_battery()
+        else:
+            self._build_without_battery()
+
+        self.integrality = np.zeros(self.n_var)
+        if self.use_binary:
+            self.integrality[self.iz] = 1
+
+    def _build_without_battery(self):
+        """Alleen P_pv_used: P_grid = P_load - P_pv_used ≥ 0 wordt P_pv_used ≤ P_load."""
+        N = self.N
+        self.ipv = slice(0, N)
+        self.n_var = N
+
+        self.A = sp.identity(N, format="csc")
+        self.row_lb = np.full(N, -np.inf)
+        self.row_ub = np.zeros(N)            # P_load, per venster
+        self.rows_grid = slice(0, N)
+
+        self.lb = np.zeros(N)
+        self.ub = np.zeros(N)                # P_pv_available, per venster
+        self.c = np.zeros(N)                 # -prijs, per venster
+
+    def _build_with_battery(self):
+        """Bouwt A, grenzen en kostenvector voor het batterijprobleem."""
+        N = self.N
+        battery = self.battery
+
+        # Kolomindeling
+        self.ic = slice(0, N)
+        self.id = slice(N, 2 * N)
+        self.ipv = slice(2 * N, 3 * N)
+        self.isoc = slice(3 * N, 4 * N + 1)
+        self.iw = slice(4 * N + 1, 5 * N + 1)
+        self.iz = slice(5 * N + 1, 6 * N + 1) if self.use_binary else slice(0, 0)
+        self.n_var = 6 * N + 1 if self.use_binary else 5 * N + 1
+
+        t = np.arange(N)
+        c, d, pv, w = t + self.ic.start, t + self.id.start, t + self.ipv.start, t + self.iw.start
+        soc = np.arange(N + 1) + self.isoc.start
+
+        rows, cols, vals = [], [], []
+
+        def add(r, k, v):
+            rows.append(np.broadcast_to(r, np.shape(k)))
+            cols.append(k)
+            vals.append(np.broadcast_to(np.asarray(v, dtype=float), np.shape(k)))
+
+        row = 0
+        row_lb, row_ub = [], []
+
+        # Vermogensbalans / P_grid ≥ 0:  -P_charge + P_discharge + P_pv_used ≤ P_load
+        r = row + t
+        add(r, c, -1.0)
+        add(r, d, 1.0)
+        add(r, pv, 1.0)
+        self.rows_grid = slice(row, row + N)
+        row_lb.append(np.full(N, -np.inf))
+        row_ub.append(np.zeros(N))
+        row += N
+
+        # SOC-dynamiek: SOC[t+1] - SOC[t] - alpha·P_charge[t] + beta·P_discharge[t] = 0
+        r = row + t
+        add(r, soc[1:], 1.0)
+        add(r, soc[:-1], -1.0)
+        n_before_alpha = sum(len(x) for x in rows)
+        add(r, c, -1.0)      # -alpha, per venster
+        add(r, d, 1.0)       # +beta, per venster
+        alpha_triplets = np.arange(n_before_alpha, n_before_alpha + N)
+        beta_triplets = alpha_triplets + N
+        row_lb.append(np.zeros(N))
+        row_ub.append(np.zeros(N))
+        row += N
+
+        # PV-laadbeloning: w ≤ P_charge
+        r = row + t
+        add(r, w, 1.0)
+        add(r, c, -1.0)
+        row_lb.append(np.full(N, -np.inf))
+        row_ub.append(np.zeros(N))
+        row += N
+
+        # Ramp rate beperkingen als tweezijdige rijen: -ramp ≤ P[t] - P[t-1] ≤ ramp
+        for k, ramp in ((c, battery.ramp_charge), (d, battery.ramp_discharge)):
+            r = row + np.arange(N - 1)
+            add(r, k[1:], 1.0)
+            add(r, k[:-1], -1.0)
+            row_lb.append(np.full(N - 1, -ramp))
+            row_ub.append(np.full(N - 1, ramp))
+            row += N - 1
+
+        if self.use_binary:
+            # Big-M: P_charge ≤ Pmax_ch·z  en  P_discharge ≤ Pmax_dis·(1 - z)
+            z = t + self.iz.start
+            r = row + t
+            add(r, c, 1.0)
+            add(r, z, -battery.power_max_charge)
+            row_lb.append(np.full(N, -np.inf))
+            row_ub.append(np.zeros(N))
+            row += N
+
+            r = row + t
+            add(r, d, 1.0)
+            add(r, z, battery.power_max_discharge)
+            row_lb.append(np.full(N, -np.inf))
+            row_ub.append(np.full(N, battery.power_max_discharge))
+            row += N
+
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        vals = np.concatenate(vals)
+
+        # CSC-volgorde van de triplets (kolom, dan rij) om alpha/beta later in A.data te vinden
+        order = np.lexsort((rows, cols))
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        self._alpha_pos = position[alpha_triplets]
+        self._beta_pos = position[beta_triplets]
+
+        self.A = sp.csc_matrix((vals[order], (rows[order], cols[order])), shape=(row, self.n_var))
+        assert self.A.nnz == len(vals), "Dubbele triplets in de constraintmatrix"
+        self.row_lb = np.concatenate(row_lb)
+        self.row_ub = np.concatenate(row_ub)
+
+        # Variabelegrenzen (P_pv_used, SOC en w worden per venster bijgewerkt)
+        self.lb = np.zeros(self.n_var)
+        self.ub = np.zeros(self.n_var)
+        self.ub[self.ic] = battery.power_max_charge
+        self.ub[self.id] = battery.power_max_discharge
+        self.lb[self.isoc] = battery.soc_min
+        if self.use_binary:
+            self.ub[self.iz] = 1.0
+
+        # Kostenvector: w krijgt een vaste beloning, de rest hangt van de prijs af
+        self.c = np.zeros(self.n_var)
+        self.c[self.iw] = 0.0 if self.grid_cost_only else -WEIGHT_PV_CHARGE
+
+    def update(self, data: MPCInputData):
+        """
+        Past de per venster veranderende vectoren en de alpha/beta-coëfficiënten in-place aan.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+        """
+        if len(data.P_load) != self.N:
+            raise ValueError(f"Invoer heeft lengte {len(data.P_load)}, backend verwacht horizon {self.N}.")
+
+        P_load = np.asarray(data.P_load, dtype=float)
+        P_pv = np.asarray(data.P_pv_available, dtype=float)
+        price = np.asarray(data.price, dtype=float)
+
+        self.row_ub[self.rows_grid] = P_load
+        self.ub[self.ipv] = P_pv
+        # P_grid = P_load - P_pv_used + P_charge - P_discharge; constante prijs·P_load valt weg
+        self.c[self.ipv] = -price
+
+        if not self.has_battery:
+            return
+
+        battery = self.battery
+        self.ub[self.iw] = P_pv
+        if self.grid_cost_only:
+            self.c[self.ic] = price + THROUGHPUT_PENALTY
+            self.c[self.id] = -price + THROUGHPUT_PENALTY
+        else:
+            self.c[self.ic] = price
+            self.c[self.id] = -price * (1 + WEIGHT_DISCHARGE_PRICE)
+
+        # Begin-SOC vastzetten via de grenzen van SOC[0]; SOC[1:] begrensd door actuele soc_max
+        soc0 = self.isoc.start
+        self.lb[soc0] = self.ub[soc0] = float(data.soc_init)
+        self.ub[soc0 + 1:self.isoc.stop] = battery.soc_max
+
+        # Efficiëntie-coëfficiënten op basis van actuele capaciteit
+        self.A.data[self._alpha_pos] = -battery.eta_ch / battery.capacity_kWh
+        self.A.data[self._beta_pos] = 1 / (battery.eta_dis * battery.capacity_kWh)
+
+    def solve(self, ub: np.ndarray = None):
+        """
+        Lost het huidige probleem op met HiGHS.
+
+        Args:
+            ub (np.ndarray): Optionele afwijkende bovengrenzen (voor vertakken), anders self.ub.
+
+        Returns:
+            scipy.optimize.OptimizeResult: Resultaat van scipy.optimize.milp.
+        """
+        return milp(self.c,
+                    integrality=self.integrality,
+                    bounds=Bounds(self.lb, self.ub if ub is None else ub),
+                    constraints=LinearConstraint(self.A, self.row_lb, self.row_ub),
+                    options=HIGHS_OPTIONS)
+
+
+class SparseMPCController:
+    """
+    MPC-regelaar met dezelfde interface als MPCController, maar op basis van DispatchLP.
+
+    De modi 'lp' en 'milp' werken zoals bij MPCController: in 'lp' wordt eerst de LP-relaxatie
+    opgelost en alleen bij gelijktijdig laden en ontladen valt het venster terug op het MILP.
+
+    Attributen:
+        battery (Battery): Batterij (None zonder batterij).
+        N (int): Horizonlengte.
+        mode (str): 'lp' of 'milp'.
+        duals (bool): Voeg de marginale waarden van dispatch_duals() toe aan elk optimaal resultaat.
+        stats (SolveStats): Tellers van LP-, MILP- en terugvaloplossingen.
+    """
+
+    def __init__(self, battery: Battery, horizon: int, mode: str = "milp", duals: bool = False):
+        if mode not in ("lp", "milp"):
+            raise ValueError(f"Onbekende modus '{mode}', kies 'lp' of 'milp'.")
+
+        self.battery = battery
+        self.N = horizon
+        self.mode = mode
+        self.stats = SolveStats()
+        self.has_battery = battery is not None and battery.capacity_kWh > 0
+
+        self._lp = DispatchLP(battery, horizon, use_binary=False) \
+            if mode == "lp" or not self.has_battery else None
+        self._milp = None
+        if mode == "milp" and self.has_battery:
+            self._milp = DispatchLP(battery, horizon, use_binary=True)
+        self.duals = duals
+        self._dual_lp = DispatchLP(battery, horizon, grid_cost_only=True) if duals else None
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Lost één venster op.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Optimalisatie-uitvoer: U (6×N), SOC, status en (met duals=True) duals
+        """
+        result = self._solve(data)
+        if self._dual_lp is not None and result.status == "optimal":
+            result.duals = dispatch_duals(self._dual_lp, data)
+        return result
+
+    def _solve(self, data: MPCInputData) -> MPCResult:
+        """Lost één venster op als LP (met MILP-terugval) of direct als MILP."""
+        if self._lp is not None:
+            self._lp.update(data)
+            res = self._lp.solve()
+            if not self.has_battery:
+                return self._result(self._lp, res, data)
+
+            if res.status == 0 and not self._is_simultaneous(self._lp, res.x):
+                self.stats.lp += 1
+                return self._result(self._lp, res, data)
+            self.stats.fallbacks += 1
+
+        # MILP: direct (modus 'milp') of als terugval na een afgekeurde LP-oplossing
+        if self._milp is None:
+            self._milp = DispatchLP(self.battery, self.N, use_binary=True)
+        self._milp.update(data)
+        res = self._milp.solve()
+        self.stats.milp += 1
+        return self._result(self._milp, res, data)
+
+    @staticmethod
+    def _is_simultaneous(lp: DispatchLP, x: np.ndarray) -> bool:
+        """Controleert of de oplossing in enige tijdstap tegelijk laadt en ontlaadt."""
+        return bool(np.any(np.minimum(x[lp.ic], x[lp.id]) > SIMULTANEOUS_TOL))
+
+    @staticmethod
+    def _result(lp: DispatchLP, res, data: MPCInputData) -> MPCResult:
+        """Zet een scipy-oplossing om naar een MPCResult met dezelfde rijen als MPCController."""
+        return dispatch_result(lp, res.x, STATUS_MAP.get(res.status, "solver_error"), data)
+
+
+def dispatch_result(lp: DispatchLP, x: np.ndarray, status: str, data: MPCInputData) -> MPCResult:
+    """
+    Zet een oplossingsvector van DispatchLP om naar een MPCResult met dezelfde rijen als MPCController.
+
+    Args:
+        lp (DispatchLP): Probleem waarvan x de oplossing is.
+        x (np.ndarray): Oplossingsvector (None als er geen oplossing is).
+        status (str): Status in cvxpy-notatie (bijv. 'optimal').
+        data (MPCInputData): Invoer van het venster.
+
+    Returns:
+        MPCResult: Optimalisatie-uitvoer: U (6×N), SOC, status
+    """
+    N = lp.N
+    if x is None:
+        return MPCResult(U=np.full((6, N), np.nan), SOC=np.full(N + 1, np.nan), status=status)
+
+    P_load = np.asarray(data.P_load, dtype=float)
+    P_pv_used = x[lp.ipv]
+
+    if not lp.has_battery:
+        return MPCResult(
+            U=np.vstack([
+                P_load - P_pv_used,  # P_grid
+                np.zeros(N),         # P_charge
+                np.zeros(N),         # P_discharge
+                P_pv_used,
+                np.zeros(N),
+                np.zeros(N)
+            ]),
+            SOC=np.zeros(N + 1),
+            status=status
+        )
+
+    P_charge = x[lp.ic]
+    P_discharge = x[lp.id]
+    return MPCResult(
+        U=np.vstack([
+            P_load - P_pv_used + P_charge - P_discharge,            # P_grid
+            P_charge,
+            P_discharge,
+            P_pv_used,
+            np.minimum(P_charge, np.asarray(data.P_pv_available)),  # PV naar batterij
+            np.minimum(P_pv_used, P_load)                           # PV naar load
+        ]),
+        SOC=x[lp.isoc],
+        status=status
+    )
+
+
+def dispatch_duals(lp: DispatchLP, data: MPCInputData) -> dict:
+    """
+    Marginale waarden van één venster uit het netkosten-LP.
+
+    Het LP wordt met scipy.optimize.linprog (HiGHS) opgelost; de marginals van de variabele-
+    grenzen zijn de gevoeligheden van de netkosten. Alle waarden zijn de kostendaling per
+    eenheid versoepeling en dus ≥ 0 (op THROUGHPUT_PENALTY na).
+
+    Beperkingen:
+    - Het is een apart LP: alleen netkosten plus THROUGHPUT_PENALTY, zonder binaire variabelen
+      en zonder de stuurgewichten. De dispatch zelf komt van het MILP van SparseMPCController
+      en kan daarvan afwijken; de duals beschrijven het netkosten-optimum van het venster.
+    - Het zijn lokale gevoeligheden van één venster per stap: een grens van stap t met ε
+      versoepelen verlaagt de LP-kosten met dual·ε, zolang de basis niet wisselt. Opgeteld over
+      de eerste stappen van een simulatie is het geen jaarwaarde van extra capaciteit of vermogen.
+
+    Args:
+        lp (DispatchLP): Probleem met grid_cost_only=True en zonder binaire variabelen.
+        data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+    Returns:
+        dict: Per tijdstap (N waarden), of None als het LP niet optimaal is:
+            soc_max [€/kWh]: extra capaciteit boven soc_max (SOC na stap t),
+            soc_min [€/kWh]: extra capaciteit onder soc_min (SOC na stap t),
+            power_max_charge [€/kW]: extra laadvermogen in stap t,
+            power_max_discharge [€/kW]: extra ontlaadvermogen in stap t,
+            pv_available [€/kW]: extra PV-aanbod in stap t.
+    """
+    lp.update(data)
+    A = lp.A.tocsr()
+    equal = lp.row_lb == lp.row_ub
+    upper = ~equal & np.isfinite(lp.row_ub)
+    lower = ~equal & np.isfinite(lp.row_lb)
+    res = linprog(lp.c,
+                  A_ub=sp.vstack([A[upper], -A[lower]]),
+                  b_ub=np.concatenate([lp.row_ub[upper], -lp.row_lb[lower]]),
+                  A_eq=A[equal], b_eq=lp.row_ub[equal],
+                  bounds=np.column_stack([lp.lb, lp.ub]),
+                  method="highs")
+    if res.status != 0:
+        return None
+
+    # linprog geeft d(kosten)/d(grens): ≤ 0 voor bovengrenzen, ≥ 0 voor ondergrenzen
+    relax_upper = -res.upper.marginals
+    relax_lower = res.lower.marginals
+    N = lp.N
+    if not lp.has_battery:
+        return {"soc_max": np.zeros(N), "soc_min": np.zeros(N), "power_max_charge": np.zeros(N),
+                "power_max_discharge": np.zeros(N), "pv_available": relax_upper[lp.ipv]}
+
+    capacity = lp.battery.capacity_kWh
+    soc_next = slice(lp.isoc.start + 1, lp.isoc.stop)
+    return {
+        "soc_max": relax_upper[soc_next] / capacity,
+        "soc_min": relax_lower[soc_next] / capacity,
+        "power_max_charge": relax_upper[lp.ic],
+        "power_max_discharge": relax_upper[lp.id],
+        "pv_available": relax_upper[lp.ipv] + relax_upper[lp.iw],
+    }
@@ -0,0 +1,202 @@
+"""
+mpc/speculative.py
+
+Speculatief parallel oplossen van komende vensters voor een handvol kandidaat-SOC's.
+
+De rollende simulatie is alleen sequentieel via battery.soc: vraag, PV en prijs van de komende
+vensters liggen al vast. Terwijl het hoofdproces venster t afhandelt, lossen werkprocessen de
+vensters t+1 … t+lookahead al op voor de SOC die het huidige plan voorspelt, plus en min een
+paar emmers (bucket_width); verschuift de voorspelling bij een later plan, dan wordt de nieuwe
+voorspelde SOC als extra kandidaat ingediend. Zodra de werkelijke SOC bekend is:
+- ligt die op een kandidaat (binnen match_tol), dan wordt diens eerste actie gebruikt;
+- ligt die tussen twee kandidaten, dan wordt de eerste actie lineair geïnterpoleerd (exact
+  zolang beide in hetzelfde kritische gebied van het parametrische LP liggen);
+- anders lost de lokale regelaar het venster zelf op.
+
+Elk werkproces bouwt zijn regelaar één keer op via een picklebare factory(battery). De batterij-
+toestand (capaciteit, soc_max) wordt per taak meegestuurd. Door degradatie tussen speculatie en
+gebruik kan die enkele stappen verouderd zijn; daarom wordt ook een exacte treffer, net als een
+interpolatie, met project_action() op de actuele grenzen gerepareerd en als eerste stap
+(first_step_result) teruggegeven.
+
+De procespool wordt in __init__ gestart; gebruik de regelaar als contextmanager of roep close()
+aan in een finally-blok, zodat de werkprocessen ook bij een fout stoppen.
+"""
+import copy
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.actions import project_action, first_step_result
+
+_worker = {}   # regelaar en batterij per werkproces
+
+
+def _init_worker(factory, battery: Battery):
+    """Bouwt de regelaar van een werkproces één keer op."""
+    battery = copy.deepcopy(battery)
+    _worker["battery"] = battery
+    _worker["controller"] = factory(battery)
+
+
+def _solve_candidate(data: MPCInputData, capacity_kWh: float, soc_max: float) -> MPCResult:
+    """Lost één venster op in een werkproces met de meegestuurde batterijtoestand."""
+    battery = _worker["battery"]
+    battery.capacity_kWh = capacity_kWh
+    battery.soc_max = soc_max
+    return _worker["controller"].solve(data)
+
+
+@dataclass
+class SpeculationStats:
+    """
+    Tellers van de speculatieve regelaar.
+
+    Attributen:
+        hits (int): Vensters met een kandidaat op de werkelijke SOC.
+        interpolated (int): Vensters geïnterpoleerd tussen twee kandidaten en gerepareerd.
+        misses (int): Vensters lokaal opgelost.
+        submitted (int): Aantal speculatieve taken.
+    """
+    hits: int = 0
+    interpolated: int = 0
+    misses: int = 0
+    submitted: int = 0
+
+
+class SpeculativeController:
+    """
+    Lost komende vensters speculatief op in een procespool en valt terug op een lokale regelaar.
+
+    Attributen:
+        controller: Lokale regelaar voor vensters zonder bruikbare kandidaat.
+        battery (Battery): Batterij van de simulatie.
+        window: Functie window(t, soc) -> MPCInputData voor tijdstap t.
+        n_windows (int): Aantal vensters in de simulatie.
+        lookahead (int): Aantal vensters dat vooruit wordt opgelost.
+        buckets (int): Aantal emmers aan elke kant van de voorspelde SOC.
+        bucket_width (float): Breedte van een emmer (SOC-fractie).
+        match_tol (float): Grootste SOC-afwijking waarbij een kandidaat direct wordt gebruikt.
+        interpolate (bool): Interpoleer tussen twee kandidaten i.p.v. lokaal op te lossen.
+        speculation (SpeculationStats): Tellers van treffers, interpolaties en missers.
+    """
+
+    def __init__(self, controller, factory, battery: Battery, window, n_windows: int, lookahead: int = 4,
+                 buckets: int = 2, bucket_width: float = 0.01, match_tol: float = 1e-9,
+                 interpolate: bool = True, workers: int = None):
+        if lookahead < 1 or buckets < 0 or bucket_width <= 0:
+            raise ValueError("lookahead moet minstens 1 zijn, buckets niet negatief en bucket_width positief.")
+        self.controller = controller
+        self.battery = battery
+        self.window = window
+        self.n_windows = n_windows
+        self.lookahead = lookahead
+        self.buckets = buckets
+        self.bucket_width = bucket_width
+        self.match_tol = match_tol
+        self.interpolate = interpolate
+        self.speculation = SpeculationStats()
+
+        self._executor = ProcessPoolExecutor(max_workers=workers or max(1, (os.cpu_count() or 1) - 1),
+                                             initializer=_init_worker, initargs=(factory, battery))
+        self._pending = {}    # t -> {kandidaat-SOC: future}
+        self._t = 0
+
+        if hasattr(controller, "stats"):
+            self.stats = controller.stats
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Geeft het resultaat voor het huidige venster en start de speculatie voor de volgende.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC van venster t
+
+        Returns:
+            MPCResult: Plan van de lokale regelaar, of de gerepareerde eerste stap (U 6×1) van een
+            kandidaat of een interpolatie tussen twee kandidaten.
+        """
+        t = self._t
+        self._t += 1
+        result, plan = self._from_candidates(self._pending.pop(t, {}), data)
+        if result is None:
+            self.speculation.misses += 1
+            result = plan = self.controller.solve(data)
+
+        if result.status == "optimal":
+            self._speculate(t, plan)
+        return result
+
+    def close(self):
+        """Stopt de werkprocessen (lopende speculatie wordt afgebroken)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _from_candidates(self, candidates: dict, data: MPCInputData):
+        """
+        Zoekt een bruikbare kandidaat of interpoleert tussen twee.
+
+        Returns:
+            tuple: (gerepareerde eerste stap, plan voor de volgende speculatie), of (None, None)
+            als dat niet lukt. Bij een treffer is het plan het volledige plan van de kandidaat, met de
+            SOC verschoven naar de SOC na de gerepareerde eerste stap.
+        """
+        if not candidates:
+            return None, None
+        soc = float(data.soc_init)
+        socs = np.array(sorted(candidates))
+        nearest = socs[np.argmin(np.abs(socs - soc))]
+        if abs(nearest - soc) <= self.match_tol:
+            plan = candidates[nearest].result()
+            if plan.status == "optimal":
+                self.speculation.hits += 1
+                result = first_step_result(data, self.battery, *project_action(plan.U[1:4, 0], data, self.battery))
+                # Voorspelde SOC's van het plan verschoven naar de werkelijk bereikte SOC na de reparatie
+                return result, dataclasses.replace(plan, SOC=plan.SOC + (result.SOC[1] - plan.SOC[1]))
+
+        if not self.interpolate or soc < socs[0] or soc > socs[-1]:
+            return None, None
+        upper = int(np.searchsorted(socs, soc))
+        lower_result = candidates[socs[upper - 1]].result()
+        upper_result = candidates[socs[upper]].result()
+        if lower_result.status != "optimal" or upper_result.status != "optimal":
+            return None, None
+
+        weight = (soc - socs[upper - 1]) / (socs[upper] - socs[upper - 1])
+        action = (1 - weight) * lower_result.U[1:4, 0] + weight * upper_result.U[1:4, 0]
+        self.speculation.interpolated += 1
+        result = first_step_result(data, self.battery, *project_action(action, data, self.battery))
+        return result, result
+
+    def _speculate(self, t: int, result: MPCResult):
+        """Start taken voor de komende vensters rond de door het plan voorspelde SOC."""
+        battery = self.battery
+        for ahead in range(1, min(self.lookahead + 1, len(result.SOC))):
+            step = t + ahead
+            if step >= self.n_windows:
+                break
+            predicted = float(result.SOC[ahead])
+            pending = self._pending.setdefault(step, {})
+            if pending:
+                # Nieuwere voorspelling: alleen de voorspelde SOC zelf toevoegen als die nog ontbreekt
+                if min(abs(soc - predicted) for soc in pending) <= self.match_tol:
+                    continue
+                candidates = {predicted}
+            else:
+                candidates = {min(max(predicted + k * self.bucket_width, battery.soc_min), battery.soc_max)
+                              for k in range(-self.buckets, self.buckets + 1)}
+            base = self.window(step, predicted)
+            for soc in candidates:
+                pending[soc] = self._executor.submit(_solve_candidate, dataclasses.replace(base, soc_init=soc),
+                                                     battery.capacity_kWh, battery.soc_max)
+            self.speculation.submitted += len(candidates)
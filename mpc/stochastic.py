@@ -0,0 +1,188 @@
+"""
+mpc/stochastic.py
+
+Scenario-gebaseerde stochastische MPC met een blok-sparse LP.
+
+run_full_mpc behandelt P_load en P_pv_available als exact. StochasticMPCController trekt per
+venster K scenario's rond de voorspelling met hetzelfde ruismodel als DataGenerator:
+- vraag: additieve normale ruis (sigma 0.02 kW), afgekapt op [0.1, 5.0] kW;
+- PV: een wolkenfactor per uur uniform in cloud_range, gedeeld door het gemiddelde daarvan
+  zodat de verwachting gelijk blijft aan de voorspelling.
+De eerste stap is gemeten en in alle scenario's gelijk.
+
+ScenarioDispatchLP zet K kopieën van het DispatchLP-probleem als blokdiagonaal naast elkaar
+(sp.kron(I_K, A)) en koppelt ze alleen via non-anticipativiteit op de eerste stap:
+P_charge_k[0] = P_charge_0[0] en P_discharge_k[0] = P_discharge_0[0]. De kosten zijn het
+gemiddelde over de scenario's. Het aantal niet-nullen groeit lineair met K, en HiGHS
+profiteert van de blokstructuur.
+
+Elk scenario gebruikt de netkosten van DispatchLP met grid_cost_only: zonder de stuurgewichten
+van run_full_mpc maakt THROUGHPUT_PENALTY gelijktijdig laden en ontladen onaantrekkelijk, zodat
+geen binaire variabelen (K keer zoveel) nodig zijn. Alleen de gedeelde eerste actie wordt
+toegepast; project_action() zet die op de grenzen van de eerste stap.
+"""
+from dataclasses import dataclass
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import milp, Bounds, LinearConstraint
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.actions import project_action, first_step_result
+from mpc.controller import SolveStats
+from mpc.sparse_backend import DispatchLP, HIGHS_OPTIONS, STATUS_MAP
+
+
+@dataclass
+class ScenarioModel:
+    """
+    Ruismodel voor vraag- en PV-scenario's in de stijl van DataGenerator.
+
+    Attributen:
+        load_sigma (float): Standaardafwijking van de vraagruis [kW].
+        cloud_range (tuple): Bereik van de uniforme wolkenfactor voor PV.
+        load_clip (tuple): Onder- en bovengrens van de vraag [kW].
+    """
+    load_sigma: float = 0.02
+    cloud_range: tuple = (0.6, 1.0)
+    load_clip: tuple = (0.1, 5.0)
+
+    def sample(self, data: MPCInputData, n_scenarios: int, rng: np.random.Generator) -> tuple:
+        """
+        Trekt scenario's rond de voorspelling van een venster.
+
+        Args:
+            data (MPCInputData): Venster met de voorspelde vraag en PV
+            n_scenarios (int): Aantal scenario's K
+            rng (np.random.Generator): Bron van toeval
+
+        Returns:
+            tuple: (P_load, P_pv_available), elk K×N; de eerste stap is in alle scenario's gelijk.
+        """
+        load = np.asarray(data.P_load, dtype=float)
+        pv = np.asarray(data.P_pv_available, dtype=float)
+        N = len(load)
+
+        loads = np.clip(load + rng.normal(0, self.load_sigma, (n_scenarios, N)), *self.load_clip)
+        low, high = self.cloud_range
+        pvs = pv * rng.uniform(low, high, (n_scenarios, N)) / ((low + high) / 2)
+
+        # Eerste stap is gemeten
+        loads[:, 0] = load[0]
+        pvs[:, 0] = pv[0]
+        return loads, pvs
+
+
+class ScenarioDispatchLP:
+    """
+    K scenario's van DispatchLP als één blok-sparse LP met non-anticipativiteit op de eerste stap.
+
+    Variabelen: K aaneengesloten blokken met de kolomindeling van DispatchLP.
+
+    Attributen:
+        base (DispatchLP): Probleem van één scenario (LP met alleen netkosten).
+        K (int): Aantal scenario's.
+        A (sp.csc_matrix): [kron(I_K, base.A); non-anticipativiteit].
+        c, lb, ub, row_lb, row_ub (np.ndarray): Per venster bijgewerkte vectoren.
+    """
+
+    def __init__(self, battery: Battery, horizon: int, n_scenarios: int):
+        if n_scenarios < 1:
+            raise ValueError("n_scenarios moet minstens 1 zijn.")
+        self.base = DispatchLP(battery, horizon, grid_cost_only=True)
+        self.K = n_scenarios
+        n = self.base.n_var
+
+        # Non-anticipativiteit: eerste laad- en ontlaadvermogen van scenario k gelijk aan scenario 0
+        first = [self.base.ic.start, self.base.id.start]
+        k = np.repeat(np.arange(1, n_scenarios), len(first))
+        col = np.tile(first, n_scenarios - 1)
+        r = np.arange(len(k))
+        self._coupling = sp.csc_matrix(
+            (np.concatenate([np.ones(len(k)), -np.ones(len(k))]),
+             (np.concatenate([r, r]), np.concatenate([k * n + col, col]))),
+            shape=(len(k), n_scenarios * n))
+
+        self.row_lb = np.concatenate([np.tile(self.base.row_lb, n_scenarios), np.zeros(len(k))])
+        self.row_ub = np.concatenate([np.tile(self.base.row_ub, n_scenarios), np.zeros(len(k))])
+        self.c = np.zeros(n_scenarios * n)
+        self.lb = np.zeros(n_scenarios * n)
+        self.ub = np.zeros(n_scenarios * n)
+        self.A = None
+
+    def update(self, data: MPCInputData, loads: np.ndarray, pvs: np.ndarray):
+        """
+        Zet de vectoren van alle scenario's en bouwt A opnieuw met de actuele alpha/beta.
+
+        Args:
+            data (MPCInputData): Venster met prijs en begin-SOC
+            loads, pvs (np.ndarray): Scenario's van vraag en PV (K×N)
+        """
+        base = self.base
+        n = base.n_var
+        m = base.A.shape[0]
+        for k in range(self.K):
+            base.update(MPCInputData(P_load=loads[k], P_pv_available=pvs[k], price=data.price,
+                                     soc_init=data.soc_init))
+            self.c[k * n:(k + 1) * n] = base.c / self.K
+            self.lb[k * n:(k + 1) * n] = base.lb
+            self.ub[k * n:(k + 1) * n] = base.ub
+            self.row_ub[k * m:(k + 1) * m] = base.row_ub
+
+        # alpha/beta veranderen met de degradatie; kron kost O(K·nnz), verwaarloosbaar t.o.v. de solve
+        self.A = sp.vstack([sp.kron(sp.identity(self.K, format="csc"), base.A, format="csc"),
+                            self._coupling], format="csc")
+
+    def solve(self):
+        """Lost het scenarioprobleem op met HiGHS (zie DispatchLP.solve)."""
+        return milp(self.c,
+                    bounds=Bounds(self.lb, self.ub),
+                    constraints=LinearConstraint(self.A, self.row_lb, self.row_ub),
+                    options=HIGHS_OPTIONS)
+
+
+class StochasticMPCController:
+    """
+    Stochastische MPC: één gedeelde eerste actie over K getrokken vraag/PV-scenario's.
+
+    Attributen:
+        battery (Battery): Batterij van het scenario.
+        N (int): Horizonlengte.
+        K (int): Aantal scenario's.
+        model (ScenarioModel): Ruismodel voor de scenario's.
+        stats (SolveStats): Aantal opgeloste vensters (als LP).
+    """
+
+    def __init__(self, battery: Battery, horizon: int, n_scenarios: int = 20, model: ScenarioModel = None,
+                 seed: int = 0):
+        if battery is None or battery.capacity_kWh <= 0:
+            raise ValueError("De stochastische regelaar heeft een batterij nodig.")
+        self.battery = battery
+        self.N = horizon
+        self.K = n_scenarios
+        self.model = model or ScenarioModel()
+        self.stats = SolveStats()
+        self._lp = ScenarioDispatchLP(battery, horizon, n_scenarios)
+        self._rng = np.random.default_rng(seed)
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Lost één venster op over de scenario's.
+
+        Args:
+            data (MPCInputData): Voorspelde vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Alleen de gedeelde eerste stap (U 6×1, SOC 2 waarden).
+        """
+        loads, pvs = self.model.sample(data, self.K, self._rng)
+        self._lp.update(data, loads, pvs)
+        res = self._lp.solve()
+        status = STATUS_MAP.get(res.status, "solver_error")
+        if status != "optimal":
+            return MPCResult(U=np.full((6, 1), np.nan), SOC=np.full(2, np.nan), status=status)
+
+        self.stats.lp += 1
+        base = self._lp.base
+        action = np.array([res.x[base.ic.start], res.x[base.id.start], res.x[base.ipv.start]])
+        return first_step_result(data, self.battery, *project_action(action, data, self.battery))
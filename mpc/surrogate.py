@@ -0,0 +1,265 @@
+"""
+mpc/surrogate.py
+
+Aangeleerde dispatchregel: een klein regressiemodel dat de eerste MPC-actie voorspelt.
+
+Een jaarsimulatie levert per scenario duizenden paren (invoervenster, eerste actie). Met
+DecisionLogger worden die paren tijdens run_simulation opgeslagen; SurrogateModel.fit() leert
+daaruit de afbeelding
+
+    (P_load, P_pv_available, prijs, soc_init, batterijparameters) -> (P_charge, P_discharge, P_pv_used)
+
+Het model is een ensemble van netwerken met één verborgen ReLU-laag: de verborgen laag is
+willekeurig en vast, de uitvoerlaag wordt met ridge-regressie in gesloten vorm bepaald. Dat
+traint in seconden met alleen NumPy. De spreiding tussen de ensembleleden dient als maat voor
+de betrouwbaarheid.
+
+train_surrogate() (of vanaf de opdrachtregel: python train_surrogate.py model.npz beslissingen_*.npz)
+voegt de gelogde bestanden samen, traint het model en slaat het op voor surrogate_model.
+
+SurrogateController past het model toe, projecteert de actie op de batterijgrenzen (vermogen,
+SOC-grenzen, geen gelijktijdig laden en ontladen, P_grid ≥ 0) en valt terug op de exacte MPC
+als de spreiding boven max_spread ligt. Omdat de batterijparameters in de invoer zitten, kan
+één model veel configuraties doorrekenen zonder per venster een optimalisatie op te lossen.
+"""
+from dataclasses import dataclass
+import numpy as np
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.actions import project_action, first_step_result
+
+
+def window_features(data: MPCInputData, battery: Battery) -> np.ndarray:
+    """
+    Zet een venster en de actuele batterijtoestand om naar een kenmerkvector.
+
+    Args:
+        data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+        battery (Battery): Batterij (met actuele capaciteit en soc_max na degradatie).
+
+    Returns:
+        np.ndarray: [P_load, P_pv_available, prijs, soc_init, soc_min, soc_max, capaciteit,
+        P_max laden, P_max ontladen, eta_ch, eta_dis]
+    """
+    return np.concatenate([
+        np.asarray(data.P_load, dtype=float),
+        np.asarray(data.P_pv_available, dtype=float),
+        np.asarray(data.price, dtype=float),
+        [float(data.soc_init), battery.soc_min, battery.soc_max, battery.capacity_kWh,
+         battery.power_max_charge, battery.power_max_discharge, battery.eta_ch, battery.eta_dis]
+    ])
+
+
+class DecisionLogger:
+    """
+    Omhult een MPC-regelaar en bewaart per optimaal venster de kenmerken en de eerste actie.
+
+    Attributen:
+        controller: Onderliggende regelaar met solve(MPCInputData) -> MPCResult.
+        battery (Battery): Batterij waarvan de parameters in de kenmerken komen.
+        features (list[np.ndarray]): Kenmerkvectoren van de gelogde vensters.
+        actions (list[np.ndarray]): Eerste actie (P_charge, P_discharge, P_pv_used) per venster.
+    """
+
+    def __init__(self, controller, battery: Battery):
+        self.controller = controller
+        self.battery = battery
+        self.features = []
+        self.actions = []
+
+        if hasattr(controller, "stats"):
+            self.stats = controller.stats
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """Lost het venster op met de onderliggende regelaar en logt de eerste actie."""
+        result = self.controller.solve(data)
+        if result.status == "optimal":
+            self.features.append(window_features(data, self.battery))
+            self.actions.append(np.array([result.U[1][0], result.U[2][0], result.U[3][0]], dtype=float))
+        return result
+
+    def save(self, path: str):
+        """Slaat de gelogde paren op als .npz-bestand (F: kenmerken, Y: acties)."""
+        np.savez_compressed(path, F=np.array(self.features), Y=np.array(self.actions))
+
+
+def load_decisions(paths: list) -> tuple:
+    """
+    Leest met DecisionLogger.save() opgeslagen bestanden in en voegt ze samen.
+
+    Args:
+        paths (list[str]): Paden naar .npz-bestanden met dezelfde horizonlengte.
+
+    Returns:
+        tuple: (F, Y) met kenmerken (n × d) en acties (n × 3).
+    """
+    F, Y = [], []
+    for path in paths:
+        with np.load(path) as f:
+            F.append(f["F"])
+            Y.append(f["Y"])
+    return np.vstack(F), np.vstack(Y)
+
+
+@dataclass
+class SurrogateModel:
+    """
+    Ensemble van netwerken met een vaste, willekeurige ReLU-laag en een ridge-uitvoerlaag.
+
+    Attributen:
+        mean (np.ndarray): Gemiddelde per kenmerk (normalisatie).
+        scale (np.ndarray): Standaardafwijking per kenmerk (normalisatie).
+        W (np.ndarray): E × d × h gewichten van de verborgen lagen.
+        b (np.ndarray): E × h biases van de verborgen lagen.
+        V (np.ndarray): E × (h+1) × 3 gewichten van de uitvoerlagen (laatste rij = bias).
+    """
+    mean: np.ndarray
+    scale: np.ndarray
+    W: np.ndarray
+    b: np.ndarray
+    V: np.ndarray
+
+    @classmethod
+    def fit(cls, F: np.ndarray, Y: np.ndarray, n_hidden: int = 256, n_models: int = 5,
+            ridge: float = 1e-2, seed: int = 0) -> "SurrogateModel":
+        """
+        Traint het ensemble op gelogde paren.
+
+        Args:
+            F (np.ndarray): Kenmerken (n × d), zie window_features().
+            Y (np.ndarray): Acties (n × 3): P_charge, P_discharge, P_pv_used.
+            n_hidden (int): Aantal verborgen neuronen per ensemblelid.
+            n_models (int): Aantal ensembleleden.
+            ridge (float): Regularisatie van de uitvoerlaag.
+            seed (int): Startwaarde voor de willekeurige verborgen lagen.
+
+        Returns:
+            SurrogateModel: Getraind model.
+        """
+        F = np.asarray(F, dtype=float)
+        Y = np.asarray(Y, dtype=float)
+        mean = F.mean(axis=0)
+        # (Bijna) constante kenmerken, zoals de parameters van één batterijconfiguratie, niet opblazen
+        scale = np.maximum(F.std(axis=0), 1e-3 * np.maximum(np.abs(mean), 1.0))
+        Z = (F - mean) / scale
+
+        rng = np.random.default_rng(seed)
+        d = F.shape[1]
+        W = rng.normal(0.0, 1.0 / np.sqrt(d), size=(n_models, d, n_hidden))
+        b = rng.normal(0.0, 1.0, size=(n_models, n_hidden))
+        V = np.empty((n_models, n_hidden + 1, Y.shape[1]))
+        for e in range(n_models):
+            # Elk lid ziet een bootstrap-steekproef, zodat de spreiding de onzekerheid weerspiegelt
+            rows = rng.integers(0, len(Z), size=len(Z))
+            H = cls._hidden(Z[rows], W[e], b[e])
+            V[e] = np.linalg.solve(H.T @ H + ridge * len(H) * np.eye(H.shape[1]), H.T @ Y[rows])
+        return cls(mean=mean, scale=scale, W=W, b=b, V=V)
+
+    @staticmethod
+    def _hidden(Z: np.ndarray, W: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """ReLU-activaties met een extra kolom enen voor de bias van de uitvoerlaag."""
+        H = np.maximum(Z @ W + b, 0.0)
+        return np.hstack([H, np.ones((len(H), 1))])
+
+    def predict(self, F: np.ndarray) -> tuple:
+        """
+        Voorspelt acties voor een of meer kenmerkvectoren.
+
+        Args:
+            F (np.ndarray): Kenmerken (d of n × d).
+
+        Returns:
+            tuple: (gemiddelde, spreiding), elk n × 3; de spreiding is de standaardafwijking
+            tussen de ensembleleden [kW].
+        """
+        Z = (np.atleast_2d(F) - self.mean) / self.scale
+        predictions = np.stack([self._hidden(Z, self.W[e], self.b[e]) @ self.V[e]
+                                for e in range(len(self.V))])
+        return predictions.mean(axis=0), predictions.std(axis=0)
+
+    def save(self, path: str):
+        """Slaat het model op als .npz-bestand."""
+        np.savez_compressed(path, mean=self.mean, scale=self.scale, W=self.W, b=self.b, V=self.V)
+
+    @classmethod
+    def load(cls, path: str) -> "SurrogateModel":
+        """Leest een met save() opgeslagen model in."""
+        with np.load(path) as f:
+            return cls(mean=f["mean"], scale=f["scale"], W=f["W"], b=f["b"], V=f["V"])
+
+
+def train_surrogate(decision_paths: list, model_path: str, **fit_options) -> SurrogateModel:
+    """
+    Traint een SurrogateModel op met DecisionLogger opgeslagen beslissingen en slaat het op.
+
+    Args:
+        decision_paths (list[str]): .npz-bestanden van DecisionLogger.save() (zie decision_log).
+        model_path (str): Pad voor het getrainde model (in te lezen via surrogate_model).
+        **fit_options: Doorgegeven aan SurrogateModel.fit (n_hidden, n_models, ridge, seed).
+
+    Returns:
+        SurrogateModel: Getraind en opgeslagen model.
+    """
+    F, Y = load_decisions(decision_paths)
+    model = SurrogateModel.fit(F, Y, **fit_options)
+    model.save(model_path)
+    return model
+
+
+@dataclass
+class SurrogateStats:
+    """
+    Telt hoe vensters door de surrogaatregelaar zijn afgehandeld.
+
+    Attributen:
+        predicted (int): Afgehandeld met het model.
+        fallbacks (int): Spreiding te groot: exact opgelost.
+    """
+    predicted: int = 0
+    fallbacks: int = 0
+
+
+class SurrogateController:
+    """
+    Regelaar die de eerste actie voorspelt met een SurrogateModel en bij twijfel exact oplost.
+
+    Het resultaat bevat alleen de eerste stap (U is 6×1, SOC heeft 2 waarden), met dezelfde
+    rijen als MPCController.
+
+    Attributen:
+        model (SurrogateModel): Getraind model.
+        fallback: Exacte regelaar met solve(MPCInputData) -> MPCResult.
+        battery (Battery): Batterij (voor de kenmerken en de projectie).
+        max_spread (float): Grootste toegestane ensemblespreiding [kW] om het model te gebruiken.
+        usage (SurrogateStats): Tellers van voorspelde en exact opgeloste vensters.
+    """
+
+    def __init__(self, model: SurrogateModel, fallback, battery: Battery, max_spread: float = 0.05):
+        self.model = model
+        self.fallback = fallback
+        self.battery = battery
+        self.max_spread = max_spread
+        self.usage = SurrogateStats()
+
+        if hasattr(fallback, "stats"):
+            self.stats = fallback.stats
+
+    def solve(self, data: MPCInputData) -> MPCResult:
+        """
+        Geeft de geprojecteerde voorspelling, of de exacte oplossing als het model twijfelt.
+
+        Args:
+            data (MPCInputData): Vraag, PV-aanbod, prijs, initiele SOC
+
+        Returns:
+            MPCResult: Optimalisatie-uitvoer: U (6×1 of 6×N), SOC, status
+        """
+        mean, spread = self.model.predict(window_features(data, self.battery))
+        if spread.max() > self.max_spread:
+            self.usage.fallbacks += 1
+            return self.fallback.solve(data)
+
+        self.usage.predicted += 1
+        action = project_action(mean[0], data, self.battery)
+        return first_step_result(data, self.battery, *action)
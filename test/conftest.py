@@ -0,0 +1,65 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+# Tests draaien vanuit de projectmap of vanuit test/: de modules staan één map hoger
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.battery import Battery
+from models.mpc_data import MPCInputData, MPCResult
+from mpc.controller import WEIGHT_PV_CHARGE, WEIGHT_DISCHARGE_PRICE
+
+warnings.filterwarnings("ignore", module="cvxpy")
+
+
+def make_battery(capacity_kWh: float = 2.4, soc: float = 0.5) -> Battery:
+    """Batterij zoals in de scenario's van main.py."""
+    return Battery(soc=soc, soc_min=0.2, soc_max_init=0.95, capacity_kWh_nominal=capacity_kWh,
+                   max_cycles=6000, voltage=48, max_ampere_charge=105, max_ampere_discharge=105)
+
+
+def make_window(horizon: int = 12, start_hour: int = 6, pv_peak: float = 2.0, soc: float = 0.5,
+                seed: int = 0) -> MPCInputData:
+    """Vast venster met een dagprofiel voor PV en een prijs met een ochtend- en avondpiek."""
+    rng = np.random.default_rng(seed)
+    hours = (start_hour + np.arange(horizon)) % 24
+    pv = pv_peak * np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None)
+    load = rng.uniform(0.3, 1.5, horizon)
+    price = 0.20 + 0.10 * np.cos((hours - 19) / 24 * 2 * np.pi) + rng.uniform(-0.02, 0.02, horizon)
+    return MPCInputData(P_load=load, P_pv_available=pv, price=price, soc_init=soc)
+
+
+def window_at(series: MPCInputData, t: int, horizon: int, soc: float) -> MPCInputData:
+    """Venster van horizon stappen vanaf t uit een langere reeks, zoals in de simulatielus van main.py."""
+    return MPCInputData(P_load=series.P_load[t:t + horizon], P_pv_available=series.P_pv_available[t:t + horizon],
+                        price=series.price[t:t + horizon], soc_init=soc)
+
+
+def objective(result: MPCResult, data: MPCInputData) -> float:
+    """Doelfunctie van run_full_mpc (netkosten met de stuurgewichten) voor een plan."""
+    P_grid, P_charge, P_discharge = result.U[0], result.U[1], result.U[2]
+    price = np.asarray(data.price, dtype=float)
+    pv = np.asarray(data.P_pv_available, dtype=float)
+    return float(price @ P_grid
+                 - WEIGHT_PV_CHARGE * np.minimum(P_charge, pv).sum()
+                 - WEIGHT_DISCHARGE_PRICE * price @ P_discharge)
+
+
+def grid_cost(result: MPCResult, data: MPCInputData) -> float:
+    """Netkosten prijs·P_grid van een plan."""
+    return float(np.asarray(data.price, dtype=float) @ result.U[0])
+
+
+@pytest.fixture
+def battery() -> Battery:
+    return make_battery()
+
+
+@pytest.fixture(params=[(6, 2.0), (18, 0.0)], ids=["dag", "avond"])
+def window(request) -> MPCInputData:
+    start_hour, pv_peak = request.param
+    return make_window(start_hour=start_hour, pv_peak=pv_peak)
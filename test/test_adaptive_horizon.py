@@ -0,0 +1,24 @@
+import pytest
+
+from conftest import make_battery, make_window
+from mpc.adaptive_horizon import AdaptiveHorizonController, required_horizon
+from mpc.sparse_backend import SparseMPCController
+
+
+@pytest.mark.parametrize("max_horizon, horizon_min, horizon_step", [(24, 6, 6), (13, 6, 4), (5, 5, 6), (12, 1, 1)])
+def test_chosen_horizon_within_max(max_horizon, horizon_min, horizon_step):
+    """De gekozen horizon dekt de benodigde vooruitblik maar is nooit langer dan de aangeleverde Np."""
+    battery = make_battery()
+    controller = AdaptiveHorizonController(lambda horizon: SparseMPCController(battery, horizon), battery,
+                                           max_horizon, horizon_min=horizon_min, horizon_step=horizon_step)
+    for seed in range(6):
+        for start_hour in range(0, 24, 3):
+            for soc in (battery.soc_min, 0.5, battery.soc_max):
+                window = make_window(horizon=max_horizon, start_hour=start_hour, pv_peak=2.0 * (seed % 3),
+                                     soc=soc, seed=seed)
+                horizon = controller.choose(window)
+                assert horizon in controller.horizons
+                assert min(required_horizon(window, battery), max_horizon) <= horizon <= max_horizon
+
+    result = controller.solve(make_window(horizon=max_horizon))
+    assert result.U.shape[1] == controller.horizon.history[-1] <= max_horizon
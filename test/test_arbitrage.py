@@ -0,0 +1,30 @@
+import pytest
+
+from conftest import make_window, objective
+from mpc.arbitrage import ArbitrageController
+from mpc.sparse_backend import SparseMPCController
+
+
+@pytest.mark.parametrize("start_hour, pv_peak", [(6, 2.0), (12, 4.0), (18, 0.0)])
+@pytest.mark.parametrize("soc", [0.2, 0.5, 0.95])
+def test_arbitrage_matches_milp(battery, start_hour, pv_peak, soc):
+    """De stuksgewijs lineaire DP is exact: dezelfde optimale kosten als het MILP, zonder terugval."""
+    window = make_window(start_hour=start_hour, pv_peak=pv_peak, soc=soc)
+    controller = ArbitrageController(battery, len(window.P_load))
+    result = controller.solve(window)
+    expected = SparseMPCController(battery, len(window.P_load)).solve(window)
+
+    assert controller.arbitrage.solved == 1
+    assert result.status == expected.status == "optimal"
+    assert objective(result, window) == pytest.approx(objective(expected, window), rel=1e-6, abs=1e-7)
+
+
+def test_arbitrage_falls_back_on_negative_prices(battery, window):
+    """Niet-positieve prijzen vallen buiten de structuur en gaan naar de terugvalregelaar."""
+    window.price[3] = -0.05
+    fallback = SparseMPCController(battery, len(window.P_load))
+    controller = ArbitrageController(battery, len(window.P_load), fallback=fallback)
+    result = controller.solve(window)
+
+    assert controller.arbitrage.fallbacks == 1
+    assert objective(result, window) == pytest.approx(objective(fallback.solve(window), window))
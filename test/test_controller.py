@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from conftest import make_battery, make_window, objective
+from models.mpc_data import MPCInputData
+from mpc.controller import MPCController
+
+
+def scaled_and_unscaled(battery, window, mode="milp"):
+    """Lost hetzelfde venster op zonder en met schaling (beide met HiGHS)."""
+    return [MPCController(battery, len(window.P_load), mode=mode, lp_solver="HIGHS", milp_solver="HIGHS",
+                          scale=scale).solve(window)
+            for scale in (False, True)]
+
+
+def test_scaling_keeps_pv_charge_optimum():
+    """Ook de PV-laadbeloning wordt met de prijs geschaald: geschaald laadt het venster net zo met PV."""
+    battery = make_battery(soc=0.2)
+    window = MPCInputData(P_load=np.array([2.0, 1.0]), P_pv_available=np.array([1.0, 0.0]),
+                          price=np.array([0.30, 0.29]), soc_init=0.2)
+    unscaled, scaled = scaled_and_unscaled(battery, window)
+
+    assert unscaled.U[1][0] == pytest.approx(1.0, abs=1e-6)
+    assert scaled.U[1][0] == pytest.approx(unscaled.U[1][0], abs=1e-6)
+    assert objective(scaled, window) == pytest.approx(objective(unscaled, window), abs=1e-7)
+
+
+@pytest.mark.parametrize("mode", ["milp", "lp"])
+def test_scaling_keeps_objective(battery, window, mode):
+    """Geschaald en ongeschaald oplossen geeft dezelfde optimale doelfunctie."""
+    unscaled, scaled = scaled_and_unscaled(battery, window, mode)
+
+    assert unscaled.status == scaled.status == "optimal"
+    assert objective(scaled, window) == pytest.approx(objective(unscaled, window), rel=1e-5, abs=1e-7)
+
+
+def test_warm_start_warns_for_ignoring_solver(battery):
+    """Een solver die warm_start negeert levert een waarschuwing op in plaats van stil niets te doen."""
+    with pytest.warns(UserWarning, match="HIGHS"):
+        MPCController(battery, 12, mode="lp", lp_solver="HIGHS", milp_solver="HIGHS", warm_start=True)
+
+
+def test_warm_start_keeps_objective():
+    """Met warm start (OSQP) volgen opeenvolgende vensters hetzelfde optimum als koud oplossen."""
+    window = make_window(horizon=16, pv_peak=0.0)
+    costs = []
+    for warm_start in (False, True):
+        battery = make_battery()
+        controller = MPCController(battery, 12, mode="lp", lp_solver="OSQP", milp_solver="HIGHS",
+                                   warm_start=warm_start)
+        total = 0.0
+        for t in range(4):
+            step = MPCInputData(P_load=window.P_load[t:t + 12], P_pv_available=window.P_pv_available[t:t + 12],
+                                price=window.price[t:t + 12], soc_init=battery.soc)
+            result = controller.solve(step)
+            total += objective(result, step)
+            battery.soc = float(result.SOC[1])
+        costs.append(total)
+
+    assert costs[1] == pytest.approx(costs[0], rel=1e-3, abs=1e-4)
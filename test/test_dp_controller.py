@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from conftest import make_battery, objective
+from mpc.dp_controller import DPController, ramp_is_slack
+from mpc.sparse_backend import SparseMPCController
+
+
+def test_dp_close_to_milp(battery, window):
+    """De DP op een fijn SOC-rooster benadert het MILP van boven (het rooster is een deel van zijn keuzes)."""
+    assert ramp_is_slack(battery)
+    exact = objective(SparseMPCController(battery, len(window.P_load)).solve(window), window)
+    result = DPController(battery, len(window.P_load), n_soc=201).solve(window)
+
+    assert result.status == "optimal"
+    assert objective(result, window) >= exact - 1e-6
+    assert objective(result, window) == pytest.approx(exact, abs=0.02 * abs(exact) + 1e-3)
+
+
+def test_dp_respects_limits(battery, window):
+    """Het DP-plan blijft binnen de SOC- en vermogensgrenzen en laadt niet tegelijk met ontladen."""
+    result = DPController(battery, len(window.P_load)).solve(window)
+    P_grid, P_charge, P_discharge = result.U[0], result.U[1], result.U[2]
+
+    assert np.all(result.SOC[1:] >= battery.soc_min - 1e-9)
+    assert np.all(result.SOC[1:] <= battery.soc_max + 1e-9)
+    assert np.all(P_charge <= battery.power_max_charge + 1e-9)
+    assert np.all(P_discharge <= battery.power_max_discharge + 1e-9)
+    assert np.all(np.minimum(P_charge, P_discharge) == 0)
+    assert np.all(P_grid >= -1e-9)
+
+
+def test_dp_ramp_cap_only_when_binding(window):
+    """Met een grote batterij kan de ramp binden: dan begrenst ramp_cap het vermogen op de ramp-limiet."""
+    battery = make_battery(capacity_kWh=10)
+    assert not ramp_is_slack(battery)
+    capped = DPController(battery, len(window.P_load), ramp_cap=True).solve(window)
+    free = DPController(battery, len(window.P_load), ramp_cap=False).solve(window)
+
+    assert capped.U[1].max() <= battery.ramp_charge + 1e-9
+    assert capped.U[2].max() <= battery.ramp_discharge + 1e-9
+    assert objective(free, window) <= objective(capped, window) + 1e-9
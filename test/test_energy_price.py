@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from models.energy_price import EnergyPriceCalculator, EXCISE_THRESHOLDS
+
+EXCISE_CSV = os.path.join(ROOT, "data", "energy_taxes_NL.csv")
+
+
+@pytest.fixture
+def calculator() -> EnergyPriceCalculator:
+    """Een jaar met een hoog verbruik, zodat het cumulatieve verbruik meerdere schijven passeert."""
+    rng = np.random.default_rng(0)
+    loads = rng.uniform(0.5, 3.0, 8760)
+    prices = rng.uniform(-0.05, 0.40, 8760)
+    return EnergyPriceCalculator(0.21, prices, loads, excise_csv=EXCISE_CSV, year=2024)
+
+
+def test_year_prices_match_adjust_price(calculator):
+    """year_prices()[t] is het eerste element van adjust_price voor het venster vanaf t."""
+    prices = calculator.year_prices()
+    cumulative = np.concatenate([[0.0], np.cumsum(calculator.loads)])
+    assert np.cumsum(calculator.loads)[-1] > EXCISE_THRESHOLDS[1]
+
+    for t in range(0, len(prices), 97):
+        window = calculator.adjust_price(calculator.market_prices[t:t + 24], calculator.loads[t:t + 24],
+                                         cumulative_init=cumulative[t])
+        assert prices[t] == pytest.approx(window[0], rel=1e-12)
+
+
+def test_year_prices_read_only(calculator):
+    """De jaarreeks wordt één keer berekend en kan niet per ongeluk worden aangepast."""
+    prices = calculator.year_prices()
+    assert calculator.year_prices() is prices
+    with pytest.raises(ValueError):
+        prices[0] = 0.0
+
+
+def reference_excise(calculator: EnergyPriceCalculator, load: float) -> float:
+    """Tarief volgens de schijvenlus van vóór de vectorisatie: eerste schijf met load ≤ grens."""
+    for threshold, rate in zip(calculator.excise_thresholds, calculator.excise_rates):
+        if load <= threshold:
+            return rate
+    return calculator.excise_rates[-1]
+
+
+def test_excise_for_matches_tier_loop(calculator):
+    """Het gevectoriseerde tarief is per element gelijk aan de schijvenlus, ook op en rond de grenzen."""
+    cumulative = np.array([0.0] + [threshold + offset for threshold in EXCISE_THRESHOLDS[:-1]
+                                   for offset in (-1.0, 0.0, 1.0)])
+    expected = [reference_excise(calculator, value) for value in cumulative]
+    assert calculator.excise_for(cumulative) == pytest.approx(expected)
+    assert calculator.determine_energy_excise(EXCISE_THRESHOLDS[0]) == calculator.excise_rates[0]
+
+
+def test_adjust_price_matches_step_loop(calculator):
+    """adjust_price geeft alle stappen het tarief bij het cumulatieve verbruik tot en met de eerste stap."""
+    market, loads = calculator.market_prices[:24], calculator.loads[:24]
+    excise = reference_excise(calculator, loads[0] + 2950.0)
+    expected = [(price + excise) * (1 + calculator.taxes_tarif) for price in market]
+    assert calculator.adjust_price(market, loads, cumulative_init=2950.0) == pytest.approx(expected)
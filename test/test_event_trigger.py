@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from conftest import make_window, window_at
+from mpc.event_trigger import EventTriggeredController, REASON_NO_PLAN, REASON_HORIZON, REASON_INPUT, REASON_SOC
+from mpc.sparse_backend import SparseMPCController
+
+
+def test_plan_reused_until_horizon(battery):
+    """Bij ongewijzigde invoer wordt het plan opgeschoven hergebruikt tot de resterende horizon te kort wordt."""
+    series = make_window(horizon=24)
+    controller = EventTriggeredController(SparseMPCController(battery, 12), battery, min_remaining=8)
+
+    plan = controller.solve(window_at(series, 0, 12, battery.soc))
+    for t in range(1, 6):
+        soc = float(plan.SOC[t])
+        result = controller.solve(window_at(series, t, 12, soc))
+        if t <= 4:
+            assert result.U == pytest.approx(plan.U[:, t:])
+            assert result.SOC == pytest.approx(plan.SOC[t:])
+
+    assert controller.triggers.solves == 2
+    assert controller.triggers.skipped == 4
+    assert controller.triggers.reasons == {REASON_NO_PLAN: 1, REASON_HORIZON: 1}
+
+
+@pytest.mark.parametrize("change, reason", [("price", REASON_INPUT), ("soc", REASON_SOC)])
+def test_change_triggers_solve(battery, change, reason):
+    """Een afwijkende prijs of begin-SOC leidt tot een nieuwe solve met de bijbehorende reden."""
+    series = make_window(horizon=24)
+    controller = EventTriggeredController(SparseMPCController(battery, 12), battery, min_remaining=4)
+    plan = controller.solve(window_at(series, 0, 12, battery.soc))
+
+    data = window_at(series, 1, 12, float(plan.SOC[1]))
+    if change == "price":
+        data.price = np.array(data.price) + 0.01
+    else:
+        data.soc_init = float(plan.SOC[1]) + 0.05
+    controller.solve(data)
+
+    assert controller.triggers.skipped == 0
+    assert controller.triggers.reasons == {REASON_NO_PLAN: 1, reason: 1}
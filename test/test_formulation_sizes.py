@@ -0,0 +1,95 @@
+import cvxpy as cp
+import pytest
+
+from mpc.controller import MPCController, WEIGHT_PV_CHARGE, WEIGHT_DISCHARGE_PRICE
+
+N = 12
+
+
+def legacy_problem(battery, use_binary: bool) -> cp.Problem:
+    """
+    Oorspronkelijke formulering van het batterijprobleem, zonder move blocking en schaling:
+    P_grid en SOC[0] als variabelen met een gelijkheid, ramp via cp.abs, z in [0, 1].
+    """
+    P_load = cp.Parameter(N, nonneg=True)
+    P_pv_available = cp.Parameter(N, nonneg=True)
+    price = cp.Parameter(N)
+    soc_init = cp.Parameter()
+    alpha = cp.Parameter(nonneg=True)
+    beta = cp.Parameter(nonneg=True)
+    soc_max = cp.Parameter(nonneg=True)
+
+    P_grid = cp.Variable(N)
+    P_charge = cp.Variable(N)
+    P_discharge = cp.Variable(N)
+    P_pv_used = cp.Variable(N)
+    SOC = cp.Variable(N + 1)
+
+    constraints = [
+        SOC[0] == soc_init,
+        cp.abs(cp.diff(P_charge)) <= battery.ramp_charge,
+        cp.abs(cp.diff(P_discharge)) <= battery.ramp_discharge,
+        P_grid == P_load - P_pv_used + P_charge - P_discharge,
+        P_grid >= 0,
+        P_charge >= 0,
+        P_discharge >= 0,
+        P_pv_used >= 0,
+        P_pv_used <= P_pv_available,
+        SOC[1:] == SOC[:-1] + alpha * P_charge - beta * P_discharge,
+        SOC[1:] >= battery.soc_min,
+        SOC[1:] <= soc_max,
+    ]
+    if use_binary:
+        z = cp.Variable(N, boolean=True)
+        constraints += [
+            P_charge <= battery.power_max_charge * z,
+            P_discharge <= battery.power_max_discharge * (1 - z),
+            z >= 0,
+            z <= 1,
+        ]
+    else:
+        constraints += [
+            P_charge <= battery.power_max_charge,
+            P_discharge <= battery.power_max_discharge,
+        ]
+
+    cost = cp.sum(cp.multiply(price, P_grid)) \
+         - cp.sum(cp.minimum(P_charge, P_pv_available)) * WEIGHT_PV_CHARGE \
+         - cp.sum(cp.multiply(P_discharge, price)) * WEIGHT_DISCHARGE_PRICE
+    return cp.Problem(cp.Minimize(cost), constraints)
+
+
+def sizes(problem: cp.Problem) -> dict:
+    """Scalaire variabelen en constraints van het model, en kolommen en rijen na canonicalisatie."""
+    metrics = problem.size_metrics
+    A = problem.get_problem_data(cp.HIGHS)[0]["A"]
+    return {"variables": metrics.num_scalar_variables,
+            "constraints": metrics.num_scalar_eq_constr + metrics.num_scalar_leq_constr,
+            "columns": A.shape[1], "rows": A.shape[0]}
+
+
+def formulation(controller: MPCController, use_binary: bool) -> cp.Problem:
+    """LP- of MILP-probleem van de huidige formulering."""
+    return (controller._build_with_battery(use_binary=True) if use_binary else controller._lp).problem
+
+
+@pytest.mark.parametrize("use_binary", [False, True], ids=["lp", "milp"])
+def test_reduced_formulation_is_smaller(battery, use_binary):
+    """De compacte formulering heeft minder variabelen en een kleinere canonieke matrix dan de oorspronkelijke."""
+    legacy = sizes(legacy_problem(battery, use_binary))
+    reduced = sizes(formulation(MPCController(battery, N, mode="lp"), use_binary))
+
+    assert reduced["variables"] < legacy["variables"]
+    assert reduced["columns"] < legacy["columns"]
+    assert reduced["rows"] < legacy["rows"]
+
+
+@pytest.mark.parametrize("use_binary", [False, True], ids=["lp", "milp"])
+def test_move_blocking_is_smaller(battery, use_binary):
+    """Met move blocking dalen het aantal variabelen, constraints, kolommen en rijen t.o.v. uurlijkse beslissingen."""
+    horizon = 24
+    hourly = sizes(formulation(MPCController(battery, horizon, mode="lp"), use_binary))
+    blocked = sizes(formulation(MPCController(battery, horizon, mode="lp", blocking=((6, 1), (3, 6))),
+                                use_binary))
+
+    assert all(blocked[key] < hourly[key] for key in hourly), (blocked, hourly)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from models.pv import PVSystem
+
+
+@pytest.fixture
+def pv() -> PVSystem:
+    rng = np.random.default_rng(0)
+    return PVSystem(irradiance=rng.uniform(0, 0.9, 48), temperature=rng.uniform(-5, 30, 48))
+
+
+def test_output_memoized(pv):
+    """De opbrengst wordt één keer berekend, is alleen-lezen en een venster is een view zonder kopie."""
+    output = pv.power_output()
+    assert pv.power_output() is output
+    assert np.shares_memory(pv.window(10, 5), output)
+    with pytest.raises(ValueError):
+        output[0] = 0.0
+
+
+@pytest.mark.parametrize("name, value", [("n_pvpanels", 7), ("panel_wp", 450.0),
+                                         ("temperature", np.full(48, 10.0))])
+def test_output_recomputed_after_assignment(pv, name, value):
+    """Na het toekennen van een veld wordt de opbrengst opnieuw berekend, gelijk aan een vers PV-systeem."""
+    before = pv.power_output()
+    setattr(pv, name, value)
+    after = pv.power_output()
+
+    assert after is not before
+    assert after == pytest.approx(PVSystem(**{"irradiance": pv.irradiance, "temperature": pv.temperature,
+                                              "panel_wp": pv.panel_wp, "n_pvpanels": pv.n_pvpanels}).power_output())
+    assert not np.allclose(after, before)
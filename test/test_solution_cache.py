@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from conftest import make_battery, make_window
+from mpc.solution_cache import CachedController
+from mpc.sparse_backend import SparseMPCController
+
+
+def assert_feasible(result, data, battery):
+    """De eerste stap respecteert vermogens- en SOC-grenzen, de netbalans en P_grid ≥ 0."""
+    P_grid, P_charge, P_discharge, P_pv_used = (float(row[0]) for row in result.U[:4])
+    assert 0 <= P_charge <= battery.power_max_charge + 1e-9
+    assert 0 <= P_discharge <= battery.power_max_discharge + 1e-9
+    assert min(P_charge, P_discharge) == 0
+    assert 0 <= P_pv_used <= float(data.P_pv_available[0]) + 1e-9
+    assert P_grid >= -1e-9
+    assert P_grid == pytest.approx(float(data.P_load[0]) - P_pv_used + P_charge - P_discharge)
+    assert result.SOC[0] == pytest.approx(data.soc_init)
+    assert battery.soc_min - 1e-9 <= result.SOC[1] <= battery.soc_max + 1e-9
+
+
+def test_hit_is_repaired_for_current_soc():
+    """Een treffer bij een lagere SOC in dezelfde kwantisatiestap wordt gerepareerd tot een toelaatbare actie."""
+    battery = make_battery(soc=0.22)
+    window = make_window(start_hour=18, pv_peak=0.0, soc=0.22)
+    window.price = np.array(window.price)
+    window.price[0] = 0.60    # ontladen in de eerste stap loont
+    controller = CachedController(SparseMPCController(battery, len(window.P_load)), battery, soc_step=0.1)
+
+    first = controller.solve(window)
+    assert first.U[2][0] > 0
+    assert first.SOC[1] == pytest.approx(battery.soc_min)
+
+    window.soc_init = battery.soc = 0.205
+    hit = controller.solve(window)
+
+    assert controller.cache.hits == controller.cache.misses == controller.cache.repairs == 1
+    assert hit.U[2][0] < first.U[2][0]
+    assert_feasible(hit, window, battery)
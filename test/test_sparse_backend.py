@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from conftest import make_battery, make_window, objective
+from mpc.controller import MPCController
+from mpc.sparse_backend import DispatchLP, SparseMPCController, dispatch_duals
+
+
+@pytest.mark.parametrize("mode", ["milp", "lp"])
+def test_sparse_matches_cvxpy(battery, window, mode):
+    """Sparse-backend en cvxpy-formulering geven voor hetzelfde venster dezelfde optimale kosten."""
+    # HiGHS ook voor cvxpy: onafhankelijk van een opgeslagen solverkalibratie en exacter dan ECOS_BB
+    expected = MPCController(battery, len(window.P_load), mode=mode, lp_solver="HIGHS",
+                             milp_solver="HIGHS").solve(window)
+    result = SparseMPCController(battery, len(window.P_load), mode=mode).solve(window)
+
+    assert expected.status == result.status == "optimal"
+    assert objective(result, window) == pytest.approx(objective(expected, window), rel=1e-4)
+    assert result.SOC[0] == pytest.approx(window.soc_init)
+
+
+def test_sparse_without_battery(window):
+    """Zonder batterij wordt alle PV tot de vraag gebruikt, net als in de cvxpy-formulering."""
+    expected = MPCController(None, len(window.P_load)).solve(window)
+    result = SparseMPCController(None, len(window.P_load)).solve(window)
+
+    assert result.U[0] == pytest.approx(expected.U[0], abs=1e-6)
+    assert result.U[3] == pytest.approx(expected.U[3], abs=1e-6)
+
+
+@pytest.mark.parametrize("key", ["soc_max", "soc_min"])
+def test_dual_matches_finite_difference(key):
+    """Een duale waarde is de kostendaling bij ε kWh extra ruimte boven soc_max of onder soc_min in één stap."""
+    battery = make_battery(capacity_kWh=1.2, soc=0.2)
+    window = make_window(horizon=24, start_hour=0, pv_peak=4.0, soc=0.2)
+    lp = DispatchLP(battery, 24, grid_cost_only=True)
+    duals = dispatch_duals(lp, window)
+    t = int(np.argmax(duals[key]))
+    assert duals[key][t] > 1e-4
+
+    epsilon = 1e-4
+    base = lp.solve().fun
+    index = lp.isoc.start + 1 + t
+    if key == "soc_max":
+        ub = lp.ub.copy()
+        ub[index] += epsilon / battery.capacity_kWh
+        relaxed = lp.solve(ub).fun
+    else:
+        lp.lb[index] -= epsilon / battery.capacity_kWh
+        relaxed = lp.solve().fun
+
+    assert (base - relaxed) / epsilon == pytest.approx(duals[key][t], rel=1e-3)
@@ -0,0 +1,39 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from conftest import make_battery, make_window, window_at
+from mpc.speculative import SpeculativeController
+from mpc.sparse_backend import SparseMPCController
+
+HORIZON = 12
+STEPS = 16
+
+
+def simulate(battery, controller, series) -> list:
+    """Rollende simulatie zoals in main.py; geeft per stap (P_grid, P_charge, P_discharge, SOC)."""
+    history = []
+    for t in range(STEPS):
+        result = controller.solve(window_at(series, t, HORIZON, battery.soc))
+        assert result.status == "optimal"
+        battery.update_degradation(float(result.U[2][0]) + float(result.U[4][0]))
+        battery.soc = float(result.SOC[1])
+        history.append((result.U[0][0], result.U[1][0], result.U[2][0], battery.soc))
+    return history
+
+
+def test_speculative_matches_sequential():
+    """Met één werkproces geeft de speculatieve regelaar dezelfde simulatie als sequentieel oplossen."""
+    series = make_window(horizon=STEPS + HORIZON, start_hour=0)
+    battery = make_battery()
+    expected = simulate(battery, SparseMPCController(battery, HORIZON), series)
+
+    battery = make_battery()
+    with SpeculativeController(SparseMPCController(battery, HORIZON), partial(SparseMPCController, horizon=HORIZON),
+                               battery, lambda t, soc: window_at(series, t, HORIZON, soc), STEPS,
+                               workers=1) as speculative:
+        result = simulate(battery, speculative, series)
+
+    assert speculative.speculation.hits > 0
+    assert np.array(result) == pytest.approx(np.array(expected), abs=1e-5)
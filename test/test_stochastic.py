@@ -0,0 +1,23 @@
+import pytest
+
+from mpc.sparse_backend import DispatchLP
+from mpc.stochastic import ScenarioModel, StochasticMPCController
+
+
+def test_single_noiseless_scenario_matches_deterministic(battery, window):
+    """Eén scenario zonder ruis is precies het deterministische netkosten-LP op de voorspelling."""
+    N = len(window.P_load)
+    controller = StochasticMPCController(battery, N, n_scenarios=1,
+                                         model=ScenarioModel(load_sigma=0.0, cloud_range=(1.0, 1.0)))
+    result = controller.solve(window)
+    scenario = controller._lp.solve()
+
+    lp = DispatchLP(battery, N, grid_cost_only=True)
+    lp.update(window)
+    expected = lp.solve()
+
+    assert result.status == "optimal"
+    assert scenario.fun == pytest.approx(expected.fun, rel=1e-9, abs=1e-9)
+    assert scenario.x == pytest.approx(expected.x, abs=1e-7)
+    assert result.U[1][0] == pytest.approx(expected.x[lp.ic.start], abs=1e-7)
+    assert result.U[2][0] == pytest.approx(expected.x[lp.id.start], abs=1e-7)
@@ -0,0 +1,27 @@
+"""
+train_surrogate.py
+
+Traint een SurrogateModel op de beslissingen die run_simulation met decision_log heeft gelogd en
+slaat het op voor de optie surrogate_model.
+
+Gebruik:
+    python train_surrogate.py model.npz beslissingen_*.npz [--hidden 256] [--models 5] [--ridge 0.01] [--seed 0]
+"""
+import argparse
+
+from mpc.surrogate import train_surrogate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train een SurrogateModel op gelogde MPC-beslissingen.")
+    parser.add_argument("model", help="uitvoerbestand (.npz) voor het getrainde model")
+    parser.add_argument("decisions", nargs="+", help=".npz-bestanden van DecisionLogger (decision_log)")
+    parser.add_argument("--hidden", type=int, default=256, help="verborgen neuronen per ensemblelid")
+    parser.add_argument("--models", type=int, default=5, help="aantal ensembleleden")
+    parser.add_argument("--ridge", type=float, default=1e-2, help="regularisatie van de uitvoerlaag")
+    parser.add_argument("--seed", type=int, default=0, help="startwaarde voor de verborgen lagen")
+    args = parser.parse_args()
+
+    trained = train_surrogate(args.decisions, args.model, n_hidden=args.hidden, n_models=args.models,
+                              ridge=args.ridge, seed=args.seed)
+    print(f"Surrogaatmodel met {len(trained.V)} ensembleleden opgeslagen als {args.model}")